@@ -0,0 +1,256 @@
+"""
+Persisted state of the aggregates in benchmarking_results_with_result_stats_agg.csv, which allows to add new benchmark
+runs without aggregating all earlier runs again.
+
+The executions are aggregated per partition, i.e. per (triplestore, dataset, queryID, clientID) and reported result
+size (numberOfSolutions, numberOfBindings, succeeded). Whether an execution has a wrong result only depends on its
+partition and the ground truth of its query, so when new runs change the ground truth of a query, its partitions are
+classified again instead of its executions. For each partition, the state holds the number of rows, sums and maxima,
+and a GroupStats keyed by the partition holds the moments and the values or bucket counts of qps, penalizedQPS, time
+and penalizedTime. Its quantiles are exact as long as it holds at most state_exact_limit values per column. Partitions
+with the same key are merged when new runs are added, and the statistics of a group are those of its partitions
+combined with GroupStats.regroup.
+
+Besides the partitions, the state holds the ground truth and the last emitted aggregate table. Adding runs re-evaluates
+the ground truth only for the queries they touch and recomputes only the aggregates of the groups they touch and of the
+queries whose ground truth they change.
+"""
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from descriptive_stats import GroupStats, stats_names
+from ground_truth import classify_results, ground_truth_columns, resolve_ground_truth
+
+group_columns = ['triplestore', 'dataset', 'queryID', 'clientID']
+partition_columns = group_columns + ['numberOfSolutions', 'numberOfBindings', 'succeeded']
+query_columns = ['dataset', 'queryID']
+stats_columns = ['qps', 'penalizedQPS', 'time', 'penalizedTime']
+stats_quantiles = {'percentile_25': .25, 'median': .5, 'percentile_75': .75}
+# statistics of time and qps only include executions which succeeded with a correct result
+succeeded_only_columns = ['time', 'qps']
+# maxima and sums of a partition besides its key
+partition_max_columns = ['contentLength', 'parsingSucceeded']
+partition_sum_columns = ['failed', 'timeouts', 'unknownExceptions', 'wrongCodes']
+# maxima and sums of an aggregate, i.e. of a (triplestore, dataset, queryID, clientID) group of classified executions
+aggregate_max_columns = ['contentLength', 'numberOfSolutions', 'numberOfBindings', 'wrongResult',
+                         'fully_correct_result', 'parsingSucceeded']
+aggregate_sum_columns = ['succeeded'] + partition_sum_columns
+aggregate_columns = group_columns \
+                    + ["{}_{}".format(column, name) for column in stats_columns for name in stats_names] \
+                    + aggregate_max_columns + aggregate_sum_columns
+# values per column the persisted GroupStats keeps exactly, about 64 MiB for all stats columns
+state_exact_limit = 2 ** 20
+
+
+def _key(data: pd.DataFrame, columns: Sequence[str]) -> pd.Series:
+    """One string per row which identifies the values of columns, including missing ones."""
+    key = data[columns[0]].astype(str)
+    for column in columns[1:]:
+        key = key + "\x1f" + data[column].astype(str)
+    return key
+
+
+def partition_stats(rows: pd.DataFrame) -> Tuple[pd.DataFrame, GroupStats]:
+    """
+    Aggregates rows of executions into partitions, ordered by the first appearance of each partition, and the
+    GroupStats of the stats columns per partition, keyed by the partition key.
+    """
+    # grouping by the string key keeps partitions with missing result sizes in the order of first appearance, it is
+    # built once per partition
+    codes = rows.groupby(partition_columns, dropna=False, sort=False).ngroup().to_numpy()
+    _, first_rows = np.unique(codes, return_index=True)
+    key = _key(rows.iloc[first_rows], partition_columns).to_numpy()[codes]
+    first = ~pd.Series(key).duplicated().to_numpy()
+    grouped = rows.groupby(key, sort=False)
+    partitions = rows.loc[first, partition_columns].set_index(key[first])
+    partitions['rows'] = grouped.size()
+    partitions = partitions.join(grouped[partition_max_columns].max()).join(grouped[partition_sum_columns].sum())
+    stats = GroupStats.from_frame(rows[stats_columns].assign(partition=key), ['partition'], stats_columns,
+                                  state_exact_limit)
+    return partitions.reset_index(drop=True), stats
+
+
+def merge_stats(parts: List[GroupStats]) -> GroupStats:
+    """Merges the GroupStats of several parts of the executions pairwise, in log2(len(parts)) rounds."""
+    while len(parts) > 1:
+        parts = [parts[i].merge(parts[i + 1]) if i + 1 < len(parts) else parts[i] for i in range(0, len(parts), 2)]
+    return parts[0]
+
+
+def _set_rows(frame: pd.DataFrame, at: np.ndarray, values: pd.DataFrame) -> pd.DataFrame:
+    """A copy of frame with the rows at the positions at of the columns of values replaced, keeping their dtypes."""
+    frame = frame.copy()
+    for column in values.columns:
+        updated = frame[column].copy()
+        updated.iloc[at] = values[column].astype(updated.dtype).array
+        frame[column] = updated
+    return frame
+
+
+def _merge_partitions(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Merges the rows of new into the partitions with the same key in old. Other partitions of new are appended."""
+    old_key = _key(old, partition_columns)
+    new_key = _key(new, partition_columns)
+    position = pd.Series(np.arange(len(old)), index=old_key.to_numpy())
+    known = new_key.isin(position.index).to_numpy()
+    at = position[new_key[known]].to_numpy()
+    update = new[known].reset_index(drop=True)
+    current = old.iloc[at].reset_index(drop=True)
+    combined = pd.DataFrame({'rows': current['rows'] + update['rows'],
+                             **{column: pd.concat([current[column], update[column]], axis=1).max(axis=1)
+                                for column in partition_max_columns},
+                             **{column: current[column] + update[column] for column in partition_sum_columns}})
+    return pd.concat([_set_rows(old, at, combined), new[~known].astype(old.dtypes.to_dict())], ignore_index=True)
+
+
+def _aggregate(partitions: pd.DataFrame, stats: GroupStats) -> pd.DataFrame:
+    """
+    Aggregates classified partitions per (triplestore, dataset, queryID, clientID). Their partition column holds their
+    key in stats.
+    """
+    succeeded = partitions['succeeded'].to_numpy(dtype=bool)
+    partitions = partitions.assign(succeeded=partitions['succeeded'] * partitions['rows'])
+    grouped = partitions.groupby(group_columns, sort=True)
+    keys = grouped.size().index.to_frame(index=False)
+
+    at = pd.Index(stats.keys['partition']).get_indexer(partitions['partition'])
+    codes = np.full(len(stats.keys), -1, dtype=np.int64)
+    codes[at] = grouped.ngroup().to_numpy()
+    succeeded_codes = codes.copy()
+    succeeded_codes[at[~succeeded]] = -1
+    all_columns = [column for column in stats_columns if column not in succeeded_only_columns]
+    aggregates = pd.concat([stats.regroup(keys, codes, all_columns).describe(),
+                            stats.regroup(keys, succeeded_codes, succeeded_only_columns).describe()
+                            .drop(columns=group_columns)], axis=1)
+
+    for column in aggregate_max_columns:
+        aggregates[column] = grouped[column].max().to_numpy()
+    for column in aggregate_sum_columns:
+        aggregates[column] = grouped[column].sum().to_numpy()
+    aggregates['wrongResult'] = ((aggregates['succeeded'] == 0) & aggregates['wrongResult']).astype(np.int64)
+    return aggregates[aggregate_columns]
+
+
+class AggregateState:
+    def __init__(self, partitions: pd.DataFrame, stats: GroupStats, ground_truth: pd.DataFrame,
+                 aggregates: pd.DataFrame, datasets: List[str]):
+        """
+        :param partitions: aggregated executions per partition, ordered by first appearance
+        :param stats: the GroupStats of the stats columns per partition key
+        :param ground_truth: the table written to result_stats_ground_truth.csv
+        :param aggregates: the table written to benchmarking_results_with_result_stats_agg.csv
+        :param datasets: all datasets in the order of their first appearance
+        """
+        self.partitions = partitions
+        self.stats = stats
+        self.ground_truth = ground_truth
+        self.aggregates = aggregates
+        self.datasets = datasets
+
+    @classmethod
+    def from_partitions(cls, partitions: pd.DataFrame, stats: GroupStats, ground_truth: pd.DataFrame,
+                        aggregates: pd.DataFrame, datasets: Sequence[str]) -> "AggregateState":
+        """Creates the state from the results of partition_stats, e.g. of several parts of the executions."""
+        return cls(partitions, stats, ground_truth, aggregates, list(datasets))
+
+    @classmethod
+    def from_rows(cls, iguana_data: pd.DataFrame, ground_truth: pd.DataFrame,
+                  aggregates: pd.DataFrame) -> "AggregateState":
+        """
+        Creates the state of all executions in iguana_data, joined with the parsing results but not yet classified.
+        ground_truth and aggregates are the tables computed from them.
+        """
+        partitions, stats = partition_stats(iguana_data)
+        return cls(partitions, stats, ground_truth, aggregates, list(iguana_data['dataset'].unique()))
+
+    def classified_rows(self) -> int:
+        """The number of executions in benchmarking_results_with_result_stats.csv, i.e. of the queries not excluded."""
+        excluded = _key(self.partitions, query_columns).isin(self.excluded_queries()).to_numpy()
+        return int(self.partitions.loc[~excluded, 'rows'].sum())
+
+    def add(self, iguana_data: pd.DataFrame) -> bool:
+        """
+        Adds new executions, joined with the parsing results but not yet classified. The ground truth of the queries
+        they touch is updated, and the aggregates of the groups they touch and of the queries whose ground truth
+        changed are recomputed. Returns True if the ground truth of a query with earlier executions changed, so that
+        the earlier executions of this query are classified differently.
+        """
+        self.datasets += [dataset for dataset in iguana_data['dataset'].unique() if dataset not in self.datasets]
+        partitions, stats = partition_stats(iguana_data)
+        self.partitions = _merge_partitions(self.partitions, partitions)
+        self.stats = self.stats.merge(stats)
+
+        known_queries = _key(self.ground_truth, query_columns)
+        known_ground_truth = _key(self.ground_truth, ground_truth_columns)
+        touched = _key(self.partitions, query_columns).isin(_key(iguana_data, query_columns)).to_numpy()
+        self._update_ground_truth(resolve_ground_truth(self.partitions[touched], self.datasets))
+        changed = self.ground_truth[~_key(self.ground_truth, ground_truth_columns).isin(known_ground_truth).to_numpy()]
+        changed_queries = _key(changed, query_columns)
+
+        recomputed = (_key(self.partitions, group_columns).isin(_key(iguana_data, group_columns))
+                      | _key(self.partitions, query_columns).isin(changed_queries)).to_numpy()
+        recomputed_partitions = self.partitions[recomputed]
+        classified = classify_results(recomputed_partitions.assign(
+            partition=_key(recomputed_partitions, partition_columns)), self.ground_truth[ground_truth_columns])
+        classified = classified[~_key(classified, query_columns).isin(self.excluded_queries()).to_numpy()]
+        stale = (_key(self.aggregates, group_columns).isin(_key(iguana_data, group_columns))
+                 | _key(self.aggregates, query_columns).isin(changed_queries)).to_numpy()
+        self.aggregates = pd.concat([self.aggregates[~stale],
+                                     _aggregate(classified, self.stats).astype(self.aggregates.dtypes.to_dict(),
+                                                                               errors='ignore')],
+                                    ignore_index=True) \
+            .sort_values(group_columns, kind='stable', ignore_index=True)
+        return bool(changed_queries.isin(known_queries).any())
+
+    def _update_ground_truth(self, touched_ground_truth: pd.DataFrame):
+        """Replaces the ground truth of known queries in place and inserts new queries after the known ones."""
+        known_key = _key(self.ground_truth, query_columns)
+        touched_key = _key(touched_ground_truth, query_columns)
+        position = pd.Series(np.arange(len(self.ground_truth)), index=known_key.to_numpy())
+        known = touched_key.isin(position.index).to_numpy()
+        at = position[touched_key[known]].to_numpy()
+        ground_truth = _set_rows(self.ground_truth, at, touched_ground_truth.loc[known, ground_truth_columns])
+        ground_truth = pd.concat([ground_truth, touched_ground_truth[~known].astype(ground_truth.dtypes.to_dict())],
+                                 ignore_index=True)
+        dataset_rank = pd.Categorical(ground_truth['dataset'], categories=self.datasets).codes
+        self.ground_truth = ground_truth.iloc[np.argsort(dataset_rank, kind='stable')].reset_index(drop=True)
+
+    def excluded_queries(self) -> pd.Series:
+        """Keys of the queries for which tentris does not support the SPARQL features."""
+        non_tentris_sparql = self.ground_truth['non_tentris_sparql'].to_numpy(dtype=bool, na_value=False)
+        return _key(self.ground_truth[non_tentris_sparql], query_columns)
+
+    def exclude_queries(self) -> dict:
+        """The content of exclude_queries.json."""
+        exclude = {dataset: [] for dataset in self.datasets}
+        non_tentris_sparql = self.ground_truth[self.ground_truth['non_tentris_sparql'].to_numpy(dtype=bool,
+                                                                                               na_value=False)]
+        for dataset, ex_qids in exclude.items():
+            ex_qids.extend(non_tentris_sparql.loc[non_tentris_sparql['dataset'] == dataset, 'queryID'].unique())
+        return exclude
+
+    def save(self, state_dir: Path):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.partitions.to_pickle(state_dir.joinpath("partitions.pkl"))
+        pd.to_pickle(self.stats, state_dir.joinpath("stats.pkl"))
+        self.ground_truth.to_pickle(state_dir.joinpath("ground_truth.pkl"))
+        self.aggregates.to_pickle(state_dir.joinpath("aggregates.pkl"))
+        with open(state_dir.joinpath("state.json"), 'w') as file:
+            json.dump({"datasets": self.datasets}, file, indent=2)
+
+    @classmethod
+    def load(cls, state_dir: Path) -> Optional["AggregateState"]:
+        """Loads the state from state_dir or returns None if there is none."""
+        if not state_dir.joinpath("state.json").exists() or not state_dir.joinpath("stats.pkl").exists():
+            return None
+        with open(state_dir.joinpath("state.json"), 'r') as file:
+            meta = json.load(file)
+        return cls(pd.read_pickle(state_dir.joinpath("partitions.pkl")),
+                   pd.read_pickle(state_dir.joinpath("stats.pkl")),
+                   pd.read_pickle(state_dir.joinpath("ground_truth.pkl")),
+                   pd.read_pickle(state_dir.joinpath("aggregates.pkl")),
+                   meta["datasets"])
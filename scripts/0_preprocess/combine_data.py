@@ -1,30 +1,215 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-import janitor
-from dfply import *
 import click
 
+from partitioned_frames import default_chunk_size
+
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+from util.columnar_cache import columnar_path, read_table, write_columnar
+from util.profiling import profile_option, profiler
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from aggregate_state import AggregateState
+
 
-def percentile(n):
-    def percentile_(x):
-        return x.quantile(n)
+join_columns = ['triplestore', 'dataset', "queryID", "contentLength"]
+parsing_columns = ['parsingSucceeded', 'numberOfVariables', 'numberOfSolutions',
+                   'numberOfBindings', 'resultParsingTime', 'parsingErrorMessage']
 
-    percentile_.__name__ = 'percentile_{:2.0f}'.format(n * 100)
-    return percentile_
 
+def with_parsing_results(iguana_data: pd.DataFrame, parsing_data: pd.DataFrame) -> pd.DataFrame:
+    iguana_data = iguana_data.merge(parsing_data[join_columns + parsing_columns], how='left', on=join_columns)
+    iguana_data["parsingSucceeded"] = ~ iguana_data["parsingSucceeded"].isna()
+    return iguana_data
+
+
+def np_encoder(object):
+    import numpy as np
+    if isinstance(object, np.generic):
+        return object.item()
+
+
+def append_csv(csv_file: Path, new_csv_file: Path):
+    """Appends the rows of new_csv_file to csv_file. Both must have the same header."""
+    with open(csv_file, 'r', newline='') as file:
+        header = file.readline()
+    with open(new_csv_file, 'r', newline='') as new_file:
+        if new_file.readline() != header:
+            raise ValueError("{} and {} have different headers.".format(new_csv_file, csv_file))
+        with open(csv_file, 'a', newline='') as file:
+            for line in new_file:
+                file.write(line)
+
+
+def without_excluded_queries(iguana_data: pd.DataFrame, correct_result_sizes: pd.DataFrame) -> pd.DataFrame:
+    """Filters out the queries for which tentris does not support the SPARQL features."""
+    import pandas as pd
+    excluded = correct_result_sizes.loc[correct_result_sizes.non_tentris_sparql == True, ['dataset', 'queryID']]
+    return iguana_data[~pd.MultiIndex.from_frame(iguana_data[['dataset', 'queryID']])
+                       .isin(pd.MultiIndex.from_frame(excluded))]
+
+
+def append_runs(data_dir: Path, state: AggregateState, new_iguana_results: Path, new_parsing_results: Path):
+    """
+    Adds the new runs in new_iguana_results to the state and updates the files in data_dir. new_parsing_results holds
+    the parsing results which are not yet in parsed_results_stats.csv.
+
+    Only the new runs are read, classified and appended to the CSV files, and only the aggregates of the groups they
+    touch are recomputed. If the new runs change the ground truth of a query with earlier runs, the earlier runs of
+    this query are classified differently, so benchmarking_results_with_result_stats.csv is then written again from
+    all runs. The columnar copies of the appended run tables are removed, as they would be outdated.
+    """
+    import pandas as pd
+    from ground_truth import classify_results
+    iguana_results = data_dir.joinpath("benchmarking_results.csv")
+    parsing_results = data_dir.joinpath("parsed_results_stats.csv")
+    parsing_data = pd.concat([pd.DataFrame(read_table(parsing_results)), pd.read_csv(new_parsing_results)],
+                             ignore_index=True)
+    new_iguana_data = with_parsing_results(pd.read_csv(new_iguana_results).convert_dtypes(),
+                                           parsing_data.convert_dtypes())
+    classified_rows = state.classified_rows()
+    ground_truth_changed = state.add(new_iguana_data)
+
+    append_csv(iguana_results, new_iguana_results)
+    append_csv(parsing_results, new_parsing_results)
+    columnar_path(iguana_results).unlink(missing_ok=True)
+    write_columnar(parsing_data, parsing_results)
+
+    state.ground_truth.to_csv(data_dir.joinpath("result_stats_ground_truth.csv").absolute())
+    with open(data_dir.joinpath("exclude_queries.json"), 'w') as file:
+        json.dump(state.exclude_queries(), file, default=np_encoder)
+
+    iguana_data_file = data_dir.joinpath("benchmarking_results_with_result_stats.csv").absolute()
+    if ground_truth_changed:
+        iguana_data: pd.DataFrame = pd.DataFrame(read_table(iguana_results)).convert_dtypes()
+        iguana_data = with_parsing_results(iguana_data, parsing_data.convert_dtypes())
+        iguana_data = classify_results(without_excluded_queries(iguana_data, state.ground_truth), state.ground_truth)
+        iguana_data.to_csv(iguana_data_file)
+        write_columnar(iguana_data, iguana_data_file)
+    else:
+        new_iguana_data = classify_results(without_excluded_queries(new_iguana_data, state.ground_truth),
+                                           state.ground_truth)
+        # continue the running index of the earlier runs
+        new_iguana_data.index += classified_rows
+        new_iguana_data.to_csv(iguana_data_file, mode='a', header=False)
+        columnar_path(iguana_data_file).unlink(missing_ok=True)
+
+    iguana_data_agg_file = data_dir.joinpath("benchmarking_results_with_result_stats_agg.csv").absolute()
+    state.aggregates.to_csv(iguana_data_agg_file)
+    write_columnar(state.aggregates, iguana_data_agg_file)
+
+
+def combine_data_chunked(data_dir: Path, state_dir: Path, chunk_size: int):
+    """
+    Like combine_data, but holds only one partition of the runs, i.e. one (dataset, triplestore), in memory at a time.
+
+    The inputs are read in chunks of chunk_size rows and split into partitions in a temporary directory. A first pass
+    over the partitions collects the result sizes for the ground truth, a second pass classifies and aggregates the
+    runs of each partition. The outputs are the same as without chunking.
+    """
+    import numpy as np
+    import pandas as pd
+    from aggregate_state import AggregateState, merge_stats, partition_stats
+    from ground_truth import classify_results, resolve_ground_truth
+    from parallel_aggregate import aggregate_serial
+    from partitioned_frames import merge_by_row, row_column, split_csv
+    with tempfile.TemporaryDirectory(dir=data_dir) as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        partition_columns = ['dataset', 'triplestore']
+        with profiler.step("split"):
+            iguana_parts = split_csv(data_dir.joinpath("benchmarking_results.csv"), tmp_dir.joinpath("results"),
+                                     partition_columns, chunk_size)
+            parsing_parts = split_csv(data_dir.joinpath("parsed_results_stats.csv"), tmp_dir.joinpath("parsed"),
+                                      partition_columns, chunk_size)
+        datasets = list(dict.fromkeys(dataset for dataset, _ in iguana_parts.keys()))
+
+        def read_partition(key: tuple) -> pd.DataFrame:
+            return with_parsing_results(iguana_parts.read(key), parsing_parts.read(key))
+
+        partitions, stats, first_rows = [], [], []
+        for key in iguana_parts.keys():
+            with profiler.step("join") as step:
+                iguana_data = read_partition(key)
+                step.rows_out = len(iguana_data)
+            with profiler.step("partition stats", rows_in=len(iguana_data)):
+                part_partitions, part_stats = partition_stats(iguana_data)
+                partitions.append(part_partitions)
+                stats.append(part_stats)
+                first_rows.append(iguana_data.groupby(['dataset', 'queryID'])[row_column].min())
+            del iguana_data
+        # order the queries by their first appearance in benchmarking_results.csv, like resolve_ground_truth expects
+        first_rows = pd.concat(first_rows).groupby(level=['dataset', 'queryID']).min()
+        partitions = pd.concat(partitions, ignore_index=True)
+        partition_first_rows = first_rows.reindex(pd.MultiIndex.from_frame(partitions[['dataset', 'queryID']]))
+        partitions = partitions.iloc[np.argsort(partition_first_rows.to_numpy(), kind='stable')] \
+            .reset_index(drop=True)
+
+        with profiler.step("ground truth", rows_in=len(partitions)) as step:
+            correct_result_sizes = resolve_ground_truth(partitions, datasets)
+            step.rows_out = len(correct_result_sizes)
+        correct_result_sizes.to_csv(data_dir.joinpath("result_stats_ground_truth.csv").absolute())
+
+        aggregates, part_files = [], []
+        for i, key in enumerate(sorted(iguana_parts.keys(), key=lambda key: (key[1], key[0]))):
+            with profiler.step("join") as step:
+                iguana_data = read_partition(key)
+                step.rows_out = len(iguana_data)
+            with profiler.step("classify", rows_in=len(iguana_data)) as step:
+                iguana_data = without_excluded_queries(iguana_data, correct_result_sizes)
+                iguana_data = classify_results(iguana_data, correct_result_sizes)
+                step.rows_out = len(iguana_data)
+            with profiler.step("write", rows_in=len(iguana_data)):
+                part_files.append(tmp_dir.joinpath("{:06d}.csv".format(i)))
+                iguana_data.to_csv(part_files[-1], index=False)
+            with profiler.step("aggregate", rows_in=len(iguana_data)) as step:
+                aggregates.append(aggregate_serial(iguana_data.drop(columns=row_column)))
+                step.rows_out = len(aggregates[-1])
+            del iguana_data
+
+        iguana_data_file = data_dir.joinpath("benchmarking_results_with_result_stats.csv").absolute()
+        with profiler.step("merge"), open(iguana_data_file, 'w', newline='') as output:
+            merge_by_row(part_files, output)
+        # the runs are never held in memory at once, so there is no columnar copy of them
+        columnar_path(iguana_data_file).unlink(missing_ok=True)
+
+    iguana_data_agg = pd.concat(aggregates, ignore_index=True)
+    iguana_data_agg_file = data_dir.joinpath("benchmarking_results_with_result_stats_agg.csv").absolute()
+    iguana_data_agg.to_csv(iguana_data_agg_file)
+    write_columnar(iguana_data_agg, iguana_data_agg_file)
+
+    with profiler.step("save state"):
+        state = AggregateState.from_partitions(partitions, merge_stats(stats), correct_result_sizes, iguana_data_agg,
+                                               datasets)
+        with open(data_dir.joinpath("exclude_queries.json"), 'w') as file:
+            json.dump(state.exclude_queries(), file, default=np_encoder)
+        state.save(state_dir)
 
-descriptive_stats = ["mean",
-                     "std",
-                     "min",
-                     percentile(.25),
-                     "median",
-                     percentile(.75),
-                     "max"]
 
 @click.command()
 @click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True),
               help="Where the data and raw_data directories are located.")
-def combine_data(base_dir: Path):
+@click.option("--append-results", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="Only add the runs in this CSV file, in the format of benchmarking_results.csv, to the results "
+                   "of an earlier run of this script.")
+@click.option("--append-parsed-results", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="The parsing results of the runs given with --append-results, in the format of "
+                   "parsed_results_stats.csv.")
+@click.option("--chunked", is_flag=True,
+              help="Process the runs of one dataset and triple store at a time to limit the memory usage.")
+@click.option("--chunk-size", default=default_chunk_size, type=click.IntRange(min=1),
+              help="Number of CSV rows read at once with --chunked.")
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes aggregating the runs. Defaults to the number of CPUs.")
+@profile_option
+def combine_data(base_dir: Path, append_results: Optional[str], append_parsed_results: Optional[str], chunked: bool,
+                 chunk_size: int, workers: Optional[int]):
     data_dir = base_dir.joinpath("data")
     if not data_dir.exists():
         click.echo("There must be a data folder provided in the base-dir. "
@@ -32,119 +217,44 @@ def combine_data(base_dir: Path):
                    "You can use another base-dir by providing the cmd arg '--base-dir <path>'.",
                    err=True)
         exit(1)
+    state_dir = data_dir.joinpath("aggregate_state")
+    import pandas as pd
+    from aggregate_state import AggregateState
+    from ground_truth import classify_results, resolve_ground_truth
+    from parallel_aggregate import aggregate
+
+    if append_results is not None:
+        state = AggregateState.load(state_dir)
+        if state is None or append_parsed_results is None:
+            click.echo("--append-results requires --append-parsed-results and an earlier run of this script "
+                       "without --append-results.", err=True)
+            exit(1)
+        with profiler.step("append"):
+            append_runs(data_dir, state, Path(append_results), Path(append_parsed_results))
+        state.save(state_dir)
+        return
+    if chunked:
+        combine_data_chunked(data_dir, state_dir, chunk_size)
+        return
 
     iguana_results = data_dir.joinpath("benchmarking_results.csv")
     parsing_results = data_dir.joinpath("parsed_results_stats.csv")
 
-    iguana_data: pd.DataFrame = pd.DataFrame(pd.read_csv(iguana_results)).convert_dtypes()
-    parsing_data: pd.DataFrame = pd.DataFrame(pd.read_csv(parsing_results)).convert_dtypes()
+    with profiler.step("read") as step:
+        iguana_data: pd.DataFrame = pd.DataFrame(read_table(iguana_results)).convert_dtypes()
+        parsing_data: pd.DataFrame = pd.DataFrame(read_table(parsing_results)).convert_dtypes()
+        step.rows_out = len(iguana_data) + len(parsing_data)
 
-    formats = iguana_data["format"].unique()
     datasets = iguana_data["dataset"].unique()
-    triplestores = iguana_data["triplestore"].unique()
-    noclients_s = iguana_data["noclients"].unique()
-    mixes = iguana_data["run"].max()
-
-    join_columns = ['triplestore', 'dataset', "queryID", "contentLength"]
-    parsing_columns = ['parsingSucceeded', 'numberOfVariables', 'numberOfSolutions',
-                       'numberOfBindings', 'resultParsingTime', 'parsingErrorMessage']
-    stats_columns = ['qps', 'penalizedQPS', 'succeeded', 'failed', 'timeouts', 'unknownExceptions', 'wrongCodes',
-                     'time', 'contentLength', 'penalizedTime']
-    aggregate_columns = ['triplestore', 'dataset', 'queryID']
 
-    iguana_data >>= left_join(parsing_data[join_columns + parsing_columns], by=join_columns)
+    with profiler.step("join", rows_in=len(iguana_data)) as step:
+        iguana_data = with_parsing_results(iguana_data, parsing_data)
+        step.rows_out = len(iguana_data)
+    unclassified_iguana_data = iguana_data
 
-    iguana_data["parsingSucceeded"] = ~ iguana_data["parsingSucceeded"].isna()
-
-    correct_result_sizes = []
-    for dataset in datasets:
-        tmp_ds = iguana_data.query(f'dataset == "{dataset}"')
-        for queryID in tmp_ds.queryID.unique():
-            tmp_qid = tmp_ds.query(f'queryID == {queryID} and (not numberOfSolutions.isna()) and succeeded')
-
-            if tmp_qid.empty:
-                correct_result_sizes.append(
-                    {'dataset': dataset, 'queryID': queryID, 'numberOfSolutions': np.nan, 'numberOfBindings': np.nan,
-                     'non_tentris_sparql': False})
-            else:
-
-                max_nos = tmp_qid.numberOfSolutions.max()
-                n_nos = tmp_qid.numberOfSolutions.nunique()
-
-                max_nob = tmp_qid.numberOfBindings.max()
-                n_nob = tmp_qid.numberOfBindings.nunique()
-
-                if n_nos == 1 and n_nob == 1:
-                    correct_result_sizes.append(
-                        {'dataset': dataset, 'queryID': queryID, 'numberOfSolutions': max_nos, 'numberOfBindings': max_nob,
-                         'non_tentris_sparql': False})
-                else:
-                    fuseki_solutions = tmp_qid.query("triplestore == 'fuseki'")
-                    fuseki_has_result = not fuseki_solutions.empty
-                    if fuseki_has_result:
-                        max_nos = fuseki_solutions.numberOfSolutions.max()
-                        max_nob = fuseki_solutions.numberOfBindings.max()
-
-                        fuseki_max_nos_idx = np.argmax(fuseki_solutions.numberOfSolutions)
-                        fuseki_solution = fuseki_solutions.iloc[fuseki_max_nos_idx]
-                        assert (fuseki_solution.numberOfSolutions == max_nos)
-                        assert (fuseki_solution.numberOfBindings == max_nob)
-
-                    solutions = []
-
-                    tentris_versions = list(filter(lambda x: x.startswith("tentris"), tmp_qid.triplestore.unique()))
-                    excluded_tentris_versions = set()
-                    tentris_has_solution = False
-                    if tentris_versions:
-                        tentris_version = sorted(tentris_versions, reverse=True)[0]
-                        excluded_tentris_versions = tentris_versions.copy()
-                        excluded_tentris_versions.remove(tentris_version)
-                        triplestore_solutions = tmp_qid.query(f"(triplestore == '{tentris_version}')")
-                        tentris_has_solution = not triplestore_solutions.empty
-                        if tentris_has_solution:
-                            tentris_nos = triplestore_solutions.numberOfSolutions.max()
-                            tentris_nob = triplestore_solutions.numberOfBindings.max()
-
-                            tentris_max_nos_idx = np.argmax(triplestore_solutions.numberOfSolutions)
-                            tentris_solution = triplestore_solutions.iloc[tentris_max_nos_idx]
-                            assert (tentris_solution.numberOfSolutions == tentris_nos)
-                            assert (tentris_solution.numberOfBindings == tentris_nob)
-                            solutions.append(tentris_solution)
-
-                    if not fuseki_has_result:
-                        one_tentris_only = tmp_qid
-                        one_tentris_only = one_tentris_only.query("triplestore not in @excluded_tentris_versions")
-
-                        for triplestore in triplestores:
-                            if triplestore in tentris_versions or triplestore == "fuseki":
-                                continue
-                            triplestore_solutions = tmp_qid.query(f"(triplestore == '{triplestore}')")
-                            if not triplestore_solutions.empty:
-                                nos = triplestore_solutions.numberOfSolutions.max()
-                                nob = triplestore_solutions.numberOfBindings.max()
-
-                                max_nos_idx = np.argmax(triplestore_solutions.numberOfSolutions)
-                                solution = triplestore_solutions.iloc[max_nos_idx]
-                                assert (solution.numberOfSolutions == nos)
-                                assert (solution.numberOfBindings == nob)
-                                solutions.append(solution)
-                        if solutions:
-                            solutions = pd.DataFrame.from_records(solutions)
-                            max_nos, max_nob = solutions[['numberOfSolutions', 'numberOfBindings']].value_counts().index[
-                                0]
-                        else:
-                            assert (False)
-
-                    non_tentris_sparql = tentris_has_solution and not (
-                            (tentris_nos == 1 and (tentris_nob == 0)) <= (max_nos == 1 and max_nob == 0))
-
-                    correct_result_sizes.append(
-                        {'dataset': dataset, 'queryID': queryID, 'numberOfSolutions': max_nos, 'numberOfBindings': max_nob,
-                         'non_tentris_sparql': non_tentris_sparql})
-
-    correct_result_sizes = pd.DataFrame(correct_result_sizes,
-                                        columns=['dataset', 'queryID', 'numberOfSolutions', 'numberOfBindings',
-                                                 'non_tentris_sparql']).convert_dtypes()
+    with profiler.step("ground truth", rows_in=len(iguana_data)) as step:
+        correct_result_sizes = resolve_ground_truth(iguana_data, datasets)
+        step.rows_out = len(correct_result_sizes)
     correct_result_sizes.to_csv(data_dir.joinpath("result_stats_ground_truth.csv").absolute())
 
     exclude = {dataset: [] for dataset in datasets}
@@ -155,79 +265,31 @@ def combine_data(base_dir: Path):
         )
 
     # Filter out the queries which are not relevant
-    for dataset, ex_qids in exclude.items():
-        iguana_data = iguana_data.query(f"not (dataset == '{dataset}') or (queryID not in @ex_qids)")
-
-
-    def np_encoder(object):
-        if isinstance(object, np.generic):
-            return object.item()
-
-
-    import json
+    iguana_data = without_excluded_queries(iguana_data, correct_result_sizes)
 
     excluded_queries_file = data_dir.joinpath("exclude_queries.json")
     with open(excluded_queries_file, 'w') as file:
         json.dump(exclude, file, default=np_encoder)
 
+    with profiler.step("classify", rows_in=len(iguana_data)) as step:
+        iguana_data = classify_results(iguana_data, correct_result_sizes)
+        step.rows_out = len(iguana_data)
+    iguana_data_file = data_dir.joinpath("benchmarking_results_with_result_stats.csv").absolute()
+    with profiler.step("write", rows_in=len(iguana_data)):
+        iguana_data.to_csv(iguana_data_file)
+        write_columnar(iguana_data, iguana_data_file)
+
+    with profiler.step("aggregate", rows_in=len(iguana_data)) as step:
+        iguana_data_agg = aggregate(iguana_data, workers)
+        step.rows_out = len(iguana_data_agg)
+    iguana_data_agg_file = data_dir.joinpath("benchmarking_results_with_result_stats_agg.csv").absolute()
+    with profiler.step("write aggregates", rows_in=len(iguana_data_agg)):
+        iguana_data_agg.to_csv(iguana_data_agg_file)
+        write_columnar(iguana_data_agg, iguana_data_agg_file)
+
+    with profiler.step("save state"):
+        AggregateState.from_rows(unclassified_iguana_data, correct_result_sizes, iguana_data_agg).save(state_dir)
 
-    x = iguana_data >> left_join(
-        correct_result_sizes >> rename(numberOfSolutions_corr='numberOfSolutions',
-                                       numberOfBindings_corr='numberOfBindings'),
-        on=['dataset', 'queryID']
-    )
-
-    x['wrongResult'] = (
-            (# not close to correct number of solutions
-            (~np.isclose(x.numberOfSolutions.astype('float64'), x.numberOfSolutions_corr.astype('float64'),
-                         rtol=0.1) | ~np.isclose(x.numberOfBindings.astype('float64'),
-                                                 x.numberOfBindings_corr.astype('float64'), rtol=0.1))
-            &
-            # not less than ten solutions
-            ~(
-                    (np.less_equal(x.numberOfSolutions, 10) & np.greater_equal(x.numberOfSolutions,
-                                                                               0) & np.less_equal(
-                        x.numberOfSolutions_corr, 10) & np.greater_equal(x.numberOfSolutions_corr, 0)) &
-                    (x.numberOfBindings == x.numberOfBindings_corr)
-            ))
-    )
-
-
-    x["wrongResult"] = x["wrongResult"].fillna(False)
-    x['fully_correct_result'] = (x.numberOfSolutions == x.numberOfSolutions_corr) & (
-            x.numberOfBindings == x.numberOfBindings_corr)
-    x['succeeded'] = (x.succeeded & ~x.wrongResult).astype(np.int64)
-    x.drop(columns=["numberOfSolutions_corr", "numberOfBindings_corr"], inplace=True)
-    x.convert_dtypes()
-    x.loc[x.succeeded == False, ['time', 'qps']] = None
-    iguana_data = x
-    del x
-    iguana_data.to_csv(data_dir.joinpath("benchmarking_results_with_result_stats.csv").absolute())
-
-    iguana_data_agg = janitor.collapse_levels(
-        iguana_data.drop(columns=['starttime', 'benchmarkID', 'format', 'run'])
-            .groupby(['triplestore', 'dataset', 'queryID', 'clientID'], as_index=False) \
-            .agg({
-            **{'qps': descriptive_stats,
-               'penalizedQPS': descriptive_stats,
-               'time': descriptive_stats,
-               'penalizedTime': descriptive_stats,
-               },
-            **{str(name): np.max for name in
-               ['contentLength', 'numberOfSolutions', 'numberOfBindings', 'wrongResult', 'fully_correct_result',
-                'parsingSucceeded']},
-            **{str(name): np.sum for name in
-               ['succeeded', 'failed', 'timeouts', 'unknownExceptions', 'wrongCodes']}
-        })
-    )
-    iguana_data_agg.rename(columns={name + "_amax": name for name in
-                                    ['contentLength', 'numberOfSolutions', 'numberOfBindings', 'wrongResult',
-                                     'fully_correct_result', 'parsingSucceeded']}, inplace=True)
-    iguana_data_agg.rename(columns={name + "_sum": name for name in
-                                    ['succeeded', 'failed', 'timeouts', 'unknownExceptions', 'wrongCodes']}, inplace=True)
-    iguana_data_agg.wrongResult = iguana_data_agg.apply(
-        lambda x: ~bool(x.succeeded) & x.wrongResult, axis=1).values
-    iguana_data_agg.to_csv(data_dir.joinpath("benchmarking_results_with_result_stats_agg.csv").absolute())
 
 if __name__ == '__main__':
     combine_data()
\ No newline at end of file
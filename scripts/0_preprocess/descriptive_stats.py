@@ -0,0 +1,299 @@
+"""
+Descriptive statistics (mean, std, min, 25th percentile, median, 75th percentile, max) of many groups at once.
+
+GroupStats computes the statistics of all groups in a few vectorized passes instead of calling a function per group.
+Mean, std, min and max are exact. The quantiles are exact as long as a GroupStats holds at most exact_limit values of
+a column: the values are sorted by group and value once, and the quantiles of all groups are read from the sorted
+array. The percentiles are interpolated linearly like Series.quantile, the median like GroupBy.median.
+A GroupStats with more values counts them per group in logarithmic buckets as in DDSketch (Masson et al., VLDB 2019):
+bucket i counts the values in (gamma^(i-1), gamma^i] with gamma = (1 + relative_accuracy) / (1 - relative_accuracy),
+zeros are counted in zero_bucket. Its quantiles are then within relative_accuracy (1%) of the order statistic at rank
+round(q * (n - 1)) of each group.
+
+A GroupStats is a partial aggregate: GroupStats of different parts of the data, e.g. of separate benchmark runs, can
+be merged, groups can be combined into coarser groups with regroup, and they are serialized to plain dicts with to_dict
+so that they can be stored as JSON.
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+stats_names = ['mean', 'std', 'min', 'percentile_25', 'median', 'percentile_75', 'max']
+percentiles = {'percentile_25': .25, 'percentile_75': .75}
+# values per column above which quantiles are estimated from buckets
+exact_limit = 2 ** 24
+moment_names = ['count', 'mean', 'var', 'min', 'max']
+relative_accuracy = 0.01
+# bucket index under which zeros are counted in bucket arrays, sorts before all other buckets
+zero_bucket = np.iinfo(np.int64).min
+
+
+def bucket_gamma(relative_accuracy: float = relative_accuracy) -> float:
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+
+def bucket_indices(values: np.ndarray, gamma: float) -> np.ndarray:
+    """The indices of the buckets of non-negative values. Zeros get zero_bucket."""
+    indices = np.full(len(values), zero_bucket, dtype=np.int64)
+    positive = values > 0
+    indices[positive] = np.ceil(np.log(values[positive]) / math.log(gamma)).astype(np.int64)
+    return indices
+
+
+def bucket_values(indices: np.ndarray, gamma: float) -> np.ndarray:
+    """The values reported for the buckets with the given indices."""
+    indices = np.asarray(indices)
+    zero = indices == zero_bucket
+    return np.where(zero, 0.0, 2 * gamma ** np.where(zero, 0, indices).astype(np.float64) / (gamma + 1))
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation exactly as numpy.quantile does it."""
+    diff_b_a = b - a
+    return np.where(t >= 0.5, b - diff_b_a * (1 - t), a + diff_b_a * t)
+
+
+def _exact_quantiles(codes: np.ndarray, values: np.ndarray, groups: int) -> Dict[str, np.ndarray]:
+    """Quantiles of values sorted by (codes, values) for each of groups."""
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    has_values = counts > 0
+    last = np.where(has_values, starts + counts - 1, 0)
+    quantiles = dict()
+    for name, q in percentiles.items():
+        virtual = (counts - 1) * q
+        previous = np.floor(virtual)
+        previous_index = np.minimum(starts + previous.astype(np.int64), last)
+        next_index = np.minimum(previous_index + 1, last)
+        result = _lerp(values[previous_index], values[next_index], virtual - previous) if len(values) else \
+            np.full(groups, np.nan)
+        quantiles[name] = np.where(has_values, result, np.nan)
+    lower = np.minimum(starts + (counts - 1) // 2, last)
+    upper = np.minimum(starts + counts // 2, last)
+    if len(values):
+        median = np.where(counts % 2 == 1, values[upper], (values[upper] + values[lower]) / 2)
+    else:
+        median = np.full(groups, np.nan)
+    quantiles['median'] = np.where(has_values, median, np.nan)
+    return quantiles
+
+
+def _bucket_quantiles(codes: np.ndarray, buckets: np.ndarray, counts: np.ndarray, groups: int,
+                      gamma: float) -> Dict[str, np.ndarray]:
+    """Quantiles of bucket counts sorted by (codes, buckets) for each of groups."""
+    group_counts = np.bincount(codes, weights=counts, minlength=groups).astype(np.int64)
+    cumulative = np.cumsum(counts)
+    group_starts = np.cumsum(group_counts) - group_counts
+    quantiles = dict()
+    for name, q in dict(percentiles, median=.5).items():
+        rank = np.rint(q * np.maximum(group_counts - 1, 0)).astype(np.int64)
+        bucket = np.searchsorted(cumulative, group_starts + rank, side='right')
+        bucket = np.minimum(bucket, max(len(buckets) - 1, 0))
+        result = bucket_values(buckets[bucket], gamma) if len(buckets) else np.full(groups, np.nan)
+        quantiles[name] = np.where(group_counts > 0, result, np.nan)
+    return quantiles
+
+
+class GroupStats:
+    def __init__(self, by: List[str], columns: List[str], keys: pd.DataFrame, moments: pd.DataFrame,
+                 values: Dict[str, tuple], buckets: Dict[str, tuple], exact_limit: int = exact_limit):
+        """
+        :param by: the columns identifying a group
+        :param columns: the columns which are described
+        :param keys: one row with the values of by per group, sorted
+        :param moments: count, mean, var, min and max per group of each column as column_moment
+        :param values: per column, the group codes and values sorted by both, for columns with exact quantiles
+        :param buckets: per column, the group codes, bucket indices and counts sorted by group and bucket, for the
+        other columns
+        :param exact_limit: values per column above which the column is counted in buckets
+        """
+        self.by = by
+        self.columns = columns
+        self.keys = keys
+        self.moments = moments
+        self.values = values
+        self.buckets = buckets
+        self.exact_limit = exact_limit
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, by: Sequence[str], columns: Sequence[str],
+                   exact_limit: int = exact_limit) -> "GroupStats":
+        """Aggregates the columns of data per group. Rows with a missing group key are ignored like by groupby."""
+        by, columns = list(by), list(columns)
+        grouped = data.groupby(by, sort=True)
+        keys = grouped.size().index.to_frame(index=False)
+        codes = grouped.ngroup().to_numpy()
+        moments = pd.DataFrame(index=keys.index)
+        values = dict()
+        for column in columns:
+            series = grouped[column]
+            moments[column + "_count"] = series.count().to_numpy(dtype=np.int64)
+            for name in moment_names[1:]:
+                moments[column + "_" + name] = getattr(series, name)().to_numpy(dtype=np.float64, na_value=np.nan)
+            column_values = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(column_values) & (codes >= 0)
+            column_codes, column_values = codes[valid], column_values[valid]
+            order = np.lexsort((column_values, column_codes))
+            values[column] = (column_codes[order], column_values[order])
+        stats = cls(by, columns, keys, moments, values, dict(), exact_limit)
+        stats._bucket_large_columns()
+        return stats
+
+    def _bucket_large_columns(self):
+        gamma = bucket_gamma()
+        for column, (codes, values) in list(self.values.items()):
+            if len(values) > self.exact_limit:
+                del self.values[column]
+                self.buckets[column] = self._count_buckets(codes, bucket_indices(values, gamma),
+                                                           np.ones(len(codes), dtype=np.int64))
+
+    @staticmethod
+    def _count_buckets(codes: np.ndarray, buckets: np.ndarray, counts: np.ndarray) -> tuple:
+        counted = pd.DataFrame({'code': codes, 'bucket': buckets, 'count': counts}) \
+            .groupby(['code', 'bucket'], sort=True)['count'].sum()
+        return (counted.index.get_level_values('code').to_numpy(), counted.index.get_level_values('bucket').to_numpy(),
+                counted.to_numpy())
+
+    def merge(self, other: "GroupStats") -> "GroupStats":
+        """A new GroupStats of the data of this one and other."""
+        if self.by != other.by or self.columns != other.columns:
+            raise ValueError("Only GroupStats of the same groups and columns can be merged.")
+        keys = pd.concat([self.keys, other.keys], ignore_index=True).drop_duplicates() \
+            .sort_values(self.by, ignore_index=True)
+        index = pd.MultiIndex.from_frame(keys)
+        remap_self = index.get_indexer(pd.MultiIndex.from_frame(self.keys))
+        remap_other = index.get_indexer(pd.MultiIndex.from_frame(other.keys))
+
+        moments = pd.DataFrame(index=keys.index)
+        for column in self.columns:
+            n_a, mean_a, var_a, min_a, max_a = self._aligned_moments(column, remap_self, len(keys))
+            n_b, mean_b, var_b, min_b, max_b = other._aligned_moments(column, remap_other, len(keys))
+            n = n_a + n_b
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(n_a == 0, mean_b, np.where(n_b == 0, mean_a, (n_a * mean_a + n_b * mean_b) / n))
+                m2 = np.nan_to_num(var_a * (n_a - 1)) + np.nan_to_num(var_b * (n_b - 1)) \
+                     + np.where((n_a > 0) & (n_b > 0), (mean_b - mean_a) ** 2 * n_a * n_b / n, 0.0)
+                var = np.where(n > 1, m2 / (n - 1), np.nan)
+            moments[column + "_count"] = n
+            moments[column + "_mean"] = mean
+            moments[column + "_var"] = var
+            moments[column + "_min"] = np.fmin(min_a, min_b)
+            moments[column + "_max"] = np.fmax(max_a, max_b)
+
+        values, buckets = dict(), dict()
+        gamma = bucket_gamma()
+        for column in self.columns:
+            if column in self.values and column in other.values:
+                codes = np.concatenate([remap_self[self.values[column][0]], remap_other[other.values[column][0]]])
+                column_values = np.concatenate([self.values[column][1], other.values[column][1]])
+                order = np.lexsort((column_values, codes))
+                values[column] = (codes[order], column_values[order])
+            else:
+                parts = [stats._column_buckets(column, remap, gamma)
+                         for stats, remap in [(self, remap_self), (other, remap_other)]]
+                buckets[column] = self._count_buckets(*[np.concatenate(part) for part in zip(*parts)])
+        merged = GroupStats(self.by, self.columns, keys, moments, values, buckets, self.exact_limit)
+        merged._bucket_large_columns()
+        return merged
+
+    def regroup(self, keys: pd.DataFrame, codes: np.ndarray, columns: Optional[Sequence[str]] = None) -> "GroupStats":
+        """
+        A new GroupStats of the given columns, all by default, with one group per row of keys, which must be sorted.
+        Group i of this GroupStats becomes part of group codes[i] of the new one or is left out if codes[i] is -1.
+        """
+        columns = list(self.columns if columns is None else columns)
+        codes = np.asarray(codes, dtype=np.int64)
+        groups = len(keys)
+        kept = codes >= 0
+        target = np.where(kept, codes, 0)
+        moments = pd.DataFrame(index=keys.index)
+        values, buckets = dict(), dict()
+        for column in columns:
+            n = np.where(kept, self.moments[column + "_count"].to_numpy(), 0)
+            has_values = n > 0
+            part_mean = np.where(has_values, self.moments[column + "_mean"].to_numpy(), 0.0)
+            count = np.bincount(target, weights=n, minlength=groups).astype(np.int64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, np.bincount(target, weights=n * part_mean, minlength=groups) / count,
+                                np.nan)
+                m2 = np.where(n > 1, self.moments[column + "_var"].to_numpy() * (n - 1), 0.0) \
+                     + np.where(has_values, n * (part_mean - mean[target]) ** 2, 0.0)
+                var = np.where(count > 1, np.bincount(target, weights=m2, minlength=groups) / (count - 1), np.nan)
+            minimum, maximum = np.full(groups, np.nan), np.full(groups, np.nan)
+            np.fmin.at(minimum, target[has_values], self.moments[column + "_min"].to_numpy()[has_values])
+            np.fmax.at(maximum, target[has_values], self.moments[column + "_max"].to_numpy()[has_values])
+            moments[column + "_count"] = count
+            moments[column + "_mean"] = mean
+            moments[column + "_var"] = var
+            moments[column + "_min"] = minimum
+            moments[column + "_max"] = maximum
+
+            if column in self.values:
+                column_codes, column_values = self.values[column]
+                column_codes = codes[column_codes]
+                valid = column_codes >= 0
+                column_codes, column_values = column_codes[valid], column_values[valid]
+                order = np.lexsort((column_values, column_codes))
+                values[column] = (column_codes[order], column_values[order])
+            else:
+                column_codes, bucket, counts = self.buckets[column]
+                column_codes = codes[column_codes]
+                valid = column_codes >= 0
+                buckets[column] = self._count_buckets(column_codes[valid], bucket[valid], counts[valid])
+        return GroupStats(list(keys.columns), columns, keys.reset_index(drop=True), moments.reset_index(drop=True),
+                          values, buckets, self.exact_limit)
+
+    def _aligned_moments(self, column: str, remap: np.ndarray, groups: int) -> List[np.ndarray]:
+        aligned = []
+        for name in moment_names:
+            moment = np.full(groups, 0 if name == 'count' else np.nan,
+                             dtype=np.int64 if name == 'count' else np.float64)
+            moment[remap] = self.moments[column + "_" + name].to_numpy()
+            aligned.append(moment)
+        return aligned
+
+    def _column_buckets(self, column: str, remap: np.ndarray, gamma: float) -> tuple:
+        if column in self.values:
+            codes, values = self.values[column]
+            return remap[codes], bucket_indices(values, gamma), np.ones(len(codes), dtype=np.int64)
+        codes, bucket, counts = self.buckets[column]
+        return remap[codes], bucket, counts
+
+    def describe(self) -> pd.DataFrame:
+        """The keys of all groups followed by the statistics of each column, named column_statistic."""
+        described = self.keys.copy()
+        groups = len(self.keys)
+        for column in self.columns:
+            if column in self.values:
+                quantiles = _exact_quantiles(*self.values[column], groups)
+            else:
+                quantiles = _bucket_quantiles(*self.buckets[column], groups, bucket_gamma())
+            described[column + "_mean"] = self.moments[column + "_mean"].to_numpy()
+            described[column + "_std"] = np.sqrt(self.moments[column + "_var"].to_numpy())
+            described[column + "_min"] = self.moments[column + "_min"].to_numpy()
+            for name in ['percentile_25', 'median', 'percentile_75']:
+                described[column + "_" + name] = quantiles[name]
+            described[column + "_max"] = self.moments[column + "_max"].to_numpy()
+        return described
+
+    def to_dict(self) -> dict:
+        return {"by": self.by,
+                "columns": self.columns,
+                "keys": {column: self.keys[column].tolist() for column in self.keys.columns},
+                "moments": {column: self.moments[column].tolist() for column in self.moments.columns},
+                "values": {column: [array.tolist() for array in arrays] for column, arrays in self.values.items()},
+                "buckets": {column: [array.tolist() for array in arrays] for column, arrays in self.buckets.items()},
+                "exact_limit": self.exact_limit}
+
+    @classmethod
+    def from_dict(cls, serialized: dict) -> "GroupStats":
+        keys = pd.DataFrame(serialized["keys"], columns=serialized["by"])
+        moments = pd.DataFrame(serialized["moments"], index=keys.index)
+        values = {column: (np.asarray(codes, dtype=np.int64), np.asarray(column_values, dtype=np.float64))
+                  for column, (codes, column_values) in serialized["values"].items()}
+        buckets = {column: tuple(np.asarray(array, dtype=np.int64) for array in arrays)
+                   for column, arrays in serialized["buckets"].items()}
+        return cls(serialized["by"], serialized["columns"], keys, moments, values, buckets,
+                   serialized.get("exact_limit", exact_limit))
@@ -0,0 +1,103 @@
+import heapq
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# bytes held in memory for each input byte while sorting a run (line objects, list and sort)
+_memory_overhead_factor = 4
+# maximum number of runs that are merged at once
+max_fan_in = 64
+
+
+def _normalized(line: bytes) -> bytes:
+    return line.rstrip(b"\r\n") + b"\n"
+
+
+def _byte_ranges(input_files: Iterable[Path], range_size: int) -> List[Tuple[str, int, int]]:
+    """Splits the input files into byte ranges of at most range_size bytes."""
+    ranges = []
+    for input_file in input_files:
+        file_size = input_file.stat().st_size
+        for start in range(0, file_size, range_size):
+            ranges.append((str(input_file), start, min(start + range_size, file_size)))
+    return ranges
+
+
+def _read_range(input_file: str, start: int, end: int) -> Iterator[bytes]:
+    """Yields all lines starting within [start, end)."""
+    with open(input_file, 'rb') as file:
+        if start > 0:
+            # skip the line that starts before the range
+            file.seek(start - 1)
+            file.readline()
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            yield line
+
+
+def _write_run(lines: Iterable[bytes], run_dir: str) -> str:
+    fd, run_file = tempfile.mkstemp(suffix=".run", dir=run_dir)
+    with os.fdopen(fd, 'wb') as run:
+        run.writelines(lines)
+    return run_file
+
+
+def _sort_range(input_file: str, start: int, end: int, run_dir: str,
+                transform: Optional[Callable[[bytes], bytes]] = None) -> str:
+    """Sorts and deduplicates the lines of one byte range into a run file."""
+    lines = _read_range(input_file, start, end)
+    if transform is not None:
+        lines = map(transform, lines)
+    lines = {_normalized(line) for line in lines if line.strip()}
+    return _write_run(sorted(lines), run_dir)
+
+
+def _unique(lines: Iterable[bytes]) -> Iterator[bytes]:
+    previous = None
+    for line in lines:
+        if line != previous:
+            yield line
+            previous = line
+
+
+def _merge_runs(run_files: List[str]) -> Iterator[bytes]:
+    with ExitStack() as stack:
+        runs = [stack.enter_context(open(run_file, 'rb')) for run_file in run_files]
+        yield from _unique(heapq.merge(*runs))
+
+
+def sorted_unique_lines(input_files: Iterable[Path], tmp_dir: Path, memory_budget: int,
+                        workers: int = None, transform: Optional[Callable[[bytes], bytes]] = None) -> Iterator[bytes]:
+    """
+    External merge sort of all lines of input_files in byte order. Each distinct line is yielded exactly once and
+    ends with a single newline. Blank lines are dropped. If given, transform is applied to each line before sorting.
+    It must be a module level function, as it is passed to the worker processes.
+
+    The input is split into byte ranges which are sorted in parallel into run files in tmp_dir. The ranges are sized
+    such that all workers together stay within memory_budget bytes. The runs are k-way merged, in several passes if
+    there are more than max_fan_in runs.
+    """
+    workers = workers or os.cpu_count() or 1
+    range_size = max(memory_budget // (workers * _memory_overhead_factor), 1)
+    ranges = _byte_ranges(input_files, range_size)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            run_files = list(executor.map(_sort_range, *zip(*ranges), [run_dir] * len(ranges),
+                                          [transform] * len(ranges))) if ranges else []
+
+        while len(run_files) > max_fan_in:
+            merged_run_files = []
+            for i in range(0, len(run_files), max_fan_in):
+                group = run_files[i:i + max_fan_in]
+                merged_run_files.append(_write_run(_merge_runs(group), run_dir))
+                for run_file in group:
+                    os.remove(run_file)
+            run_files = merged_run_files
+
+        yield from _merge_runs(run_files)
@@ -1,15 +1,42 @@
 import click
 import csv
+import sys
 from pathlib import Path
+from typing import Optional, Tuple
+
+from nt_dataset_stats import default_precision, dump_stats, stats_fieldnames
+
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+from util.profiling import profile_option, profiler
+
+
+def _parse_dump(value: str) -> Tuple[str, Path]:
+    dataset, separator, dump = value.partition("=")
+    if not separator or not dataset or not Path(dump).is_file():
+        raise click.BadParameter("expected DATASET=PATH of an existing N-Triples file, got '{}'".format(value))
+    return dataset, Path(dump)
 
 
 @click.command()
 @click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True),
               help="Where the data and raw_data directories are located.")
-def extract_dataset_stats(base_dir: Path):
-    """Simple program that greets NAME for a total of COUNT times."""
+@click.option("--dump", "dumps", multiple=True, callback=lambda ctx, param, values: [_parse_dump(v) for v in values],
+              metavar="DATASET=PATH",
+              help="Compute the statistics of DATASET from its N-Triples dump at PATH, which may be compressed with "
+                   "gzip, bzip2 or xz, instead of taking them from the hypertrie node stats. Can be repeated.")
+@click.option("--memory-budget", default=1024, type=click.IntRange(min=1),
+              help="Memory in MiB per process for counting distinct terms of dumps exactly. Beyond it, the counts "
+                   "are estimated with HyperLogLog sketches.")
+@click.option("--hll-precision", default=default_precision, type=click.IntRange(min=4, max=18),
+              help="Precision of the HyperLogLog sketches, their relative standard error is 1.04 / sqrt(2^precision).")
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes parsing a dump. Defaults to the number of CPUs.")
+@profile_option
+def extract_dataset_stats(base_dir: Path, dumps: Tuple[Tuple[str, Path], ...], memory_budget: int, hll_precision: int,
+                          workers: Optional[int]):
+    """Writes the number of subjects, predicates, objects and statements of each dataset to data/dataset_stats.tsv."""
     raw_data_dir = base_dir.joinpath("raw_data/hypertrie_node_stats")
-    if not raw_data_dir.exists():
+    if not raw_data_dir.exists() and not dumps:
         click.echo("There must be a raw_data folder provided in the base-dir. "
                    "By default the current working directory is used. "
                    "You can use another base-dir by providing the cmd arg '--base-dir <path>'.",
@@ -23,14 +50,13 @@ def extract_dataset_stats(base_dir: Path):
 
     with open(output_file, "w", newline="") as f:
         csv_writer = csv.DictWriter(f,
-                                    fieldnames=["dataset",
-                                                "subjects",
-                                                "predicates",
-                                                "objects",
-                                                "statements"],
+                                    fieldnames=stats_fieldnames,
                                     delimiter="\t")
         csv_writer.writeheader()
-        for dataset in ["swdf", "dbpedia2015", "watdiv10000", "wikidata-2020-11-11"]:
+        dump_datasets = {dataset for dataset, _ in dumps}
+        node_stats_datasets = ["swdf", "dbpedia2015", "watdiv10000", "wikidata-2020-11-11"] \
+            if raw_data_dir.exists() else []
+        for dataset in [dataset for dataset in node_stats_datasets if dataset not in dump_datasets]:
             raw_data_file = raw_data_dir.joinpath(f"{dataset}").joinpath("depth_3_nodes_stats.tsv")
             with open(raw_data_file, "r", newline="") as input_file:
                 csv_reader = csv.DictReader(input_file,
@@ -43,6 +69,13 @@ def extract_dataset_stats(base_dir: Path):
                     "objects": line["dimension_3_size"],
                     "statements": line["node_size"]
                 })
+        for dataset, dump in dumps:
+            with profiler.step("dump stats") as step:
+                counters = dump_stats(dump, memory_budget * 2 ** 20, workers, hll_precision)
+                step.rows_out = counters.counters["statements"].count()
+            if not counters.is_exact:
+                click.echo("The counts of {} are estimated with HyperLogLog sketches.".format(dataset), err=True)
+            csv_writer.writerow({"dataset": dataset, **counters.counts()})
     # todo: (optional) add number of queries
 
 
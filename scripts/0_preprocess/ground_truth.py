@@ -0,0 +1,128 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+ground_truth_columns = ['dataset', 'queryID', 'numberOfSolutions', 'numberOfBindings', 'non_tentris_sparql']
+
+
+def _is_empty_result(nos: pd.Series, nob: pd.Series) -> np.ndarray:
+    """True where a result has exactly one solution without bindings, i.e. an empty result as tentris reports it."""
+    return ((nos == 1) & (nob == 0)).to_numpy(dtype=bool, na_value=False)
+
+
+def _majority_vote(votes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Picks the most frequent (numberOfSolutions, numberOfBindings) pair per (dataset, queryID).
+    Ties are broken by the smallest pair, like DataFrame.value_counts() does.
+    """
+    counts = (votes.dropna(subset=['numberOfSolutions', 'numberOfBindings'])
+              .groupby(['dataset', 'queryID', 'numberOfSolutions', 'numberOfBindings'], sort=True)
+              .size()
+              .rename('votes')
+              .reset_index())
+    counts = counts.sort_values(['dataset', 'queryID', 'votes'], ascending=[True, True, False], kind='stable')
+    return counts.drop_duplicates(['dataset', 'queryID']).drop(columns='votes')
+
+
+def resolve_ground_truth(iguana_data: pd.DataFrame, datasets: Sequence[str]) -> pd.DataFrame:
+    """
+    Computes the expected result size of every query of every dataset in one pass over iguana_data.
+
+    The expected size is the unanimous size if all successful executions agree. Otherwise, fuseki's size is used if
+    fuseki answered the query, else the majority vote over the latest tentris version and all other triple stores.
+    non_tentris_sparql marks queries for which the latest tentris version reports an empty result while the expected
+    result is not empty. Rows are ordered by dataset (in the order of datasets) and first appearance of the queryID.
+    """
+    keys = iguana_data[['dataset', 'queryID']].drop_duplicates()
+    keys = keys.assign(dataset_rank=pd.Categorical(keys['dataset'], categories=list(datasets)).codes) \
+        .sort_values('dataset_rank', kind='stable') \
+        .drop(columns='dataset_rank')
+
+    succeeded = iguana_data['succeeded'].to_numpy(dtype=bool, na_value=False)
+    valid = iguana_data.loc[succeeded & iguana_data['numberOfSolutions'].notna().to_numpy(),
+                            ['dataset', 'queryID', 'triplestore', 'numberOfSolutions', 'numberOfBindings']]
+
+    query_stats = valid.groupby(['dataset', 'queryID']).agg(
+        max_nos=('numberOfSolutions', 'max'), n_nos=('numberOfSolutions', 'nunique'),
+        max_nob=('numberOfBindings', 'max'), n_nob=('numberOfBindings', 'nunique'))
+
+    # the result of each triple store is the one with the most solutions
+    store_results = valid.groupby(['dataset', 'queryID', 'triplestore'], as_index=False) \
+        .agg({'numberOfSolutions': 'max', 'numberOfBindings': 'max'})
+    is_fuseki = (store_results['triplestore'] == 'fuseki').to_numpy(dtype=bool, na_value=False)
+    is_tentris = store_results['triplestore'].str.startswith('tentris').to_numpy(dtype=bool, na_value=False)
+
+    fuseki_results = store_results[is_fuseki].set_index(['dataset', 'queryID'])
+    # only the latest tentris version per query takes part in the vote
+    tentris_results = store_results[is_tentris] \
+        .sort_values('triplestore', ascending=False, kind='stable') \
+        .drop_duplicates(['dataset', 'queryID'])
+    votes = pd.concat([tentris_results, store_results[~is_tentris & ~is_fuseki]])
+    majority = _majority_vote(votes).set_index(['dataset', 'queryID'])
+    tentris_results = tentris_results.set_index(['dataset', 'queryID'])
+
+    result = keys.join(query_stats, on=['dataset', 'queryID']) \
+        .join(fuseki_results[['numberOfSolutions', 'numberOfBindings']].add_prefix('fuseki_'),
+              on=['dataset', 'queryID']) \
+        .join(majority.add_prefix('majority_'), on=['dataset', 'queryID']) \
+        .join(tentris_results[['numberOfSolutions', 'numberOfBindings']].add_prefix('tentris_'),
+              on=['dataset', 'queryID'])
+
+    has_result = result['n_nos'].notna().to_numpy()
+    unanimous = ((result['n_nos'] == 1) & (result['n_nob'] == 1)).to_numpy(dtype=bool, na_value=False)
+    has_fuseki = result['fuseki_numberOfSolutions'].notna().to_numpy()
+    has_tentris = result['tentris_numberOfSolutions'].notna().to_numpy()
+
+    nos = result['majority_numberOfSolutions'].where(~has_fuseki, result['fuseki_numberOfSolutions']) \
+        .where(~unanimous, result['max_nos'])
+    nob = result['majority_numberOfBindings'].where(~has_fuseki, result['fuseki_numberOfBindings']) \
+        .where(~unanimous, result['max_nob'])
+
+    non_tentris_sparql = has_result & ~unanimous & has_tentris \
+                         & _is_empty_result(result['tentris_numberOfSolutions'], result['tentris_numberOfBindings']) \
+                         & ~_is_empty_result(nos, nob)
+
+    return pd.DataFrame({'dataset': result['dataset'].to_numpy(),
+                         'queryID': result['queryID'].to_numpy(),
+                         'numberOfSolutions': nos.where(has_result).to_numpy(),
+                         'numberOfBindings': nob.where(has_result).to_numpy(),
+                         'non_tentris_sparql': non_tentris_sparql},
+                        columns=ground_truth_columns).convert_dtypes()
+
+
+def classify_results(iguana_data: pd.DataFrame, ground_truth: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compares the result sizes of all executions in iguana_data to the ground truth.
+
+    Adds wrongResult, which marks results whose number of solutions or bindings is off by more than 10%, unless both
+    the result and the expected result have at most ten solutions and the same number of bindings, and
+    fully_correct_result. Executions with a wrong result do not count as succeeded, and their time and qps are removed.
+    """
+    x = iguana_data.merge(ground_truth.rename(columns={'numberOfSolutions': 'numberOfSolutions_corr',
+                                                       'numberOfBindings': 'numberOfBindings_corr'}),
+                          how='left', on=['dataset', 'queryID'])
+
+    x['wrongResult'] = (
+            (# not close to correct number of solutions
+            (~np.isclose(x.numberOfSolutions.astype('float64'), x.numberOfSolutions_corr.astype('float64'),
+                         rtol=0.1) | ~np.isclose(x.numberOfBindings.astype('float64'),
+                                                 x.numberOfBindings_corr.astype('float64'), rtol=0.1))
+            &
+            # not less than ten solutions
+            ~(
+                    (np.less_equal(x.numberOfSolutions, 10) & np.greater_equal(x.numberOfSolutions,
+                                                                               0) & np.less_equal(
+                        x.numberOfSolutions_corr, 10) & np.greater_equal(x.numberOfSolutions_corr, 0)) &
+                    (x.numberOfBindings == x.numberOfBindings_corr)
+            ))
+    )
+
+    x["wrongResult"] = x["wrongResult"].fillna(False)
+    x['fully_correct_result'] = (x.numberOfSolutions == x.numberOfSolutions_corr) & (
+            x.numberOfBindings == x.numberOfBindings_corr)
+    x['succeeded'] = (x.succeeded & ~x.wrongResult).astype(np.int64)
+    x.drop(columns=["numberOfSolutions_corr", "numberOfBindings_corr"], inplace=True)
+    if 'time' in x.columns:
+        x.loc[x.succeeded == False, ['time', 'qps']] = None
+    return x
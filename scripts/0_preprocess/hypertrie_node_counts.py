@@ -0,0 +1,393 @@
+"""
+Simulated node counts of the hypertrie variants for a triple dataset, written like the node stats of the C++ store to
+raw_data/hypertrie_node_stats/<dataset>/depth_<depth>_node_count_comparison.tsv.
+
+A hypertrie of depth 3 has a node of depth 2 for each term at each position and a node of depth 1 for each pair of
+terms at two positions that occur in a triple together. The variants differ in how the nodes are stored:
+- baseline: every node is stored.
+- compression: nodes with a single entry are stored as compressed nodes. Their children are not materialized, so a
+  node of depth 1 only exists if one of its two parents has more than one entry.
+- hash: nodes with the same entries are stored once, also if they belong to different positions.
+- hash+compression: both of the above.
+- hash+compression+inline: like hash+compression, but compressed nodes of depth 1 are inlined into their parents.
+
+Terms are encoded as 64-bit hashes, so that no dictionary of the terms has to be kept in memory. The nodes are counted
+with sorts over the triples, never with an object per node. The distinct triples are passed through bucket files once
+per node kind, each time partitioned by the terms fixed by that kind, so that each bucket fits into the memory budget.
+A node with the same entries is recognized by a 64-bit fingerprint of its entries, the sum of their hashes.
+
+Frequent terms such as rdf:type fill a bucket of their own beyond the memory budget. A bucket with more rows than fit
+into the budget is therefore read in parts. The keys with many rows in a part are heavy: their nodes have more than one
+entry, so their entry hashes are summed part by part. The rows of the other keys are split into further buckets with
+another hash.
+"""
+import csv
+import math
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+import numpy as np
+
+from nt_dataset_stats import _hash, map_dump_lines, parse_triple
+
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+from util.profiling import profile_option, profiler
+
+variants = ['baseline', 'compression', 'hash', 'hash+compression', 'hash+compression+inline']
+node_count_fieldnames = ["hypertrie_type", "uncompressed_nodes", "compressed_nodes"]
+# bytes held in memory per triple of a bucket (triple, flags, sort order and temporaries)
+_bytes_per_row = 128
+# column of the flags of a triple: bit i is set if the node of depth 2 of its term at position i has a single entry
+_flags = 3
+_columns = 4
+# seeds of the fingerprints of entries of nodes of depth 1 and 2
+_seed_1 = np.uint64(0x5851F42D4C957F2D)
+_seed_2 = np.uint64(0x14057B7EF767814F)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, a bijective mixing of uint64 values."""
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class _Buckets:
+    """Rows of uint64 columns distributed over bucket files."""
+
+    def __init__(self, directory: Path, name: str, buckets: int, columns: int, seed: int = 0):
+        self.files = [directory.joinpath("{}_{:04d}.bin".format(name, bucket)) for bucket in range(buckets)]
+        self.columns = columns
+        # buckets split further use another seed, so that their keys are distributed independently
+        self.seed = seed
+
+    def add(self, keys: np.ndarray, rows: np.ndarray):
+        """Appends each row to the bucket of its key."""
+        buckets = ((_mix(keys ^ np.uint64(self.seed)) >> np.uint64(32)) % np.uint64(len(self.files))).astype(np.int64)
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange(len(self.files) + 1))
+        for bucket, file in enumerate(self.files):
+            if bounds[bucket] < bounds[bucket + 1]:
+                with open(file, 'ab') as bucket_file:
+                    np.ascontiguousarray(rows[order[bounds[bucket]:bounds[bucket + 1]]]).tofile(bucket_file)
+
+    def read(self, capacity: int, key: Callable[[np.ndarray], np.ndarray]) -> Iterator[Tuple[np.ndarray, bool]]:
+        """
+        The rows of each non-empty bucket with all rows of the same key, in arrays of at most capacity rows, unless
+        they are marked as heavy. The rows of a heavy key are spread over several arrays, but a heavy key has at least
+        two rows. Each bucket file is removed once it was read.
+        """
+        for file in self.files:
+            if file.exists():
+                yield from self._read_file(file, capacity, key)
+                file.unlink()
+
+    def _read_file(self, file: Path, capacity: int, key: Callable[[np.ndarray], np.ndarray]) \
+            -> Iterator[Tuple[np.ndarray, bool]]:
+        row_count = file.stat().st_size // (8 * self.columns)
+        if row_count <= capacity:
+            yield np.fromfile(file, dtype=np.uint64).reshape(-1, self.columns), False
+            return
+        rows = np.memmap(file, dtype=np.uint64, mode='r', shape=(row_count, self.columns))
+        starts = range(0, row_count, capacity)
+        # a key with more than capacity rows has more than threshold rows in one of the parts, the other keys have at
+        # most capacity rows in all parts together
+        threshold = max(capacity // len(starts), 1)
+        heavy = []
+        for start in starts:
+            keys, counts = np.unique(key(rows[start:start + capacity]), return_counts=True)
+            heavy.append(keys[counts > threshold])
+        heavy = np.unique(np.concatenate(heavy))
+        split = _Buckets(file.parent, file.stem + "_split", math.ceil(2 * row_count / capacity), self.columns,
+                         self.seed + 1)
+        for start in starts:
+            part = np.array(rows[start:start + capacity])
+            keys = key(part)
+            is_heavy = np.isin(keys, heavy)
+            if is_heavy.any():
+                yield part[is_heavy], True
+            split.add(keys[~is_heavy], part[~is_heavy])
+        del rows
+        yield from split.read(capacity, key)
+
+
+def _encode_lines(lines: Iterable[bytes]) -> np.ndarray:
+    triples = [tuple(map(_hash, triple)) for triple in filter(None, map(parse_triple, lines))]
+    return np.array(triples, dtype=np.uint64).reshape(-1, 3)
+
+
+def encoded_triples(dataset: Path, workers: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    The triples of dataset as arrays of shape (n, 3) of uint64 term ids. dataset is either an N-Triples dump or a .npy
+    file with an array of encoded triples.
+    """
+    if dataset.suffix == ".npy":
+        triples = np.load(dataset, mmap_mode='r')
+        for start in range(0, len(triples), 2 ** 20):
+            yield np.asarray(triples[start:start + 2 ** 20], dtype=np.uint64)
+    else:
+        yield from map_dump_lines(_encode_lines, dataset, workers=workers)
+
+
+def _group_bounds(*keys: np.ndarray) -> np.ndarray:
+    """Start offsets of the runs of equal keys in sorted keys, followed by their total length."""
+    changes = np.zeros(len(keys[0]), dtype=bool)
+    if len(changes):
+        changes[0] = True
+    for key in keys:
+        changes[1:] |= key[1:] != key[:-1]
+    return np.append(np.flatnonzero(changes), len(changes))
+
+
+def _distinct_rows(buckets: _Buckets, capacity: int, key: Callable[[np.ndarray], np.ndarray]) -> Iterator[np.ndarray]:
+    """
+    The distinct rows of buckets, in arrays without common rows. The rows of a heavy key are copies of the same row,
+    so the few distinct rows of the heavy keys are collected and returned last.
+    """
+    heavy_rows = [np.empty((0, buckets.columns), dtype=np.uint64)]
+    for rows, heavy in buckets.read(capacity, key):
+        if heavy:
+            heavy_rows.append(np.unique(rows, axis=0))
+        else:
+            yield np.unique(rows, axis=0)
+    yield np.unique(np.concatenate(heavy_rows), axis=0)
+
+
+def _fingerprints(entry_hashes: np.ndarray, bounds: np.ndarray, single: np.ndarray) -> np.ndarray:
+    """Fingerprints of the sets of entries of the groups, the lowest bit marks groups with a single entry."""
+    sums = np.add.reduceat(entry_hashes, bounds[:-1]) if len(entry_hashes) else np.empty(0, dtype=np.uint64)
+    return (_mix(sums) & ~np.uint64(1)) | single.astype(np.uint64)
+
+
+class _NodeCounter:
+    def __init__(self, directory: Path, buckets: int, capacity: int):
+        self.buckets = buckets
+        self.capacity = capacity
+        self.counts: Dict[str, int] = dict.fromkeys(
+            ["triples", "depth_2", "depth_2_single", "depth_1", "depth_1_single", "depth_1_unreachable"], 0)
+        # fingerprints of the nodes of depth 2, of depth 1 and of the reachable nodes of depth 1
+        self.fingerprints = {name: _Buckets(directory, name, buckets, 1)
+                             for name in ["depth_2", "depth_1", "depth_1_reachable"]}
+        # sums of the entry hashes of the nodes of heavy keys, which are added in parts, by their fixed terms
+        self.part_sums: Dict[tuple, int] = dict()
+
+    def _add_fingerprints(self, name: str, fingerprints: np.ndarray):
+        self.fingerprints[name].add(fingerprints, fingerprints.reshape(-1, 1))
+
+    def count_depth_2(self, rows: np.ndarray, position: int) -> np.ndarray:
+        """Counts the nodes of depth 2 of position and marks the triples of nodes with a single entry."""
+        first, second = [other for other in range(3) if other != position]
+        rows = rows[np.argsort(rows[:, position], kind='stable')]
+        bounds = _group_bounds(rows[:, position])
+        sizes = np.diff(bounds)
+        single = sizes == 1
+        self.counts["depth_2"] += len(sizes)
+        self.counts["depth_2_single"] += int(np.count_nonzero(single))
+        entries = _mix(_mix(rows[:, first] ^ _seed_2) ^ rows[:, second])
+        self._add_fingerprints("depth_2", _fingerprints(entries, bounds, single))
+        rows[np.repeat(single, sizes), _flags] |= np.uint64(1 << position)
+        return rows
+
+    def count_depth_1(self, rows: np.ndarray, positions: Tuple[int, int]):
+        """Counts the nodes of depth 1 that fix the terms at positions."""
+        first, second = positions
+        remaining = 3 - first - second
+        rows = rows[np.lexsort((rows[:, second], rows[:, first]))]
+        bounds = _group_bounds(rows[:, first], rows[:, second])
+        sizes = np.diff(bounds)
+        single = sizes == 1
+        # a node with a single entry is only reachable if one of its parents has more than one entry
+        parents_single = np.uint64((1 << first) | (1 << second))
+        unreachable = single & ((rows[bounds[:-1], _flags] & parents_single) == parents_single)
+        self.counts["depth_1"] += len(sizes)
+        self.counts["depth_1_single"] += int(np.count_nonzero(single))
+        self.counts["depth_1_unreachable"] += int(np.count_nonzero(unreachable))
+        fingerprints = _fingerprints(_mix(rows[:, remaining] ^ _seed_1), bounds, single)
+        self._add_fingerprints("depth_1", fingerprints)
+        self._add_fingerprints("depth_1_reachable", fingerprints[~unreachable])
+
+    def add_part(self, rows: np.ndarray, fixed: Tuple[int, ...]):
+        """Adds a part of the entries of nodes with more than one entry that fix the terms at the positions fixed."""
+        remaining = [position for position in range(3) if position not in fixed]
+        if len(remaining) == 1:
+            entries = _mix(rows[:, remaining[0]] ^ _seed_1)
+        else:
+            entries = _mix(_mix(rows[:, remaining[0]] ^ _seed_2) ^ rows[:, remaining[1]])
+        order = np.lexsort([rows[:, position] for position in reversed(fixed)])
+        rows, entries = rows[order], entries[order]
+        bounds = _group_bounds(*[rows[:, position] for position in fixed])
+        sums = np.add.reduceat(entries, bounds[:-1])
+        for terms, entry_sum in zip(rows[bounds[:-1]][:, list(fixed)].tolist(), sums.tolist()):
+            terms = tuple(terms)
+            self.part_sums[terms] = (self.part_sums.get(terms, 0) + entry_sum) % 2 ** 64
+
+    def count_parts(self, depth: int):
+        """Counts the nodes of depth whose entries were added with add_part."""
+        name = "depth_{}".format(depth)
+        fingerprints = _mix(np.array(list(self.part_sums.values()), dtype=np.uint64)) & ~np.uint64(1)
+        self.counts[name] += len(fingerprints)
+        self._add_fingerprints(name, fingerprints)
+        if depth == 1:
+            self._add_fingerprints("depth_1_reachable", fingerprints)
+        self.part_sums.clear()
+
+    def distinct(self, name: str) -> Tuple[int, int]:
+        """The number of distinct fingerprints with more than one and with a single entry."""
+        multiple, single = 0, 0
+        for rows in _distinct_rows(self.fingerprints[name], self.capacity, lambda rows: rows[:, 0]):
+            fingerprints = rows[:, 0]
+            single_fingerprints = int(np.count_nonzero(fingerprints & np.uint64(1)))
+            single += single_fingerprints
+            multiple += len(fingerprints) - single_fingerprints
+        return multiple, single
+
+
+def count_nodes(triples: Iterable[np.ndarray], tmp_dir: Path, memory_budget: int,
+                expected_triples: int) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """
+    The uncompressed and compressed nodes per depth and variant of the distinct triples. expected_triples is used to
+    size the buckets such that each fits into memory_budget bytes.
+    """
+    buckets = max(math.ceil(expected_triples * _bytes_per_row / memory_budget), 1)
+    capacity = max(memory_budget // _bytes_per_row, 2)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        directory = Path(directory)
+        counter = _NodeCounter(directory, buckets, capacity)
+        fixed_positions = [(0,), (1,), (2,), (0, 1), (0, 2), (1, 2)]
+
+        def triple_key(rows: np.ndarray) -> np.ndarray:
+            return _mix(_mix(_mix(rows[:, 0]) ^ rows[:, 1]) ^ rows[:, 2])
+
+        def partition_key(rows: np.ndarray, step: int) -> np.ndarray:
+            fixed = fixed_positions[step]
+            key = rows[:, fixed[0]]
+            for position in fixed[1:]:
+                key = _mix(key) ^ rows[:, position]
+            return key
+
+        def pass_key(step: int) -> Callable[[np.ndarray], np.ndarray]:
+            return lambda rows: partition_key(rows, step)
+
+        # partitioned by the whole triple to remove duplicates
+        passes = [_Buckets(directory, "pass_{}".format(i), buckets, _columns) for i in range(7)]
+        with profiler.step("encode") as profiled:
+            encoded = 0
+            for chunk in triples:
+                rows = np.zeros((len(chunk), _columns), dtype=np.uint64)
+                rows[:, :3] = chunk
+                passes[0].add(triple_key(rows), rows)
+                encoded += len(chunk)
+            profiled.rows_out = encoded
+
+        counts = counter.counts
+        with profiler.step("deduplicate", rows_in=encoded) as profiled:
+            for rows in _distinct_rows(passes[0], capacity, triple_key):
+                counts["triples"] += len(rows)
+                passes[1].add(partition_key(rows, 0), rows)
+            profiled.rows_out = counts["triples"]
+        with profiler.step("depth 2", rows_in=3 * counts["triples"]) as profiled:
+            for position in range(3):
+                for rows, heavy in passes[1 + position].read(capacity, pass_key(position)):
+                    if heavy:
+                        counter.add_part(rows, fixed_positions[position])
+                    else:
+                        rows = counter.count_depth_2(rows, position)
+                    passes[2 + position].add(partition_key(rows, 1 + position), rows)
+                counter.count_parts(2)
+            profiled.rows_out = counts["depth_2"]
+        with profiler.step("depth 1", rows_in=3 * counts["triples"]) as profiled:
+            for step, positions in enumerate([(0, 1), (0, 2), (1, 2)]):
+                for rows, heavy in passes[4 + step].read(capacity, pass_key(3 + step)):
+                    if heavy:
+                        counter.add_part(rows, positions)
+                    else:
+                        counter.count_depth_1(rows, positions)
+                    if step < 2:
+                        passes[5 + step].add(partition_key(rows, 4 + step), rows)
+                counter.count_parts(1)
+            profiled.rows_out = counts["depth_1"]
+
+        distinct = dict()
+        for name, nodes in [("depth_2", counts["depth_2"]), ("depth_1", counts["depth_1"]),
+                            ("depth_1_reachable", counts["depth_1"] - counts["depth_1_unreachable"])]:
+            with profiler.step("distinct " + name, rows_in=nodes) as profiled:
+                distinct[name] = counter.distinct(name)
+                profiled.rows_out = sum(distinct[name])
+        depth_2_hash, depth_1_hash, depth_1_reachable = \
+            distinct["depth_2"], distinct["depth_1"], distinct["depth_1_reachable"]
+
+    triples = counts["triples"]
+    root = (1, 0) if triples > 1 else (0, 1) if triples == 1 else (0, 0)
+    root_uncompressed = (1, 0) if triples else (0, 0)
+    depth_1_compressed = counts["depth_1_single"] - counts["depth_1_unreachable"]
+    return {
+        3: {'baseline': root_uncompressed, 'compression': root, 'hash': root_uncompressed, 'hash+compression': root,
+            'hash+compression+inline': root},
+        2: {'baseline': (counts["depth_2"], 0),
+            'compression': (counts["depth_2"] - counts["depth_2_single"], counts["depth_2_single"]),
+            'hash': (sum(depth_2_hash), 0),
+            'hash+compression': depth_2_hash,
+            'hash+compression+inline': depth_2_hash},
+        1: {'baseline': (counts["depth_1"], 0),
+            'compression': (counts["depth_1"] - counts["depth_1_single"], depth_1_compressed),
+            'hash': (sum(depth_1_hash), 0),
+            'hash+compression': depth_1_reachable,
+            'hash+compression+inline': (depth_1_reachable[0], 0)},
+    }
+
+
+def write_node_counts(node_counts: Dict[int, Dict[str, Tuple[int, int]]], output_dir: Path) -> List[Path]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_files = []
+    for depth, depth_counts in sorted(node_counts.items()):
+        output_file = output_dir.joinpath("depth_{}_node_count_comparison.tsv".format(depth))
+        with open(output_file, "w", newline="") as f:
+            csv_writer = csv.DictWriter(f, fieldnames=node_count_fieldnames, delimiter="\t")
+            csv_writer.writeheader()
+            for variant in variants:
+                uncompressed, compressed = depth_counts[variant]
+                csv_writer.writerow({"hypertrie_type": variant, "uncompressed_nodes": uncompressed,
+                                     "compressed_nodes": compressed})
+        output_files.append(output_file)
+    return output_files
+
+
+def _expected_triples(dataset: Path) -> int:
+    if dataset.suffix == ".npy":
+        return len(np.load(dataset, mmap_mode='r'))
+    # N-Triples lines are rarely shorter than 64 bytes, compressed dumps are about ten times smaller
+    factor = 1 if dataset.suffix not in [".gz", ".bz2", ".xz"] else 10
+    return dataset.stat().st_size * factor // 64
+
+
+@click.command()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True, path_type=Path),
+              help="Where the data and raw_data directories are located.")
+@click.option("--dataset", "dataset_name", required=True,
+              help="Name of the dataset, the node counts are written to raw_data/hypertrie_node_stats/<name>.")
+@click.option("--input", "dataset", required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="N-Triples dump of the dataset, optionally compressed with gzip, bzip2 or xz, or a .npy file with "
+                   "an array of shape (n, 3) of integer encoded triples.")
+@click.option("--memory-budget", default=1024, type=click.IntRange(min=1),
+              help="Memory in MiB for counting the nodes of one bucket of triples.")
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes parsing the dump. Defaults to the number of CPUs.")
+@profile_option
+def hypertrie_node_counts(base_dir: Path, dataset_name: str, dataset: Path, memory_budget: int,
+                          workers: Optional[int]):
+    output_dir = base_dir.joinpath("raw_data/hypertrie_node_stats").joinpath(dataset_name)
+    tmp_dir = base_dir.joinpath("raw_data")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    node_counts = count_nodes(encoded_triples(dataset, workers), tmp_dir, memory_budget * 2 ** 20,
+                              _expected_triples(dataset))
+    for output_file in write_node_counts(node_counts, output_dir):
+        click.echo("Node counts were written to {}".format(output_file))
+
+
+if __name__ == '__main__':
+    hypertrie_node_counts()
@@ -0,0 +1,315 @@
+"""
+Streaming conversion of raw IGUANA N-Triples result files into the per-query-execution CSV that
+iguanaresult2csv writes as `*_each_query.csv`.
+
+The triples are read once. IRIs are interned into integer ids. A row is written as soon as a query execution
+resource has all its properties and the worker, task, connection and dataset it belongs to are known. Executions
+whose context is not yet known wait on the first missing resource and are retried when a triple about that resource
+arrives. Once its row is written, an execution is evicted with its parent link and its interned IRI. Only its run
+number stays with its query resource, so that duplicate descriptions of the execution, e.g. from repeated input files,
+are dropped. Memory is thus proportional to the open resources, not to the whole graph.
+"""
+import csv
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, TextIO, Tuple, Union
+
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+IPROP = "http://iguana-benchmark.eu/properties/"
+
+# same columns as iguanaresult2csv's task_data_each_query.sparql
+fieldnames = ["starttime", "benchmarkID", "format", "dataset", "triplestore", "noclients", "clientID", "queryID", "run",
+              "qps", "penalizedQPS", "succeeded", "failed", "timeouts", "unknownExceptions", "wrongCodes", "time",
+              "contentLength", "penalizedTime"]
+
+penalty_time = 180000.0
+
+execution_properties = {IPROP + name: name for name in ["code", "run", "resultSize", "success", "time"]}
+task_properties = {RDFS + "startDate": "startDate", IPROP + "connection": "connection",
+                   IPROP + "noOfWorkers": "noOfWorkers", IPROP + "numberOfQueryMixes": "numberOfQueryMixes"}
+worker_properties = {IPROP + "workerType": "workerType", IPROP + "workerID": "workerID"}
+# properties linking a child resource to its parent, stored as child -> parent
+parent_properties = {IPROP + "queryExecution": "query", IPROP + "query": "worker", IPROP + "workerResult": "task",
+                     IPROP + "task": "experiment_task"}
+
+_nt_line = re.compile(r'\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:@[\w-]+|\^\^<[^>]*>)?)'
+                      r'\s*\.\s*$')
+_literal = re.compile(r'"((?:[^"\\]|\\.)*)"(?:@[\w-]+|\^\^<([^>]*)>)?$', re.S)
+_escape = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_escapes = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+Value = Union[int, float, bool, str, datetime]
+
+
+class ConversionSummary(NamedTuple):
+    """What could not be written as is. Tasks are identified by their IRI."""
+    pending: int
+    skipped_runs: Dict[str, int]
+    late_query_mixes: List[str]
+
+    def merge(self, other: "ConversionSummary") -> "ConversionSummary":
+        skipped_runs = dict(self.skipped_runs)
+        for task, runs in other.skipped_runs.items():
+            skipped_runs[task] = skipped_runs.get(task, 0) + runs
+        return ConversionSummary(self.pending + other.pending, skipped_runs,
+                                 self.late_query_mixes + other.late_query_mixes)
+
+
+class TermDictionary:
+    """Interns IRIs and blank nodes as integer ids. Released ids are not reused."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = dict()
+        self.terms: Dict[int, str] = dict()
+        self._next_id = 0
+
+    def intern(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = self._next_id
+            self.terms[term_id] = term
+            self._next_id += 1
+        return term_id
+
+    def release(self, term_id: int):
+        """Forgets a term. Interning it again yields a new id."""
+        del self.ids[self.terms.pop(term_id)]
+
+    def term(self, term_id: int) -> str:
+        return self.terms[term_id]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def _unescape(match) -> str:
+    escape = match.group(1)
+    if escape[0] in 'uU':
+        return chr(int(escape[1:], 16))
+    return _escapes.get(escape, escape)
+
+
+def literal_value(literal: str) -> Value:
+    """Converts an N-Triples literal into a Python value like rdflib's Literal.toPython()."""
+    lexical, datatype = _literal.match(literal).groups()
+    lexical = _escape.sub(_unescape, lexical)
+    if datatype is None or not datatype.startswith(XSD):
+        return lexical
+    datatype = datatype[len(XSD):]
+    try:
+        if datatype in {"integer", "int", "long", "short", "byte", "nonNegativeInteger", "positiveInteger",
+                        "unsignedInt", "unsignedLong", "negativeInteger", "nonPositiveInteger"}:
+            return int(lexical)
+        if datatype in {"double", "float", "decimal"}:
+            return float(lexical)
+        if datatype == "boolean":
+            return lexical.strip() in {"true", "1"}
+        if datatype == "dateTime":
+            return datetime.fromisoformat(lexical.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    return lexical
+
+
+def parse_nt_line(line: str) -> Optional[Tuple[str, str, str]]:
+    """Splits an N-Triples line into subject, predicate IRI and object. Returns None for blank and comment lines."""
+    stripped = line.strip()
+    if not stripped or stripped.startswith("#"):
+        return None
+    match = _nt_line.match(stripped)
+    if match is None:
+        raise ValueError("Not an N-Triples statement: {}".format(stripped))
+    return match.group(1), match.group(2), match.group(3)
+
+
+class IguanaResultStream:
+    """
+    Incrementally assembles query execution rows from the triples of IGUANA result files.
+    Feed triples with add(); each call returns the rows completed by that triple.
+    """
+
+    def __init__(self, terms: Optional[TermDictionary] = None):
+        self.terms = terms if terms is not None else TermDictionary()
+        self.executions: Dict[int, Dict[str, Value]] = dict()
+        self.tasks: Dict[int, Dict[str, Value]] = dict()
+        self.workers: Dict[int, Dict[str, Value]] = dict()
+        self.parents: Dict[str, Dict[int, int]] = {name: dict() for name in parent_properties.values()}
+        self.datasets: Dict[int, int] = dict()
+        self.query_nodes: Dict[int, int] = dict()
+        self.labels: Dict[int, str] = dict()
+        self.ids: Dict[int, Value] = dict()
+        # run numbers of the written executions per query resource
+        self.emitted: Dict[int, Set[Value]] = dict()
+        self.waiting: Dict[int, List[int]] = dict()
+        self.contexts: Dict[int, Dict[str, Value]] = dict()
+        self.skipped_runs: Dict[int, int] = dict()
+        self.max_runs: Dict[int, int] = dict()
+
+    def _node(self, term: str) -> int:
+        return self.terms.intern(term[1:-1] if term.startswith("<") else term)
+
+    def add(self, subject: str, predicate: str, object: str) -> List[Dict[str, Value]]:
+        s = self._node(subject)
+        is_literal = object.startswith('"')
+        o = None if is_literal else self._node(object)
+        value = literal_value(object) if is_literal else None
+
+        if predicate in execution_properties:
+            # query resources have a resultSize, too, but never become complete executions
+            execution = self.executions.setdefault(s, dict())
+            was_complete = len(execution) == len(execution_properties)
+            execution[execution_properties[predicate]] = value
+            if not was_complete and len(execution) == len(execution_properties):
+                return self._try_emit([s])
+            return []
+        elif predicate in parent_properties:
+            self.parents[parent_properties[predicate]][o] = s
+        elif predicate in task_properties:
+            self.tasks.setdefault(s, dict())[task_properties[predicate]] = o if o is not None else value
+        elif predicate in worker_properties:
+            self.workers.setdefault(s, dict())[worker_properties[predicate]] = value
+        elif predicate == IPROP + "dataset":
+            self.datasets[s] = o
+        elif predicate == IPROP + "queryID":
+            self.query_nodes[s] = o
+        elif predicate == RDFS + "label":
+            self.labels[s] = value
+        elif predicate == RDFS + "ID":
+            self.ids[s] = value
+        else:
+            return []
+
+        rows = []
+        for node in (s, o):
+            if node is not None and node in self.waiting:
+                rows.extend(self._try_emit(self.waiting.pop(node)))
+        return rows
+
+    def _query_context(self, query: int) -> Tuple[Optional[Dict[str, Value]], Optional[int]]:
+        """Returns the row values shared by all executions of a query resource or the resource that is missing."""
+        context = self.contexts.get(query)
+        if context is not None:
+            return context, None
+        if query not in self.query_nodes or self.query_nodes[query] not in self.ids:
+            return None, self.query_nodes.get(query, query)
+        worker = self.parents["worker"].get(query)
+        if worker is None:
+            return None, query
+        worker_data = self.workers.get(worker, dict())
+        task = self.parents["task"].get(worker)
+        if len(worker_data) < len(worker_properties) or task is None:
+            return None, worker
+        task_data = self.tasks.get(task, dict())
+        experiment = self.parents["experiment_task"].get(task)
+        if any(name not in task_data for name in ["startDate", "connection", "noOfWorkers"]) or experiment is None:
+            return None, task
+        connection = task_data["connection"]
+        if connection not in self.labels:
+            return None, connection
+        dataset = self.datasets.get(experiment)
+        if dataset is None:
+            return None, experiment
+        if dataset not in self.labels:
+            return None, dataset
+        context = {
+            "starttime": task_data["startDate"],
+            "benchmarkID": self.terms.term(task),
+            "format": "CLI" if "CLI" in str(worker_data["workerType"]) else "HTTP",
+            "dataset": self.labels[dataset],
+            "triplestore": self.labels[connection],
+            "noclients": task_data["noOfWorkers"],
+            "clientID": worker_data["workerID"],
+            "queryID": self.ids[self.query_nodes[query]],
+            "task": task,
+        }
+        self.contexts[query] = context
+        return context, None
+
+    def _try_emit(self, executions: Iterable[int]) -> List[Dict[str, Value]]:
+        rows = []
+        for execution in executions:
+            if execution not in self.executions:
+                continue
+            query = self.parents["query"].get(execution)
+            if query is None:
+                self.waiting.setdefault(execution, []).append(execution)
+                continue
+            context, missing = self._query_context(query)
+            if context is None:
+                self.waiting.setdefault(missing, []).append(execution)
+                continue
+            data = self.executions.pop(execution)
+            del self.parents["query"][execution]
+            self.terms.release(execution)
+            emitted = self.emitted.setdefault(query, set())
+            if data["run"] in emitted:
+                continue
+            emitted.add(data["run"])
+            task = context["task"]
+            number_of_query_mixes = self.tasks[task].get("numberOfQueryMixes")
+            # workaround for IGUANA bug where too many runs are executed for NumberOfQueryMixes mode
+            if number_of_query_mixes is not None and data["run"] > int(number_of_query_mixes):
+                self.skipped_runs[task] = self.skipped_runs.get(task, 0) + 1
+                continue
+            self.max_runs[task] = max(self.max_runs.get(task, data["run"]), data["run"])
+            rows.append(execution_row(context, data))
+        return rows
+
+    def late_query_mixes(self) -> List[str]:
+        """
+        Tasks whose numberOfQueryMixes was read only after runs beyond it had been written.
+        The IGUANA bug workaround could not be applied to these runs.
+        """
+        return [self.terms.term(task) for task, max_run in self.max_runs.items()
+                if self.tasks[task].get("numberOfQueryMixes") is not None
+                and max_run > int(self.tasks[task]["numberOfQueryMixes"])]
+
+    def pending(self) -> int:
+        """Number of complete executions which could not be written because their context is missing."""
+        return sum(len(executions) for executions in self.waiting.values())
+
+    def summary(self) -> ConversionSummary:
+        return ConversionSummary(self.pending(),
+                                 {self.terms.term(task): runs for task, runs in self.skipped_runs.items()},
+                                 self.late_query_mixes())
+
+
+def execution_row(context: Dict[str, Value], data: Dict[str, Value]) -> Dict[str, Value]:
+    code = data["code"]
+    time = data["time"]
+    qps = 1000.0 / time if time else None
+    row = {name: value for name, value in context.items() if name in fieldnames}
+    row.update({
+        "run": data["run"],
+        "qps": qps,
+        "penalizedQPS": qps if data["success"] else 1.0 / 180.0,
+        "succeeded": 1 if code == 1 else 0,
+        "failed": 1 if code != 1 else 0,
+        "timeouts": 1 if code == -1 else 0,
+        "unknownExceptions": 1 if code == 0 else 0,
+        "wrongCodes": 1 if code == -2 else 0,
+        "time": time,
+        "contentLength": data["resultSize"],
+        "penalizedTime": time if data["success"] else penalty_time,
+    })
+    return row
+
+
+def convert_lines(lines: Iterable[str], output: TextIO, header: bool = True) -> IguanaResultStream:
+    """Converts N-Triples lines into CSV rows written to output. Returns the final state of the stream."""
+    csv_writer = csv.DictWriter(output, fieldnames=fieldnames, quoting=csv.QUOTE_NONNUMERIC)
+    if header:
+        csv_writer.writeheader()
+    stream = IguanaResultStream()
+    for line in lines:
+        triple = parse_nt_line(line)
+        if triple is not None:
+            csv_writer.writerows(stream.add(*triple))
+    return stream
+
+
+def convert_nt(lines: Iterable[str], output_csv: Path, header: bool = True) -> IguanaResultStream:
+    with open(output_csv, 'w', newline='') as output:
+        return convert_lines(lines, output, header)
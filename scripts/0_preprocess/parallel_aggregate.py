@@ -0,0 +1,125 @@
+"""
+Aggregation of the classified executions per (triplestore, dataset, queryID, clientID), optionally in a pool of worker
+processes.
+
+The groups of different datasets and triple stores are independent. For the parallel aggregation, the executions are
+ordered by (triplestore, dataset), so that each shard of one dataset and triple store is a contiguous range of rows,
+and the numeric columns are copied once into shared memory. The workers only receive the names of the shared memory
+blocks and the range of their shard, and return the aggregates of the shard, which are concatenated in shard order.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregate_state import aggregate_max_columns, aggregate_sum_columns, group_columns, stats_columns
+from descriptive_stats import GroupStats
+
+shard_columns = ['triplestore', 'dataset']
+
+
+def aggregate_serial(iguana_data: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates classified executions per (triplestore, dataset, queryID, clientID) in this process."""
+    iguana_data_agg = GroupStats.from_frame(iguana_data, group_columns, stats_columns).describe().merge(
+        iguana_data.groupby(group_columns, as_index=False).agg(
+            **{name: (name, 'max') for name in aggregate_max_columns},
+            **{name: (name, 'sum') for name in aggregate_sum_columns}
+        ),
+        on=group_columns, how='left')
+    # a group has a wrong result only if none of its executions succeeded
+    iguana_data_agg['wrongResult'] = ((iguana_data_agg['succeeded'] == 0) & iguana_data_agg['wrongResult']) \
+        .astype(np.int64)
+    return iguana_data_agg
+
+
+class _SharedColumn(NamedTuple):
+    name: str
+    dtype: str
+    values: str
+    values_dtype: str
+    # shared memory block of the mask of nullable columns
+    mask: Optional[str]
+
+
+def _share(data: pd.DataFrame, columns: List[str]) -> Tuple[List[_SharedColumn], List[shared_memory.SharedMemory]]:
+    shared, blocks = [], []
+
+    def to_shared_memory(array: np.ndarray) -> str:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        return block.name
+
+    for column in columns:
+        series = data[column]
+        dtype = series.dtype
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            mask = series.isna().to_numpy()
+            values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            shared.append(_SharedColumn(column, str(dtype), to_shared_memory(values), str(values.dtype),
+                                        to_shared_memory(mask)))
+        else:
+            values = series.to_numpy()
+            shared.append(_SharedColumn(column, str(dtype), to_shared_memory(values), str(values.dtype), None))
+    return shared, blocks
+
+
+def _read_shared(block_name: str, dtype: str, length: int, start: int, stop: int) -> np.ndarray:
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        # copy the shard, so that the block can be closed
+        return np.array(np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)[start:stop])
+    finally:
+        block.close()
+
+
+def _aggregate_shard(columns: List[_SharedColumn], length: int, start: int, stop: int, shard: pd.DataFrame) \
+        -> pd.DataFrame:
+    data = dict()
+    for column in columns:
+        values = _read_shared(column.values, column.values_dtype, length, start, stop)
+        if column.mask is None:
+            data[column.name] = pd.Series(values, dtype=column.dtype)
+        else:
+            mask = _read_shared(column.mask, 'bool', length, start, stop)
+            data[column.name] = pd.Series(pd.api.types.pandas_dtype(column.dtype).construct_array_type()(values, mask))
+    iguana_data = pd.DataFrame(data)
+    for column in shard_columns:
+        iguana_data[column] = shard[column].repeat(stop - start).reset_index(drop=True)
+    return aggregate_serial(iguana_data)
+
+
+def aggregate(iguana_data: pd.DataFrame, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Aggregates classified executions per (triplestore, dataset, queryID, clientID). With more than one worker, the
+    shards of each dataset and triple store are aggregated in parallel.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return aggregate_serial(iguana_data)
+    # groupby ignores rows with a missing key, so they are not copied into shared memory
+    iguana_data = iguana_data.dropna(subset=group_columns)
+    shards = iguana_data.groupby(shard_columns, sort=True).indices
+    if len(shards) <= 1:
+        return aggregate_serial(iguana_data)
+
+    order = np.concatenate(list(shards.values()))
+    bounds = np.cumsum([0] + [len(rows) for rows in shards.values()])
+    starts, stops = bounds[:-1], bounds[1:]
+    numeric_columns = [column for column in group_columns if column not in shard_columns] \
+        + stats_columns + aggregate_max_columns + aggregate_sum_columns
+    columns, blocks = _share(iguana_data[numeric_columns].iloc[order], numeric_columns)
+    shard_keys = [iguana_data[shard_columns].iloc[[order[start]]] for start in starts]
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            parts = list(executor.map(_aggregate_shard, [columns] * len(shards), [len(order)] * len(shards),
+                                      starts, stops, shard_keys))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    iguana_data_agg = pd.concat(parts, ignore_index=True)
+    return iguana_data_agg[list(parts[0].columns)]
@@ -0,0 +1,85 @@
+"""
+Process pool for converting many raw data files at once.
+
+Each input file is converted into its own part file by a worker process. The parts are concatenated in the order of
+the input files, which are sorted by name, so that the combined output does not depend on the number of workers or
+on the order in which the workers finish. Duplicate lines across the parts are dropped with an external sort, so
+memory does not grow with the number of rows.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def ordered_input_files(input_dir: Path, file_suffix: str) -> List[Path]:
+    return sorted((file for file in input_dir.iterdir() if file.is_file() and file.suffix == file_suffix),
+                  key=lambda file: file.name)
+
+
+def ingest(convert: Callable[[Path, Path], T], input_files: Sequence[Path], part_dir: Path,
+           workers: Optional[int] = None) -> List[Tuple[Path, T]]:
+    """
+    Calls convert(input_file, part_file) for each of input_files in a pool of worker processes.
+    convert must be picklable, i.e. a module level function or a functools.partial of one.
+    Returns the part files with the return values of convert in the order of input_files.
+    """
+    part_files = [part_dir.joinpath("{:06d}.part".format(i)) for i in range(len(input_files))]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(input_files) <= 1:
+        results = list(map(convert, input_files, part_files))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(input_files))) as executor:
+            results = list(executor.map(convert, input_files, part_files))
+    return list(zip(part_files, results))
+
+
+def concatenate(part_files: Iterable[Path], output: TextIO):
+    """Appends the lines of all part_files to output."""
+    for part_file in part_files:
+        with open(part_file, 'r', newline='') as part:
+            output.writelines(part)
+
+
+def _first_occurrences(decorated_lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Yields position-first lines of the first occurrence of each line from content-first lines sorted by content."""
+    previous = None
+    for decorated_line in decorated_lines:
+        content, position = decorated_line[:-1].rsplit(b"\0", 1)
+        if content != previous:
+            # the trailing NUL keeps a carriage return of the content from being stripped by the sort
+            yield position + b"\0" + content + b"\0\n"
+            previous = content
+
+
+def concatenate_unique(part_files: Iterable[Path], output: BinaryIO, tmp_dir: Path, memory_budget: int,
+                       workers: Optional[int] = None):
+    """
+    Appends the lines of all part_files to output, skipping lines that occur earlier. The lines keep the order of
+    their first occurrence.
+
+    Each line is tagged with its position and externally sorted by its content, so that the first occurrence of each
+    line is the first of its group. These are sorted back by position. Both sorts stay within memory_budget bytes.
+    """
+    from external_sort import sorted_unique_lines
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as work_dir:
+        # NUL sorts before any byte, so that equal contents are adjacent whatever follows them
+        tagged_file = Path(work_dir).joinpath("tagged")
+        with open(tagged_file, 'wb') as tagged:
+            position = 0
+            for part_file in part_files:
+                with open(part_file, 'rb') as part:
+                    for line in part:
+                        tagged.write(line.rstrip(b"\n") + b"\0" + b"%016d\n" % position)
+                        position += 1
+        first_file = Path(work_dir).joinpath("first")
+        with open(first_file, 'wb') as first:
+            first.writelines(_first_occurrences(sorted_unique_lines([tagged_file], Path(work_dir), memory_budget,
+                                                                    workers)))
+        os.remove(tagged_file)
+        for line in sorted_unique_lines([first_file], Path(work_dir), memory_budget, workers):
+            output.write(line[17:-2] + b"\n")
@@ -0,0 +1,115 @@
+"""
+Splits large CSV files into partitions which fit into memory.
+
+The CSV file is read in chunks of rows. The rows of each chunk are appended to one file per value of the partition
+columns, as pickled data frames, so that the values read from the CSV file are kept exactly. Each row gets its row
+number in the CSV file in row_column, which allows to restore the order of the rows after processing the partitions.
+
+DataFrame.convert_dtypes() infers the types of a column from its values, so a partition on its own may get other types
+than the whole file, e.g. Int64 instead of Float64 if all its values are integers. The types are therefore inferred
+per chunk and combined, and every partition is converted to the combined types.
+"""
+from __future__ import annotations
+
+import csv
+import heapq
+import pickle
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Set, TextIO, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+row_column = "_row"
+default_chunk_size = 1_000_000
+
+
+def _common_dtype(dtypes: Set[str]) -> str:
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    if dtypes <= {'Int64', 'Float64'}:
+        return 'Float64'
+    return 'object'
+
+
+class PartitionedFrames:
+    def __init__(self, directory: Path, by: Sequence[str]):
+        self.directory = directory
+        self.by = list(by)
+        # partition files in the order in which the partitions first appear
+        self.files: Dict[tuple, Path] = dict()
+        self.rows = 0
+        self._dtypes: Dict[str, Set[str]] = defaultdict(set)
+        self._empty: Optional[pd.DataFrame] = None
+
+    def add(self, chunk: pd.DataFrame):
+        """Appends the rows of chunk to the partitions."""
+        import numpy as np
+        chunk = chunk.assign(**{row_column: np.arange(self.rows, self.rows + len(chunk))})
+        self.rows += len(chunk)
+        converted = chunk.convert_dtypes()
+        for column in chunk.columns:
+            if chunk[column].notna().any():
+                self._dtypes[column].add(str(converted[column].dtype))
+        if self._empty is None:
+            self._empty = chunk.iloc[:0]
+        for key, partition in chunk.groupby(self.by, sort=False):
+            key = key if isinstance(key, tuple) else (key,)
+            if key not in self.files:
+                self.files[key] = self.directory.joinpath("{:06d}.pkl".format(len(self.files)))
+            with open(self.files[key], 'ab') as file:
+                pickle.dump(partition, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def keys(self) -> List[tuple]:
+        """The keys of all partitions in the order of their first appearance."""
+        return list(self.files)
+
+    def dtypes(self) -> Dict[str, str]:
+        return {column: _common_dtype(dtypes) for column, dtypes in self._dtypes.items()}
+
+    def read(self, key: tuple) -> pd.DataFrame:
+        """The rows of a partition, converted like DataFrame.convert_dtypes() converts the whole file."""
+        import pandas as pd
+        parts = []
+        if key in self.files:
+            with open(self.files[key], 'rb') as file:
+                while True:
+                    try:
+                        parts.append(pickle.load(file))
+                    except EOFError:
+                        break
+        partition = pd.concat(parts, ignore_index=True) if parts else self._empty
+        return partition.convert_dtypes().astype(self.dtypes())
+
+
+def split_csv(csv_file: Path, directory: Path, by: Sequence[str], chunk_size: int = default_chunk_size,
+              **read_csv_kwargs) -> PartitionedFrames:
+    """Splits csv_file by the values of the columns by into partitions in directory."""
+    import pandas as pd
+    directory.mkdir(parents=True, exist_ok=True)
+    partitions = PartitionedFrames(directory, by)
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size, **read_csv_kwargs):
+        partitions.add(chunk)
+    return partitions
+
+
+def merge_by_row(part_files: Iterable[Path], output: TextIO):
+    """
+    Merges CSV files written with DataFrame.to_csv(index=False), each sorted by row_column, into one CSV file in the
+    format of DataFrame.to_csv(): the rows are ordered by row_column, which is replaced by a running index.
+    """
+    with ExitStack() as stack:
+        readers = [csv.reader(stack.enter_context(open(part_file, 'r', newline=''))) for part_file in part_files]
+        headers = [next(reader) for reader in readers]
+        header = headers[0]
+        if any(other != header for other in headers[1:]):
+            raise ValueError("The part files have different columns.")
+        position = header.index(row_column)
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow([""] + header[:position] + header[position + 1:])
+        rows: Iterable[Tuple[int, List[str]]] = heapq.merge(
+            *[((int(row[position]), row) for row in reader) for reader in readers])
+        for index, (_, row) in enumerate(rows):
+            writer.writerow([index] + row[:position] + row[position + 1:])
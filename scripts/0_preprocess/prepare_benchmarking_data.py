@@ -1,9 +1,14 @@
-import subprocess
+import sys
 import click
 import csv
+from itertools import chain
 from pathlib import Path
 from typing import List, Optional
 
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+from util.columnar_cache import cache_csv
+from util.profiling import profile_option, profiler
+
 iguana_file_prefixes = """
 @prefix rdf:   <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
 @prefix rdfs:  <http://www.w3.org/2000/01/rdf-schema#> .
@@ -17,34 +22,67 @@ iguana_file_prefixes = """
 """
 
 
-def combine_rdf_files(input_dir: Path, combined_ttl: Path):
-    tmp_combined_ttl_path = input_dir.joinpath("benchmarking_results_tmp.ttl")
+def combine_rdf_files(input_nts: List[Path], combined_ttl: Path, tmp_dir: Path, memory_budget: int,
+                      workers: Optional[int] = None):
+    """
+    Writes the distinct triples of all input_nts, sorted and with tentris release candidate tags removed, to
+    combined_ttl. The IGUANA prefixes are prepended, so the output is valid Turtle.
+    """
+    from external_sort import sorted_unique_lines
+    from remove_rc_from_version import remove_rc_bytes
+
+    with open(combined_ttl, 'wb') as combined_nt:
+        combined_nt.write(iguana_file_prefixes.encode())
+        combined_nt.writelines(sorted_unique_lines(input_nts, tmp_dir, memory_budget, workers, remove_rc_bytes))
+
+
+def _convert_nt_part(input_nt: Path, part_csv: Path):
+    """Converts a single raw IGUANA file with tentris release candidate tags removed into csv rows without header."""
+    from iguana_nt_to_csv import convert_nt
+    from remove_rc_from_version import remove_rc_from_lines
 
-    with open(tmp_combined_ttl_path, 'w') as combined_nt:
-        for input_nt in [file for file in input_dir.iterdir() if file.is_file() and file.suffix == ".nt"]:
-            with open(input_nt, 'r') as input_file:
-                for line in input_file:
-                    combined_nt.write(line)
+    return convert_nt(remove_rc_from_lines(input_nt), part_csv, header=False).summary()
 
-    tmp_prefixes_ttl_path = input_dir.joinpath("iguana_prefixes_tmp.ttl")
-    tmp_prefixes_ttl_path.write_text(iguana_file_prefixes)
 
-    subprocess.check_call(['/bin/bash', '-i', '-c',
-                           'sort "{tmp_ttl}" | uniq >> "{tmp_ttl}"'.format(tmp_ttl=tmp_combined_ttl_path.absolute())],
-                          stderr=subprocess.PIPE)
-    subprocess.check_call(['/bin/bash', '-i', '-c',
-                           'cat "{tmt_prefixes}" "{tmp_ttl}" | riot --syntax=TURTLE --output=TURTLE > "{file_path}"'
-                          .format(tmt_prefixes=tmp_prefixes_ttl_path.absolute(),
-                                  tmp_ttl=tmp_combined_ttl_path.absolute(),
-                                  file_path=combined_ttl.absolute())
-                           ],
-                          stderr=subprocess.PIPE)
+def convert_rdf_files(input_nts: List[Path], output_csv: Path, tmp_dir: Path, memory_budget: int,
+                      workers: Optional[int] = None):
+    """
+    Converts the raw IGUANA files with tentris release candidate tags removed into the benchmarking results csv.
+
+    The files are converted in parallel and concatenated in the given order, dropping duplicate rows with an external
+    sort within memory_budget bytes. If some query executions are described across files, all files are converted
+    again as one stream.
+    """
+    from iguana_nt_to_csv import ConversionSummary, convert_nt, fieldnames
+    from parallel_ingest import concatenate_unique, ingest
+    from remove_rc_from_version import remove_rc_from_lines
+
+    parts = ingest(_convert_nt_part, input_nts, tmp_dir, workers)
+    summary = ConversionSummary(0, dict(), list())
+    for _, part_summary in parts:
+        summary = summary.merge(part_summary)
+    if summary.pending:
+        return convert_nt(chain.from_iterable(remove_rc_from_lines(input_nt) for input_nt in input_nts),
+                          output_csv).summary()
+    with open(output_csv, 'w', newline='') as output:
+        csv.DictWriter(output, fieldnames=fieldnames, quoting=csv.QUOTE_NONNUMERIC).writeheader()
+    with open(output_csv, 'ab') as output:
+        concatenate_unique([part_csv for part_csv, _ in parts], output, tmp_dir, memory_budget, workers)
+    return summary
 
 
 @click.command()
 @click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True),
               help="Where the data and raw_data directories are located.")
-def prepare_benchmarking_data(base_dir: Path):
+@click.option("--converter", default="stream", type=click.Choice(["stream", "iguanaresult2csv"]),
+              help="'stream' converts the raw N-Triples directly into the csv. "
+                   "'iguanaresult2csv' writes the combined Turtle file and converts it with iguanaresult2csv.")
+@click.option("--memory-budget", default=1024, type=click.IntRange(min=1),
+              help="Memory in MiB used for sorting and deduplicating the benchmarking results.")
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes. Defaults to the number of CPUs.")
+@profile_option
+def prepare_benchmarking_data(base_dir: Path, converter: str, memory_budget: int, workers: Optional[int]):
     raw_data_dir = base_dir.joinpath("raw_data/benchmarking_results")
     if not raw_data_dir.exists():
         click.echo("There must be a raw_data folder provided in the base-dir. "
@@ -57,41 +95,62 @@ def prepare_benchmarking_data(base_dir: Path):
     data_dir.mkdir(parents=True, exist_ok=True)
 
     output_file_ttl = data_dir.joinpath("benchmarking_results.ttl")
+    output_file_csv = data_dir.joinpath("benchmarking_results.csv")
     import tempfile
     with tempfile.TemporaryDirectory() as tmp_dir:
         try:
-            from remove_rc_from_version import remove_rc_from_version
-            remove_rc_from_version(raw_data_dir, Path(tmp_dir), ".nt")
-            combine_rdf_files(Path(tmp_dir), output_file_ttl)
+            from parallel_ingest import ordered_input_files
+            input_nts = ordered_input_files(raw_data_dir, ".nt")
+            with profiler.step("convert" if converter == "stream" else "combine"):
+                if converter == "stream":
+                    summary = convert_rdf_files(input_nts, output_file_csv, Path(tmp_dir), memory_budget * 2 ** 20,
+                                                workers)
+                else:
+                    combine_rdf_files(input_nts, output_file_ttl, Path(tmp_dir), memory_budget * 2 ** 20, workers)
         except Exception as ex:
             click.echo("Error encountered while processing files. \n"
                        "{}".format(ex),
                        err=True)
             exit(1)
-        click.echo(
-            "Concatenated rdf file with benchmarking results was written to {}".format(output_file_ttl.absolute()))
 
-        output_file_csv = data_dir.joinpath("benchmarking_results.csv")
+        if converter == "stream":
+            for task, skipped_runs in summary.skipped_runs.items():
+                click.echo("WARNING: {} runs after numberOfQueryMixes of task {} are not reported."
+                           .format(skipped_runs, task), err=True)
+            for task in summary.late_query_mixes:
+                click.echo("WARNING: numberOfQueryMixes of task {} was read after runs beyond it were written."
+                           .format(task), err=True)
+            if summary.pending:
+                click.echo("WARNING: {} query executions were skipped because their task data is incomplete."
+                           .format(summary.pending), err=True)
+        else:
+            click.echo(
+                "Concatenated rdf file with benchmarking results was written to {}".format(output_file_ttl.absolute()))
 
-        try:
-            i2c_dir = Path(tmp_dir).joinpath("iguanaresult2csv")
-            i2c_dir.mkdir(parents=True, exist_ok=True)
-            output_each_query_csvs: List[Path] = list()
-            import iguanaresult2csv.processing
-            from iguanaresult2csv.exec import run
-            click.echo("Extracted csvs:")
-            for output_files in iguanaresult2csv.processing.convert_result_file(output_file_ttl, i2c_dir):
-                assert (output_files[2])
-                click.echo("  {}".format(output_files[2].name))
-                output_each_query_csvs.append(output_files[2])
-            run.combine_csv_files(output_file_csv, output_each_query_csvs)
-        except Exception as ex:
-            click.echo("Error encountered while processing files. \n"
-                       "{}".format(ex),
-                       err=True)
-            exit(1)
+            try:
+                i2c_dir = Path(tmp_dir).joinpath("iguanaresult2csv")
+                i2c_dir.mkdir(parents=True, exist_ok=True)
+                output_each_query_csvs: List[Path] = list()
+                import iguanaresult2csv.processing
+                from iguanaresult2csv.exec import run
+                click.echo("Extracted csvs:")
+                with profiler.step("convert"):
+                    for output_files in iguanaresult2csv.processing.convert_result_file(output_file_ttl, i2c_dir):
+                        assert (output_files[2])
+                        click.echo("  {}".format(output_files[2].name))
+                        output_each_query_csvs.append(output_files[2])
+                    run.combine_csv_files(output_file_csv, output_each_query_csvs)
+            except Exception as ex:
+                click.echo("Error encountered while processing files. \n"
+                           "{}".format(ex),
+                           err=True)
+                exit(1)
+        with profiler.step("cache"):
+            cached_file = cache_csv(output_file_csv)
         click.echo(
             "Concatenated csv file with benchmarking results was written to {}".format(output_file_csv.absolute()))
+        if cached_file is not None:
+            click.echo("Typed columnar copy was written to {}".format(cached_file.absolute()))
         exit(0)
 
 
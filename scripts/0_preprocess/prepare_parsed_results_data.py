@@ -1,56 +1,79 @@
 import click
 import csv
+import sys
+from functools import partial
+from itertools import islice
 from pathlib import Path
 from typing import List, Optional
 
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+from util.columnar_cache import cache_csv
+from util.profiling import profile_option, profiler
 
-def transform_id(id: int, dataset: str, triplestore: str) -> Optional[int]:
-    if ((triplestore == "fuseki" and dataset == 'wikidata-2020-11-11') or
-            (triplestore == "fuseki-ltj") or
-            (triplestore == "virtuoso"  and dataset == 'wikidata-2020-11-11')):
-        return id
-    else:
-        excluded_queries = {
-            "swdf": [],
-            "dbpedia2015": [24, 33, 86, 91, 99, 103, 295],
-            "watdiv10000": [],
-            'wikidata-2020-11-11': [109, 235, 365, 451, 466],
-        }
-        assert dataset in excluded_queries
-        excludes = excluded_queries[dataset]
-        offset = 0
-        for exclude in excludes:
-            if id < exclude:
+batch_rows = 100_000
+
+
+def _combine_csv_part(input_csv: Path, part_csv: Path, fieldnames: List[str], registry_file: Path):
+    """
+    Writes the rows of input_csv with tentris release candidate tags removed and query ids remapped to part_csv.
+    The rows are remapped and written in batches of batch_rows rows, so that memory does not grow with the file.
+    """
+    import numpy as np
+    from query_registry import QueryRegistry, excluded_id
+    from remove_rc_from_version import remove_rc_from_lines
+
+    registry = QueryRegistry.load(registry_file)
+    reader = csv.DictReader(remove_rc_from_lines(input_csv))
+    with open(part_csv, 'w') as part:
+        csv_writer = csv.DictWriter(part, fieldnames=fieldnames, quoting=csv.QUOTE_NONNUMERIC)
+        while True:
+            rows = list(islice(reader, batch_rows))
+            if not rows:
                 break
-            elif id == exclude:
-                return None
-            else:
-                offset += 1
-        return id - offset
+            query_ids = registry.remap(
+                np.fromiter((int(row["queryID"]) for row in rows), dtype=np.int64, count=len(rows)),
+                [row["dataset"] for row in rows],
+                [row["triplestore"] for row in rows])
+            for row, query_id in zip(rows, query_ids.tolist()):
+                if query_id != excluded_id:
+                    row["queryID"] = str(query_id)
+                    csv_writer.writerow(row)
 
 
-def combine_csv_files(input_dir: Path, concatenated_csv_path: Path):
-    with open(concatenated_csv_path, 'w') as concatenated_csv:
-        csv_writer = None
+def combine_csv_files(input_csvs: List[Path], concatenated_csv_path: Path, workers: Optional[int] = None,
+                      registry_file: Path = None):
+    """
+    Concatenates the csv files with tentris release candidate tags removed and query ids remapped with the query
+    registry.
+    The files are processed in parallel and concatenated in the given order. The header is taken from the first file.
+    """
+    from parallel_ingest import concatenate, ingest
+    from query_registry import default_registry_file
+    from remove_rc_from_version import remove_rc_from_lines
 
-        for input_csv in [file for file in input_dir.iterdir() if file.is_file() and file.suffix == ".csv"]:
-            with open(input_csv, 'r') as input_file:
-                csv_reader = csv.DictReader(input_file, )
-                if csv_writer is None:
-                    csv_writer = csv.DictWriter(concatenated_csv, fieldnames=csv_reader.fieldnames,
-                                                quoting=csv.QUOTE_NONNUMERIC)
-                    csv_writer.writeheader()
-                for row in csv_reader:
-                    id = transform_id(int(row["queryID"]), row["dataset"], row["triplestore"])
-                    if id is not None:
-                        row["queryID"] = str(id)
-                        csv_writer.writerow(row)
+    with open(concatenated_csv_path, 'w') as concatenated_csv:
+        if not input_csvs:
+            return
+        fieldnames = csv.DictReader(remove_rc_from_lines(input_csvs[0])).fieldnames
+        csv.DictWriter(concatenated_csv, fieldnames=fieldnames, quoting=csv.QUOTE_NONNUMERIC).writeheader()
+        import tempfile
+        with tempfile.TemporaryDirectory() as part_dir:
+            parts = ingest(partial(_combine_csv_part, fieldnames=fieldnames,
+                                   registry_file=registry_file or default_registry_file),
+                           input_csvs, Path(part_dir), workers)
+            concatenate([part_csv for part_csv, _ in parts], concatenated_csv)
 
 
 @click.command()
 @click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True),
               help="Where the data and raw_data directories are located.")
-def prepare_parsed_results_data(base_dir: Path):
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes. Defaults to the number of CPUs.")
+@click.option("--query-registry", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="Query registry used to map the reported query ids to canonical ids. "
+                   "Defaults to query_registry.json next to this script.")
+@profile_option
+def prepare_parsed_results_data(base_dir: Path, workers: Optional[int], query_registry: Optional[str]):
     """Simple program that greets NAME for a total of COUNT times."""
     raw_data_dir = base_dir.joinpath("raw_data/parsed_results")
     if not raw_data_dir.exists():
@@ -64,19 +87,22 @@ def prepare_parsed_results_data(base_dir: Path):
     data_dir.mkdir(parents=True, exist_ok=True)
 
     output_file = data_dir.joinpath("parsed_results_stats.csv")
-    import tempfile
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        try:
-            from remove_rc_from_version import remove_rc_from_version
-            remove_rc_from_version(raw_data_dir, Path(tmp_dir), '.csv')
-            combine_csv_files(Path(tmp_dir), output_file)
-        except Exception as ex:
-            click.echo("Error encountered while processing files. \n"
-                       "{}".format(ex),
-                       err=True)
-        else:
-            click.echo(
-                "Cleaned and concatenated file with parsing results was written to {}".format(output_file.absolute()))
+    try:
+        from parallel_ingest import ordered_input_files
+        with profiler.step("combine"):
+            combine_csv_files(ordered_input_files(raw_data_dir, '.csv'), output_file, workers,
+                              Path(query_registry) if query_registry else None)
+    except Exception as ex:
+        click.echo("Error encountered while processing files. \n"
+                   "{}".format(ex),
+                   err=True)
+    else:
+        click.echo(
+            "Cleaned and concatenated file with parsing results was written to {}".format(output_file.absolute()))
+        with profiler.step("cache"):
+            cached_file = cache_csv(output_file)
+        if cached_file is not None:
+            click.echo("Typed columnar copy was written to {}".format(cached_file.absolute()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+"""
+Registry of the queries of each dataset.
+
+Query ids reported by the triple stores are raw ids, i.e. the positions of the queries in the query file used for
+benchmarking. Some queries were excluded from the evaluation afterwards, so the canonical id of a query is its
+position among the remaining queries. Some triple stores were benchmarked with the cleaned query files and report
+canonical ids already.
+
+A dataset is registered in one of two forms:
+- `excluded`: the raw ids of the excluded queries. The canonical id is the raw id minus the number of excluded
+  queries before it.
+- `queries`: one `[query_hash, queryID]` entry per raw id, where queryID is null for excluded queries. It is created
+  by registering the query file of the dataset. Canonical ids are then bound to the query text and stay stable when
+  queries are excluded later or the query file is reordered.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+import numpy as np
+
+default_registry_file = Path(__file__).absolute().parent.joinpath("query_registry.json")
+
+excluded_id = -1
+
+
+def query_hash(query: str) -> str:
+    """Hash of a query text which ignores differences in whitespace."""
+    return hashlib.sha1(" ".join(query.split()).encode()).hexdigest()
+
+
+class QueryRegistry:
+    def __init__(self, datasets: Dict[str, dict], canonical_numbering: List[Dict[str, str]]):
+        self.datasets = datasets
+        self.canonical_numbering = canonical_numbering
+        self._remap_arrays: Dict[str, np.ndarray] = dict()
+
+    @classmethod
+    def load(cls, registry_file: Path = default_registry_file) -> "QueryRegistry":
+        with open(registry_file, 'r') as file:
+            registry = json.load(file)
+        return cls(registry["datasets"], registry["canonical_numbering"])
+
+    def save(self, registry_file: Path = default_registry_file):
+        with open(registry_file, 'w') as file:
+            json.dump({"datasets": self.datasets, "canonical_numbering": self.canonical_numbering}, file, indent=2)
+            file.write("\n")
+
+    def _dataset(self, dataset: str) -> dict:
+        if dataset not in self.datasets:
+            raise ValueError("Dataset {} is not in the query registry.".format(dataset))
+        return self.datasets[dataset]
+
+    def uses_canonical_numbering(self, dataset: str, triplestore: str) -> bool:
+        return any(entry["triplestore"] == triplestore and entry.get("dataset", dataset) == dataset
+                   for entry in self.canonical_numbering)
+
+    def remap_array(self, dataset: str, triplestore: str, size: int) -> np.ndarray:
+        """
+        Array which maps each raw id below size of a query run on triplestore to its canonical id or excluded_id.
+        The arrays of the datasets are cached.
+        """
+        if self.uses_canonical_numbering(dataset, triplestore):
+            # canonical ids pass through, even for datasets which are not registered
+            return np.arange(size, dtype=np.int64)
+        remap = self._remap_arrays.get(dataset)
+        if remap is None or len(remap) < size:
+            entry = self._dataset(dataset)
+            if "queries" in entry:
+                if size > len(entry["queries"]):
+                    raise ValueError("Dataset {} has only {} registered queries, but query id {} was reported."
+                                     .format(dataset, len(entry["queries"]), size - 1))
+                remap = np.array([excluded_id if query_id is None else query_id
+                                  for _, query_id in entry["queries"][:size]], dtype=np.int64)
+            else:
+                raw_ids = np.arange(size, dtype=np.int64)
+                excluded = np.array(sorted(entry["excluded"]), dtype=np.int64)
+                remap = raw_ids - np.searchsorted(excluded, raw_ids, side='left')
+                remap[np.isin(raw_ids, excluded)] = excluded_id
+            self._remap_arrays[dataset] = remap
+        return remap
+
+    def remap(self, raw_ids: np.ndarray, datasets: np.ndarray, triplestores: np.ndarray) -> np.ndarray:
+        """Maps raw query ids to canonical ids or excluded_id, with one array lookup per (dataset, triple store)."""
+        raw_ids = np.asarray(raw_ids, dtype=np.int64)
+        query_ids = np.empty_like(raw_ids)
+        if len(raw_ids) == 0:
+            return query_ids
+        keys = np.char.add(np.char.add(np.asarray(datasets, dtype=str), "\t"), np.asarray(triplestores, dtype=str))
+        unique_keys, group = np.unique(keys, return_inverse=True)
+        for i, key in enumerate(unique_keys):
+            dataset, triplestore = key.split("\t")
+            rows = group == i
+            remap = self.remap_array(dataset, triplestore, int(raw_ids[rows].max()) + 1)
+            query_ids[rows] = remap[raw_ids[rows]]
+        return query_ids
+
+    def canonical_id(self, raw_id: int, dataset: str, triplestore: str) -> Optional[int]:
+        query_id = int(self.remap_array(dataset, triplestore, raw_id + 1)[raw_id])
+        return None if query_id == excluded_id else query_id
+
+    def register_queries(self, dataset: str, queries: Iterable[str]):
+        """
+        Binds the canonical ids of the dataset to the texts of its queries, given in raw id order.
+        Known queries keep their canonical id or exclusion, new queries get the next free canonical id.
+        """
+        entry = self.datasets.setdefault(dataset, {"excluded": []})
+        hashes = [query_hash(query) for query in queries]
+        if "queries" in entry:
+            known = {text_hash: query_id for text_hash, query_id in entry["queries"]}
+        else:
+            remap = self.remap_array(dataset, "", len(hashes))
+            known = {text_hash: (None if query_id == excluded_id else int(query_id))
+                     for text_hash, query_id in zip(hashes, remap)}
+        next_id = max([query_id for query_id in known.values() if query_id is not None], default=-1) + 1
+        registered = []
+        for text_hash in hashes:
+            if text_hash not in known:
+                known[text_hash] = next_id
+                next_id += 1
+            registered.append([text_hash, known[text_hash]])
+        self.datasets[dataset] = {"queries": registered}
+        self._remap_arrays.clear()
+
+    def exclude(self, dataset: str, raw_ids: Iterable[int]):
+        """Excludes the queries with the given raw ids from the evaluation."""
+        entry = self._dataset(dataset)
+        if "queries" in entry:
+            for raw_id in raw_ids:
+                entry["queries"][raw_id][1] = None
+        else:
+            entry["excluded"] = sorted(set(entry["excluded"]) | set(raw_ids))
+        self._remap_arrays.clear()
+
+
+@click.command()
+@click.option("--registry", default=default_registry_file, type=click.Path(dir_okay=False),
+              help="The query registry file to update.")
+@click.option("--dataset", required=True, help="The dataset the queries belong to.")
+@click.option("--queries", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="Query file of the dataset with one query per line, in raw id order.")
+@click.option("--exclude", multiple=True, type=click.IntRange(min=0),
+              help="Raw id of a query to exclude from the evaluation. Can be given multiple times.")
+def update_query_registry(registry: str, dataset: str, queries: Optional[str], exclude: Tuple[int]):
+    query_registry = QueryRegistry.load(Path(registry))
+    if queries is not None:
+        with open(queries, 'r') as file:
+            query_registry.register_queries(dataset, [line for line in file if line.strip()])
+    if exclude:
+        query_registry.exclude(dataset, exclude)
+    query_registry.save(Path(registry))
+    click.echo("Query registry was written to {}".format(Path(registry).absolute()))
+
+
+if __name__ == '__main__':
+    update_query_registry()
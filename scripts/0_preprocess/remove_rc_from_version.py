@@ -1,28 +1,35 @@
+import re
 from pathlib import Path
+from typing import Iterator
 
+removed_substrings = [
+    ("rc14_", ""),
+    ("rc15_", ""),
+    ("-rc5", ""),
+    ("-rc4", ""),
+    ("1.1.1_lsb_unused_h", "1.1.0_hashing_only")
+]
+# matches never span lines, so rewriting line by line finds all of them
+assert not any("\n" in before for before, _ in removed_substrings)
+
+_replacements = dict(removed_substrings)
+_removed_pattern = re.compile("|".join(re.escape(before) for before, _ in removed_substrings))
+_replacements_bytes = {before.encode(): after.encode() for before, after in removed_substrings}
+_removed_pattern_bytes = re.compile(_removed_pattern.pattern.encode())
+
+
+def remove_rc(text: str) -> str:
+    """Removes tentris release candidate tags from text in a single scan."""
+    return _removed_pattern.sub(lambda match: _replacements[match.group()], text)
+
+
+def remove_rc_bytes(text: bytes) -> bytes:
+    return _removed_pattern_bytes.sub(lambda match: _replacements_bytes[match.group()], text)
+
+
+def remove_rc_from_lines(input_file: Path) -> Iterator[str]:
+    """Yields the lines of input_file with tentris release candidate tags removed."""
+    with open(input_file, 'r') as file:
+        for line in file:
+            yield remove_rc(line)
 
-def remove_rc_from_version(input_dir: Path, output_dir: Path, file_suffix: str):
-    """
-    Copies files from input_dir to output dir. Tentris release candidate tags are removed from filenames and in the files.
-    Only files with the given file_suffix are considered.
-    """
-    removed_substrings = [
-        ("rc14_",""),
-        ("rc15_",""),
-        ("-rc5",""),
-        ("-rc4",""),
-        ("1.1.1_lsb_unused_h", "1.1.0_hashing_only")
-    ]
-    for input_file in [file for file in input_dir.iterdir() if file.is_file() and file.suffix == file_suffix]:
-
-        output_name = input_file.name
-        file_text = input_file.read_text()
-        for before, after in removed_substrings:
-            # clear file name
-            output_name = output_name.replace(before, after)
-            # clear file content
-            file_text = file_text.replace(before, after)
-
-        # write output file
-        output_file = output_dir.joinpath(output_name)
-        output_file.write_text(file_text)
@@ -0,0 +1,137 @@
+"""
+Reference in-memory hypertrie with switchable node hashing, single-entry-node compression and inlining.
+
+The hypertrie is bulk loaded from an array of integer encoded triples (or tuples of any other depth). Nodes are shared
+between parents: without hashing, all parents of a slice share its node, e.g. the node of (s, p) is a child of the
+node of s and of the node of p. With hashing, all nodes with the same entries are stored once, regardless of the slice
+they belong to. With compression, a node with a single entry is a SingleEntryNode, and its children are not
+materialized. With inlining, single entry nodes of depth 1 are stored as their key in the parent.
+
+The node counts match those of 0_preprocess/hypertrie_node_counts.py. memory_bytes estimates the memory of the nodes
+from a simple model of the C++ layout, see node_bytes.
+"""
+import hashlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hypertrie.nodes import FullNode, LeafNode, Node, SingleEntryNode, Slice, slice_node
+
+
+class Variant(NamedTuple):
+    hashing: bool
+    compression: bool
+    inlining: bool
+
+
+variants = {
+    'b': Variant(hashing=False, compression=False, inlining=False),
+    's': Variant(hashing=False, compression=True, inlining=False),
+    'h': Variant(hashing=True, compression=False, inlining=False),
+    'hs': Variant(hashing=True, compression=True, inlining=False),
+    'hsi': Variant(hashing=True, compression=True, inlining=True),
+}
+
+# bytes of the memory model: a key, a child reference, the header of a node and the hash and reference count of a
+# hashed node
+key_bytes = 8
+reference_bytes = 8
+header_bytes = 16
+hashed_node_bytes = 16
+
+
+def node_bytes(node: Node, hashing: bool) -> int:
+    """Modelled memory of node, without its children. Inlined nodes are part of the reference in their parent."""
+    if isinstance(node, int):
+        return 0
+    extra = hashed_node_bytes if hashing else 0
+    if isinstance(node, SingleEntryNode):
+        return header_bytes + extra + key_bytes * node.depth
+    if isinstance(node, LeafNode):
+        return header_bytes + extra + key_bytes * node.size
+    return header_bytes + extra + sum(len(edges) * (key_bytes + reference_bytes) for edges in node.edges)
+
+
+class Hypertrie:
+    def __init__(self, entries: np.ndarray, variant: str = 'hsi'):
+        """
+        :param entries: array of shape (n, depth) of integer keys, duplicates are removed
+        :param variant: one of variants: b (baseline), s (compression), h (hashing), hs or hsi (inlining)
+        """
+        self.variant = variant
+        self.config = variants[variant]
+        entries = np.asarray(entries, dtype=np.int64)
+        if entries.ndim != 2 or entries.shape[1] < 1:
+            raise ValueError("entries must be an array of shape (n, depth).")
+        self.depth = entries.shape[1]
+        # nodes by their slice (without hashing) or by their entries (with hashing)
+        self._nodes: Dict[object, Node] = dict()
+        rows = np.unique(entries, axis=0)
+        self.root: Optional[Node] = self._build(rows, ()) if len(rows) else None
+
+    def _node_key(self, rows: np.ndarray, fixed: Tuple[Tuple[int, int], ...]) -> object:
+        if self.config.hashing:
+            return rows.shape[1], hashlib.blake2b(np.ascontiguousarray(rows).tobytes(), digest_size=16).digest()
+        return frozenset(fixed)
+
+    def _build(self, rows: np.ndarray, fixed: Tuple[Tuple[int, int], ...]) -> Node:
+        """The node of rows, which are sorted and distinct. fixed are the (position, key) pairs of the slice."""
+        node_depth = rows.shape[1]
+        if self.config.compression and len(rows) == 1 and self.config.inlining and node_depth == 1:
+            return int(rows[0, 0])
+        node_key = self._node_key(rows, fixed)
+        node = self._nodes.get(node_key)
+        if node is not None:
+            return node
+        if self.config.compression and len(rows) == 1:
+            node = SingleEntryNode(tuple(rows[0].tolist()))
+        elif node_depth == 1:
+            node = LeafNode(rows[:, 0].copy())
+        else:
+            remaining_positions = [position for position in range(self.depth)
+                                   if position not in {fixed_position for fixed_position, _ in fixed}]
+            edges = []
+            for position in range(node_depth):
+                # a stable sort keeps the rows of each key sorted by the other positions
+                by_key = rows[np.argsort(rows[:, position], kind='stable')]
+                bounds = np.flatnonzero(np.diff(by_key[:, position])) + 1
+                children = dict()
+                for group in np.split(by_key, bounds):
+                    key = int(group[0, position])
+                    children[key] = self._build(np.delete(group, position, axis=1),
+                                                fixed + ((remaining_positions[position], key),))
+                edges.append(children)
+            node = FullNode(node_depth, edges, len(rows))
+        self._nodes[node_key] = node
+        return node
+
+    def __len__(self) -> int:
+        return 0 if self.root is None else (1 if isinstance(self.root, int) else self.root.size)
+
+    def slice(self, pattern: Sequence[Optional[int]]) -> Slice:
+        """
+        The entries matching pattern, which has a key for each bound position and None for the others. The result is
+        a node of the unbound positions, True or False if all positions are bound.
+        """
+        if len(pattern) != self.depth:
+            raise ValueError("The pattern must have one element per position.")
+        if self.root is None:
+            return False
+        return slice_node(self.root, {position: key for position, key in enumerate(pattern) if key is not None})
+
+    def __contains__(self, entry: Sequence[int]) -> bool:
+        return self.slice(entry) is True
+
+    def nodes(self) -> List[Node]:
+        """The stored nodes, each once. Inlined nodes are not stored."""
+        return list({id(node): node for node in self._nodes.values()}.values())
+
+    def node_counts(self) -> Dict[int, Tuple[int, int]]:
+        """The number of uncompressed and compressed nodes per depth."""
+        counts = {depth: [0, 0] for depth in range(1, self.depth + 1)}
+        for node in self.nodes():
+            counts[node.depth][isinstance(node, SingleEntryNode)] += 1
+        return {depth: (uncompressed, compressed) for depth, (uncompressed, compressed) in counts.items()}
+
+    def memory_bytes(self) -> int:
+        return sum(node_bytes(node, self.config.hashing) for node in self.nodes())
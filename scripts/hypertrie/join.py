@@ -0,0 +1,73 @@
+"""
+Worst-case optimal join of basic graph patterns over a hypertrie.
+
+Each triple pattern is sliced by its constants first. The join then binds one variable at a time (generic join, Ngo et
+al., 2014): the candidate keys of a variable are the intersection of the keys of all operands at the positions of the
+variable, and each operand is sliced by each candidate before the next variable is bound.
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from hypertrie.hypertrie import Hypertrie
+from hypertrie.nodes import Node, keys, slice_node
+
+# variables are strings such as "?x", constants are integer keys
+Term = Union[int, str]
+
+
+def is_variable(term: Term) -> bool:
+    return isinstance(term, str)
+
+
+def _variable_order(patterns: Sequence[Sequence[Term]]) -> List[str]:
+    """Variables occurring in more patterns first, ties in the order of their first occurrence."""
+    occurrences: Dict[str, int] = dict()
+    for pattern in patterns:
+        for variable in dict.fromkeys(term for term in pattern if is_variable(term)):
+            occurrences[variable] = occurrences.get(variable, 0) + 1
+    return sorted(occurrences, key=lambda variable: -occurrences[variable])
+
+
+def generic_join(hypertrie: Hypertrie, patterns: Sequence[Sequence[Term]],
+                 order: Optional[Sequence[str]] = None) -> Iterator[Dict[str, int]]:
+    """
+    All bindings of the variables of patterns such that each pattern matches an entry of hypertrie. order overrides the
+    order in which the variables are bound.
+    """
+    operands: List[Tuple[Node, List[str]]] = []
+    for pattern in patterns:
+        sliced = hypertrie.slice([None if is_variable(term) else term for term in pattern])
+        if sliced is False:
+            return
+        if sliced is True:
+            continue
+        operands.append((sliced, [term for term in pattern if is_variable(term)]))
+    variables = list(order) if order is not None else _variable_order(patterns)
+    yield from _join(operands, variables, dict())
+
+
+def _join(operands: List[Tuple[Node, List[str]]], variables: List[str],
+          binding: Dict[str, int]) -> Iterator[Dict[str, int]]:
+    if not variables:
+        yield dict(binding)
+        return
+    variable, remaining = variables[0], variables[1:]
+    involved = [i for i, (_, labels) in enumerate(operands) if variable in labels]
+    candidate_keys = [keys(operands[i][0], operands[i][1].index(variable)) for i in involved]
+    candidate_keys.sort(key=len)
+    candidates = candidate_keys[0]
+    for other in candidate_keys[1:]:
+        candidates = np.intersect1d(candidates, other, assume_unique=True)
+    for key in candidates.tolist():
+        sliced_operands = list(operands)
+        for i in involved:
+            node, labels = operands[i]
+            sliced = slice_node(node, {position: key for position, label in enumerate(labels) if label == variable})
+            if sliced is False:
+                break
+            sliced_operands[i] = None if sliced is True else (sliced, [label for label in labels if label != variable])
+        else:
+            binding[variable] = key
+            yield from _join([operand for operand in sliced_operands if operand is not None], remaining, binding)
+            del binding[variable]
@@ -0,0 +1,120 @@
+"""
+Nodes of a hypertrie.
+
+A node of depth d stores a set of d-tuples of integer keys. A FullNode of depth d > 1 maps, for each of its d
+positions, each key at that position to the child of depth d - 1 holding the remaining entries. A LeafNode is a full
+node of depth 1, the sorted array of its keys. A SingleEntryNode is the compressed form of a node with a single entry.
+With inlining, a node of depth 1 with a single entry is replaced by its key, a plain int, in its parent.
+"""
+from typing import Dict, Iterator, List, Mapping, Tuple, Union
+
+import numpy as np
+
+
+class FullNode:
+    __slots__ = ("depth", "edges", "size", "_keys")
+
+    def __init__(self, depth: int, edges: List[Dict[int, "Node"]], size: int):
+        self.depth = depth
+        self.edges = edges
+        self.size = size
+        self._keys: Dict[int, np.ndarray] = dict()
+
+    def keys(self, position: int) -> np.ndarray:
+        keys = self._keys.get(position)
+        if keys is None:
+            keys = self._keys[position] = np.sort(np.fromiter(self.edges[position], dtype=np.int64,
+                                                              count=len(self.edges[position])))
+        return keys
+
+
+class LeafNode:
+    __slots__ = ("keys_array",)
+    depth = 1
+
+    def __init__(self, keys: np.ndarray):
+        self.keys_array = keys
+
+    @property
+    def size(self) -> int:
+        return len(self.keys_array)
+
+    def keys(self, position: int = 0) -> np.ndarray:
+        return self.keys_array
+
+    def __contains__(self, key: int) -> bool:
+        index = np.searchsorted(self.keys_array, key)
+        return index < len(self.keys_array) and self.keys_array[index] == key
+
+
+class SingleEntryNode:
+    __slots__ = ("entry",)
+    size = 1
+
+    def __init__(self, entry: Tuple[int, ...]):
+        self.entry = entry
+
+    @property
+    def depth(self) -> int:
+        return len(self.entry)
+
+    def keys(self, position: int) -> np.ndarray:
+        return np.array([self.entry[position]], dtype=np.int64)
+
+
+# an inlined node of depth 1 with a single entry is its key
+Node = Union[FullNode, LeafNode, SingleEntryNode, int]
+# result of slicing: a node, True if all positions were bound and the entry exists, False if no entry matches
+Slice = Union[Node, bool]
+
+
+def depth(node: Node) -> int:
+    return 1 if isinstance(node, int) else node.depth
+
+
+def size(node: Node) -> int:
+    return 1 if isinstance(node, int) else node.size
+
+
+def keys(node: Node, position: int) -> np.ndarray:
+    """The sorted distinct keys of node at position."""
+    if isinstance(node, int):
+        return np.array([node], dtype=np.int64)
+    return node.keys(position)
+
+
+def slice_node(node: Node, bound: Mapping[int, int]) -> Slice:
+    """The entries of node with the given keys at the bound positions, without the bound positions."""
+    bound = dict(bound)
+    while bound:
+        if isinstance(node, int):
+            return bound[0] == node
+        if isinstance(node, SingleEntryNode):
+            if any(node.entry[position] != key for position, key in bound.items()):
+                return False
+            remaining = tuple(key for position, key in enumerate(node.entry) if position not in bound)
+            return SingleEntryNode(remaining) if remaining else True
+        if isinstance(node, LeafNode):
+            return bound[0] in node
+        position = next(iter(bound))
+        child = node.edges[position].get(bound.pop(position))
+        if child is None:
+            return False
+        node = child
+        bound = {other - (other > position): key for other, key in bound.items()}
+    return node
+
+
+def entries(node: Node) -> Iterator[Tuple[int, ...]]:
+    """All entries of node, ordered by their first key."""
+    if isinstance(node, int):
+        yield node,
+    elif isinstance(node, SingleEntryNode):
+        yield node.entry
+    elif isinstance(node, LeafNode):
+        for key in node.keys_array.tolist():
+            yield key,
+    else:
+        for key in node.keys(0).tolist():
+            for entry in entries(node.edges[0][key]):
+                yield (key,) + entry
@@ -0,0 +1,192 @@
+"""
+Microbenchmarks of the hypertrie variants of the reference implementation in scripts/hypertrie.
+
+For SWDF-like and WatDiv-like synthetic datasets (or integer encoded triples from .npy files), each variant is bulk
+loaded and measured: its node counts and modelled memory, the latency of lookups of single triples and of slices with
+one or two bound positions, and the time of a star and a path join of two triple patterns. The results are written to
+output/hypertrie-microbenchmarks.tsv.
+"""
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+
+from hypertrie.hypertrie import Hypertrie, variants
+from hypertrie.join import generic_join
+
+
+def swdf_like(triples: int, rng: np.random.Generator) -> np.ndarray:
+    """Few entities with many, skewed predicates and mostly literal objects, like the Semantic Web Dog Food."""
+    entities = max(triples // 6, 1)
+    classes = 100
+    subjects = rng.zipf(1.2, triples) % entities
+    predicates = rng.zipf(1.5, triples) % 150
+    # entity references, literals get ids after all entities and classes
+    references = rng.random(triples) < 0.4
+    objects = np.where(references, rng.zipf(1.3, triples) % entities,
+                       entities + classes + rng.integers(0, triples, triples))
+    # predicate 0 is rdf:type
+    objects = np.where(predicates == 0, entities + rng.zipf(1.5, triples) % classes, objects)
+    return np.stack([subjects, predicates, objects], axis=1).astype(np.int64)
+
+
+# (predicate, subject type, object type or None for literals, mean number of objects per subject)
+watdiv_schema = [
+    (1, "user", "user", 5), (2, "user", "user", 3), (3, "user", "product", 2), (4, "user", None, 1),
+    (5, "user", "city", 1), (6, "product", "genre", 1.5), (7, "product", None, 1), (8, "product", None, 1),
+    (9, "review", "product", 1), (10, "review", "user", 1), (11, "review", None, 1), (12, "retailer", "product", 20),
+    (13, "retailer", "city", 1),
+]
+watdiv_type_shares = {"user": 10, "product": 5, "review": 15, "retailer": .1, "city": .2, "genre": .05}
+
+
+def watdiv_like(triples: int, rng: np.random.Generator) -> np.ndarray:
+    """Entities of a few types connected by a fixed schema with skewed targets, like WatDiv."""
+    triples_per_share = sum(watdiv_type_shares[subject_type] * mean for _, subject_type, _, mean in watdiv_schema) \
+        + sum(watdiv_type_shares.values())
+    scale = triples / triples_per_share
+    counts = {entity_type: max(int(share * scale), 1) for entity_type, share in watdiv_type_shares.items()}
+    offsets = dict(zip(counts, np.cumsum([0] + list(counts.values()))))
+    literals = int(offsets["genre"] + counts["genre"]) + len(counts)
+    parts = []
+    for type_id, (entity_type, count) in enumerate(counts.items()):
+        # predicate 0 is rdf:type, the classes get ids after all entities
+        entities = np.arange(count) + offsets[entity_type]
+        parts.append(np.stack([entities, np.zeros(count, dtype=np.int64),
+                               np.full(count, literals - len(counts) + type_id)], axis=1))
+    for predicate, subject_type, object_type, mean in watdiv_schema:
+        per_subject = rng.poisson(mean, counts[subject_type])
+        subjects = np.repeat(np.arange(counts[subject_type]) + offsets[subject_type], per_subject)
+        if object_type is None:
+            objects = literals + rng.integers(0, triples, len(subjects))
+        else:
+            objects = offsets[object_type] + rng.zipf(1.3, len(subjects)) % counts[object_type]
+        parts.append(np.stack([subjects, np.full(len(subjects), predicate), objects], axis=1))
+    return np.concatenate(parts).astype(np.int64)
+
+
+generators = {"swdf": swdf_like, "watdiv": watdiv_like}
+
+
+def _seconds_per_call(function: Callable[[], object], calls: int, repeats: int) -> float:
+    """The fastest of repeats runs of calls calls of function, per call."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / calls
+
+
+def _join_patterns(triples: np.ndarray) -> Dict[str, List[Tuple]]:
+    """A star and a path of two patterns with the most frequent predicates."""
+    predicates, counts = np.unique(triples[:, 1], return_counts=True)
+    frequent = predicates[np.argsort(-counts, kind='stable')].tolist()
+    first = frequent[0]
+    second = frequent[1] if len(frequent) > 1 else first
+    # the path continues from the objects of first with the predicate whose subjects cover most of them
+    objects = np.unique(triples[triples[:, 1] == first, 2])
+    covered = {predicate: np.count_nonzero(np.isin(objects, triples[triples[:, 1] == predicate, 0]))
+               for predicate in frequent[:20]}
+    path = max(covered, key=covered.get)
+    return {"star": [("?x", first, "?y"), ("?x", second, "?z")],
+            "path": [("?x", first, "?y"), ("?y", path, "?z")]}
+
+
+def benchmark(name: str, triples: np.ndarray, variant_names: Sequence[str], lookups: int, repeats: int,
+              join_limit: int, rng: np.random.Generator) -> List[dict]:
+    triples = np.unique(triples, axis=0)
+    sample = triples[rng.integers(0, len(triples), lookups)]
+    absent = np.stack([rng.permutation(sample[:, position]) for position in range(3)], axis=1)
+    # permuted triples which happen to exist are no absent lookups
+    row = np.dtype([("s", np.int64), ("p", np.int64), ("o", np.int64)])
+    absent = absent[~np.isin(absent.view(row).ravel(), triples.view(row).ravel())]
+    patterns = _join_patterns(triples)
+    # bound positions of the slices
+    slice_patterns = {"s": {0}, "p": {1}, "sp": {0, 1}, "po": {1, 2}}
+    results = []
+    for variant in variant_names:
+        start = time.perf_counter()
+        hypertrie = Hypertrie(triples, variant)
+        build_seconds = time.perf_counter() - start
+        result = {"dataset": name, "variant": variant, "triples": len(triples),
+                  "build_s": build_seconds, "memory_bytes": hypertrie.memory_bytes()}
+        for depth, (uncompressed, compressed) in sorted(hypertrie.node_counts().items()):
+            result["depth_{}_nodes".format(depth)] = uncompressed
+            result["depth_{}_compressed_nodes".format(depth)] = compressed
+
+        for kind, entries in [("contains", sample), ("contains_absent", absent)]:
+            entry_list = [tuple(entry) for entry in entries.tolist()]
+            entry_iterator = iter(entry_list * repeats)
+            result[kind + "_us"] = _seconds_per_call(
+                lambda: next(entry_iterator) in hypertrie, len(entry_list), repeats) * 1e6 if entry_list else np.nan
+
+        for kind, bound in slice_patterns.items():
+            slices = [tuple(entry[position] if position in bound else None for position in range(3))
+                      for entry in sample.tolist()]
+            slice_iterator = iter(slices * repeats)
+            result["slice_{}_us".format(kind)] = _seconds_per_call(
+                lambda: hypertrie.slice(next(slice_iterator)), len(slices), repeats) * 1e6
+
+        for kind, join_patterns in patterns.items():
+            solutions = [0]
+
+            def join():
+                solutions[0] = sum(1 for _ in islice(generic_join(hypertrie, join_patterns), join_limit))
+
+            result["join_{}_ms".format(kind)] = _seconds_per_call(join, 1, repeats) * 1e3
+            result["join_{}_solutions".format(kind)] = solutions[0]
+        results.append(result)
+    return results
+
+
+def _parse_input(value: str) -> Tuple[str, Path]:
+    name, separator, path = value.partition("=")
+    if not separator or not name or Path(path).suffix != ".npy" or not Path(path).is_file():
+        raise click.BadParameter("expected NAME=PATH of an existing .npy file, got '{}'".format(value))
+    return name, Path(path)
+
+
+@click.command()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True, path_type=Path),
+              help="Where the output directory is located.")
+@click.option("--dataset", "datasets", multiple=True, default=list(generators), type=click.Choice(list(generators)),
+              help="Synthetic datasets to benchmark. Can be repeated, defaults to all.")
+@click.option("--input", "inputs", multiple=True, callback=lambda ctx, param, values: [_parse_input(v) for v in values],
+              metavar="NAME=PATH", help="Additionally benchmark the integer encoded triples of shape (n, 3) in a .npy "
+                                        "file, as hypertrie_node_counts.py reads them. Can be repeated.")
+@click.option("--triples", default=100_000, type=click.IntRange(min=1),
+              help="Number of triples of each synthetic dataset before removing duplicates.")
+@click.option("--variant", "variant_names", multiple=True, default=list(variants), type=click.Choice(list(variants)),
+              help="Hypertrie variants to benchmark. Can be repeated, defaults to all.")
+@click.option("--lookups", default=1000, type=click.IntRange(min=1), help="Number of lookups per kind.")
+@click.option("--repeats", default=3, type=click.IntRange(min=1), help="Repetitions of each measurement.")
+@click.option("--join-limit", default=100_000, type=click.IntRange(min=1),
+              help="Number of solutions after which a join is stopped.")
+@click.option("--seed", default=42, type=int, help="Seed of the synthetic datasets and the lookup samples.")
+def hypertrie_microbenchmarks(base_dir: Path, datasets: Sequence[str], inputs: List[Tuple[str, Path]], triples: int,
+                              variant_names: Sequence[str], lookups: int, repeats: int, join_limit: int,
+                              seed: int):
+    rng = np.random.default_rng(seed)
+    inputs_by_name: Dict[str, Optional[Path]] = {name: None for name in datasets}
+    inputs_by_name.update(dict(inputs))
+    results = []
+    for name, input_file in inputs_by_name.items():
+        data = generators[name](triples, rng) if input_file is None else np.load(input_file).astype(np.int64)
+        click.echo("Benchmarking {} ({} triples)".format(name, len(data)), err=True)
+        results.extend(benchmark(name, data, variant_names, lookups, repeats, join_limit, rng))
+
+    output_dir = base_dir.joinpath("output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results = pd.DataFrame(results)
+    results.to_csv(output_dir.joinpath("hypertrie-microbenchmarks.tsv"), sep="\t", index=False)
+    click.echo(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    hypertrie_microbenchmarks()
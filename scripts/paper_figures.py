@@ -0,0 +1,93 @@
+"""
+Renders any subset of the paper figures in one process.
+
+The data of the base dir is loaded into one `FigureData`, so each input file is read and each derived table is built
+once, however many figures use it. `render` writes the figures and their tables, `tables` only the tables, which does
+not need plotnine or a LaTeX installation. The `paper-*.py` scripts render their figures the same way.
+
+The data modules, and with them pandas, are imported only once a command runs and the plotting libraries only by
+`render`, so `--help` and argument errors do not wait for them.
+
+The heatmaps compare the triple stores to every Tentris variant by default, `--reference` selects other reference
+stores by their short names.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+import click
+
+from util.profiling import profile_option, profiler
+
+if TYPE_CHECKING:
+    from util.figure_data import FigureData
+
+# the keys of figure_tables in util/figure_data.py and of renderers in util/figures.py
+figure_names = ["benchmark-results", "heatmaps", "node-count", "full-node-count", "index-sizes", "loading-times"]
+
+
+def figure_data(base_dir: Path, node_stats: bool = False, references: Sequence[str] = ()) -> FigureData:
+    """
+    The data of base_dir, with heatmaps relative to references or the default ones. Exits if the data dir or, if
+    node_stats is set, the hypertrie node stats are missing.
+    """
+    with profiler.step("import data"):
+        from util.figure_data import FigureData
+    data = FigureData(base_dir, references)
+    if not data.data_dir.exists() or (node_stats and not data.node_stats_dir.exists()):
+        print("There must be a data folder provided in the base-dir. "
+              "By default the current working directory is used. ",
+              file=sys.stderr)
+        exit(1)
+    return data
+
+
+def write_figure_tables(data: FigureData, names: Sequence[str]):
+    from util.figure_data import figure_tables, write_tables
+    for name in names:
+        write_tables(figure_tables[name](data), data.base_dir)
+
+
+def render_figures(data: FigureData, names: Sequence[str]):
+    """Renders the figures names and writes their tables."""
+    with profiler.step("import plotting"):
+        from util.figures import renderers
+    output_dir = data.base_dir.joinpath("output", "figures")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        renderers[name](data, output_dir)
+    write_figure_tables(data, names)
+
+
+@click.group()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(file_okay=False, path_type=Path),
+              help="Where the data and raw_data directories are located.")
+@click.option("--reference", "references", multiple=True,
+              help="Short name of a triple store, e.g. T-hsi, to which the heatmaps compare the other stores. "
+                   "Can be repeated, defaults to all Tentris variants.")
+@profile_option
+@click.pass_context
+def paper_figures(ctx: click.Context, base_dir: Path, references: Sequence[str]):
+    ctx.obj = {"base_dir": base_dir, "references": references}
+
+
+@paper_figures.command()
+@click.argument("names", nargs=-1, type=click.Choice(figure_names))
+@click.pass_obj
+def render(options: dict, names: Sequence[str]):
+    """Renders the figures NAMES, or all figures if none are given."""
+    render_figures(figure_data(options["base_dir"], references=options["references"]), names or figure_names)
+
+
+@paper_figures.command()
+@click.argument("names", nargs=-1, type=click.Choice(figure_names))
+@click.pass_obj
+def tables(options: dict, names: Sequence[str]):
+    """Writes only the tables of the figures NAMES, or of all figures if none are given."""
+    write_figure_tables(figure_data(options["base_dir"], references=options["references"]), names or figure_names)
+
+
+if __name__ == '__main__':
+    paper_figures()
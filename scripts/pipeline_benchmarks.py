@@ -0,0 +1,166 @@
+"""
+Scaling benchmarks of the pipeline stages on synthetic IGUANA results.
+
+For each number of query executions, synthetic_iguana_data.py writes the inputs of the pipeline to a fresh base dir.
+Then every stage of run_pipeline.py runs in dependency order with --profile. The wall and CPU time, peak RSS and rows
+per second of each stage are taken from its profiling report and written to output/pipeline-benchmarks.tsv. Sizes above
+--raw-limit are generated as converted CSV files instead of N-Triples, so the stages that convert the raw data are
+skipped for them.
+
+With --baseline, the results are compared to an earlier output/pipeline-benchmarks.tsv. A stage regressed if it took
+more than --tolerance times its baseline wall time and at least --min-seconds longer. The exit code is 1 if a stage
+regressed or failed.
+
+pandas and the generator are imported only once the benchmarks run, so that `--help` starts quickly.
+"""
+from __future__ import annotations
+
+import json
+import math
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import click
+
+from run_pipeline import Stage, stages
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from synthetic_iguana_data import Config
+
+conversion_stages = {"prepare_benchmarking_data", "prepare_parsed_results_data"}
+result_columns = ["rows", "stage", "status", "wall_s", "cpu_s", "peak_rss_mib", "children_peak_rss_mib", "rows_per_s"]
+
+
+def size_config(rows: int, queries: int, clients: int, seed: int) -> Config:
+    """A config of the default triple stores and datasets with at least rows executions, scaled by the runs."""
+    from synthetic_iguana_data import Config, default_datasets, default_triplestores
+    per_run = len(default_triplestores) * len(default_datasets) * queries * clients
+    return Config(queries=queries, clients=clients, runs=max(math.ceil(rows / per_run), 1), seed=seed)
+
+
+def _stage_arguments(stage: Stage, base_dir: Path, workers: Optional[int]) -> List[str]:
+    arguments = []
+    if stage.name == "prepare_parsed_results_data":
+        arguments += ["--query-registry", str(base_dir.joinpath("raw_data", "query_registry.json"))]
+    if workers is not None and stage.name in ["prepare_benchmarking_data", "prepare_parsed_results_data",
+                                              "combine_data"]:
+        arguments += ["--workers", str(workers)]
+    return arguments
+
+
+def run_stage(stage: Stage, base_dir: Path, rows: int, workers: Optional[int]) -> Dict[str, object]:
+    report_file = base_dir.joinpath("profile", stage.name + ".json")
+    command = [sys.executable, str(stage.script), "--profile", str(report_file)] + \
+        _stage_arguments(stage, base_dir, workers)
+    # the scripts resolve the data directories relative to the working directory
+    result = subprocess.run(command, cwd=base_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    row = {"rows": rows, "stage": stage.name, "status": "ok" if result.returncode == 0 else "failed"}
+    if result.returncode != 0:
+        click.echo("[{}] failed with exit code {}:\n{}".format(stage.name, result.returncode, result.stdout[-2000:]),
+                   err=True)
+    if report_file.exists():
+        total = json.loads(report_file.read_text())["total"]
+        row.update({name: total[name] for name in ["wall_s", "cpu_s", "peak_rss_mib", "children_peak_rss_mib"]})
+        row["rows_per_s"] = rows / total["wall_s"] if total["wall_s"] else None
+    return row
+
+
+def regressions(results: pd.DataFrame, baseline: pd.DataFrame, tolerance: float, min_seconds: float) -> pd.DataFrame:
+    """The stages of results which are slower than in baseline, with the baseline wall time and the ratio."""
+    compared = results.merge(baseline[["rows", "stage", "wall_s"]].rename(columns={"wall_s": "baseline_wall_s"}),
+                             on=["rows", "stage"], how="inner")
+    compared["ratio"] = compared["wall_s"] / compared["baseline_wall_s"]
+    slower = (compared["wall_s"] > compared["baseline_wall_s"] * tolerance) & \
+        (compared["wall_s"] - compared["baseline_wall_s"] >= min_seconds)
+    return compared[slower]
+
+
+@click.command()
+@click.option("--rows", "sizes", multiple=True, type=click.IntRange(min=1),
+              default=[10_000, 100_000, 1_000_000, 10_000_000, 100_000_000], show_default=True,
+              help="Number of query executions to benchmark. Can be repeated.")
+@click.option("--stage", "stage_names", multiple=True, type=click.Choice([stage.name for stage in stages]),
+              help="Stages to benchmark. Can be repeated, defaults to all stages. The stages they depend on run, but "
+                   "are not reported.")
+@click.option("--queries", default=50, type=click.IntRange(min=1), help="Queries per dataset.")
+@click.option("--clients", default=1, type=click.IntRange(min=1), help="Clients per task.")
+@click.option("--raw-limit", default=1_000_000, type=click.IntRange(min=0), show_default=True,
+              help="Sizes above this number of rows are generated as converted CSV files instead of N-Triples.")
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Number of worker processes of the stages. Defaults to the number of CPUs.")
+@click.option("--seed", default=42, type=int, help="Seed of the synthetic data.")
+@click.option("--work-dir", default=None, type=click.Path(file_okay=False, path_type=Path),
+              help="Where the base dirs of the sizes are created. Defaults to a temporary directory.")
+@click.option("--keep", is_flag=True, help="Keep the base dirs of the sizes instead of deleting them.")
+@click.option("--output", default=Path("output/pipeline-benchmarks.tsv"),
+              type=click.Path(dir_okay=False, path_type=Path), help="Where the results are written.")
+@click.option("--baseline", default=None, type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="Results of an earlier run to detect regressions.")
+@click.option("--tolerance", default=1.25, type=click.FloatRange(min=1), show_default=True,
+              help="A stage regressed if its wall time exceeds this multiple of its baseline wall time.")
+@click.option("--min-seconds", default=1.0, type=click.FloatRange(min=0), show_default=True,
+              help="A stage regressed only if it took at least this much longer than in the baseline.")
+def pipeline_benchmarks(sizes: Sequence[int], stage_names: Sequence[str], queries: int, clients: int, raw_limit: int,
+                        workers: Optional[int], seed: int, work_dir: Optional[Path], keep: bool, output: Path,
+                        baseline: Optional[Path], tolerance: float, min_seconds: float):
+    """Times the pipeline stages on synthetic data of increasing size."""
+    import pandas as pd
+    from synthetic_iguana_data import generate
+    work_dir = work_dir or Path(tempfile.mkdtemp(prefix="pipeline-benchmarks-"))
+    selected = set(stage_names or [stage.name for stage in stages])
+    # the stages a selected stage depends on run, too
+    producers = {output: stage for stage in stages for output in stage.outputs}
+    for stage in reversed(stages):
+        if stage.name in selected:
+            selected |= {producers[input].name for input in stage.inputs if input in producers}
+
+    rows = []
+    for size in sorted(sizes):
+        config = size_config(size, queries, clients, seed)
+        results_format = "nt" if size <= raw_limit else "csv"
+        base_dir = work_dir.joinpath(str(size))
+        shutil.rmtree(base_dir, ignore_errors=True)
+        click.echo("[{}] generating {} executions as {}".format(size, config.rows, results_format))
+        generate(config, base_dir, results_format)
+        for stage in stages:
+            if stage.name not in selected:
+                continue
+            if results_format == "csv" and stage.name in conversion_stages:
+                rows.append({"rows": config.rows, "stage": stage.name, "status": "skipped"})
+                continue
+            row = run_stage(stage, base_dir, config.rows, workers)
+            click.echo("[{}] {} {} {}".format(size, stage.name, row["status"],
+                                              "in {:.1f}s".format(row["wall_s"]) if "wall_s" in row else ""))
+            if not stage_names or stage.name in stage_names:
+                rows.append(row)
+        if not keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    if not keep and not any(work_dir.iterdir()):
+        work_dir.rmdir()
+
+    results = pd.DataFrame(rows).reindex(columns=result_columns)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(output, sep="\t", index=False)
+    click.echo("Results were written to {}".format(output.absolute()))
+
+    failed = results[results["status"] == "failed"]
+    if baseline is not None:
+        regressed = regressions(results[results["status"] == "ok"], pd.read_csv(baseline, sep="\t"), tolerance,
+                                min_seconds)
+        for _, row in regressed.iterrows():
+            click.echo("Regression: {} on {} rows took {:.1f}s instead of {:.1f}s ({:.2f}x)".format(
+                row["stage"], row["rows"], row["wall_s"], row["baseline_wall_s"], row["ratio"]), err=True)
+        if len(regressed):
+            exit(1)
+    if len(failed):
+        exit(1)
+
+
+if __name__ == '__main__':
+    pipeline_benchmarks()
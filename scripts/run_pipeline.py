@@ -0,0 +1,224 @@
+"""
+Runs the preprocessing stages and the paper scripts, skipping stages whose inputs did not change since their last
+successful run.
+
+Each stage declares its input and output files or directories relative to the base dir. Inputs include the scripts
+themselves, so changing a figure script reruns only that figure. Inputs are fingerprinted by their content. The
+fingerprints of the last successful runs are kept in `.pipeline_state.json` in the base dir. Stages that consume the
+outputs of other stages run after them, independent stages run concurrently.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import click
+
+scripts_dir = Path(__file__).absolute().parent
+state_file_name = ".pipeline_state.json"
+
+
+class Stage:
+    def __init__(self, name: str, script: str, inputs: List[str], outputs: List[str], sources: List[str] = ()):
+        """
+        :param name: name of the stage
+        :param script: script to run, relative to the scripts dir
+        :param inputs: data files or directories read by the stage, relative to the base dir
+        :param outputs: files written by the stage, relative to the base dir
+        :param sources: modules used by the script, relative to the scripts dir
+        """
+        self.name = name
+        self.script = scripts_dir.joinpath(script)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.sources = [self.script] + [scripts_dir.joinpath(source) for source in sources]
+
+
+preprocessing_sources = ["0_preprocess/remove_rc_from_version.py", "0_preprocess/parallel_ingest.py",
+                         "util/columnar_cache.py", "util/profiling.py"]
+# the paper scripts render their figures with paper_figures.py from the tables of util/figure_data.py
+figure_sources = ["paper_figures.py", "util/figure_data.py", "util/figures.py", "util/bootstrap.py",
+                  "util/columnar_cache.py", "util/human_format.py", "util/index_size_model.py", "util/node_stats.py",
+                  "util/profiling.py", "util/query_mixes.py", "util/relative_speedup.py", "util/schema.py"]
+
+stages = [
+    Stage("prepare_benchmarking_data", "0_preprocess/prepare_benchmarking_data.py",
+          inputs=["raw_data/benchmarking_results"],
+          outputs=["data/benchmarking_results.csv"],
+          sources=preprocessing_sources + ["0_preprocess/iguana_nt_to_csv.py", "0_preprocess/external_sort.py"]),
+    Stage("prepare_parsed_results_data", "0_preprocess/prepare_parsed_results_data.py",
+          inputs=["raw_data/parsed_results"],
+          outputs=["data/parsed_results_stats.csv"],
+          sources=preprocessing_sources + ["0_preprocess/query_registry.py", "0_preprocess/query_registry.json",
+                                           "0_preprocess/external_sort.py"]),
+    Stage("extract_dataset_stats", "0_preprocess/extract_dataset_stats.py",
+          inputs=["raw_data/hypertrie_node_stats"],
+          outputs=["data/dataset_stats.tsv"],
+          sources=["0_preprocess/nt_dataset_stats.py", "0_preprocess/external_sort.py", "util/profiling.py"]),
+    Stage("combine_data", "0_preprocess/combine_data.py",
+          inputs=["data/benchmarking_results.csv", "data/parsed_results_stats.csv"],
+          outputs=["data/result_stats_ground_truth.csv", "data/exclude_queries.json",
+                   "data/benchmarking_results_with_result_stats.csv",
+                   "data/benchmarking_results_with_result_stats_agg.csv"],
+          sources=["0_preprocess/ground_truth.py", "0_preprocess/aggregate_state.py",
+                   "0_preprocess/descriptive_stats.py", "0_preprocess/partitioned_frames.py",
+                   "0_preprocess/parallel_aggregate.py", "util/columnar_cache.py", "util/profiling.py"]),
+    Stage("paper-box-plot-array", "paper-box-plot-array.py",
+          inputs=["data/benchmarking_results_with_result_stats.csv",
+                  "data/benchmarking_results_with_result_stats_agg.csv",
+                  "data/watdiv_query_names.tsv"],
+          outputs=["output/figures/paper-benchmark-results.pdf", "output/figures/paper-benchmark-results-scatter.tsv",
+                   "output/figures/paper-benchmark-results-QMpH.tsv",
+                   "output/figures/paper-benchmark-results-QMpH-per-mix.tsv",
+                   "output/figures/paper-heatmap-watdiv-rel-T-hsi.pdf"],
+          sources=figure_sources),
+    Stage("paper-node-frequency", "paper-node-frequency.py",
+          inputs=["raw_data/hypertrie_node_stats"],
+          outputs=["data/long_node_counts.tsv", "output/figures/paper-node-count.pdf"],
+          sources=figure_sources),
+    Stage("paper-fullnode-frequency", "paper-fullnode-frequency.py",
+          inputs=["raw_data/hypertrie_node_stats"],
+          outputs=["data/long_fullnode_counts.tsv", "output/figures/paper-full-node-count.pdf"],
+          sources=figure_sources),
+    Stage("paper-index-sizes-and-loading-times", "paper-index-sizes-and-loading-times.py",
+          inputs=["data/index_sizes_and_loading_times.tsv", "data/dataset_stats.tsv",
+                  "raw_data/hypertrie_node_stats"],
+          outputs=["output/figures/paper-index-sizes.pdf", "output/figures/paper-loading-times.pdf",
+                   "output/figures/paper-index-size-predictions.tsv"],
+          sources=figure_sources),
+]
+
+
+def _files(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(file for file in path.rglob("*") if file.is_file())
+    return [path] if path.exists() else []
+
+
+class Fingerprints:
+    """Content hashes of files. A file is only hashed again if its size or modification time changed."""
+
+    def __init__(self, known: Dict[str, list]):
+        self.known = known
+
+    def file(self, file: Path) -> str:
+        stat = file.stat()
+        key = str(file.absolute())
+        known = self.known.get(key)
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(2 ** 20), b""):
+                content_hash.update(block)
+        digest = content_hash.hexdigest()
+        self.known[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def paths(self, paths: Iterable[Path], base_dir: Path) -> str:
+        combined = hashlib.blake2b(digest_size=16)
+        for path in paths:
+            for file in _files(path):
+                combined.update(os.path.relpath(file, base_dir).encode())
+                combined.update(self.file(file).encode())
+        return combined.hexdigest()
+
+
+def _dependencies(selected: List[Stage]) -> Dict[str, Set[str]]:
+    producers = {output: stage.name for stage in selected for output in stage.outputs}
+    return {stage.name: {producers[input] for input in stage.inputs if input in producers} for stage in selected}
+
+
+def _run(stage: Stage, base_dir: Path, profile_dir: Optional[Path] = None) -> subprocess.CompletedProcess:
+    # the scripts resolve the data directories relative to the working directory
+    arguments = [] if profile_dir is None else ["--profile", str(profile_dir.joinpath(stage.name + ".json"))]
+    return subprocess.run([sys.executable, str(stage.script)] + arguments, cwd=base_dir, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True)
+
+
+@click.command()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(exists=True, file_okay=False),
+              help="Where the data and raw_data directories are located.")
+@click.option("--jobs", default=None, type=click.IntRange(min=1),
+              help="Number of stages run at the same time. Defaults to the number of CPUs.")
+@click.option("--force", is_flag=True, help="Run all selected stages, even if their inputs did not change.")
+@click.option("--profile", "profile_dir", default=None, type=click.Path(file_okay=False),
+              help="Profile the stages which are run and write a JSON report per stage to <stage>.json in this "
+                   "directory.")
+@click.argument("stage_names", nargs=-1)
+def run_pipeline(base_dir: str, jobs: Optional[int], force: bool, profile_dir: Optional[str], stage_names: List[str]):
+    """Runs the stages STAGE_NAMES, or all stages if none are given."""
+    base_dir = Path(base_dir).absolute()
+    profile_dir = Path(profile_dir).absolute() if profile_dir is not None else None
+    unknown = set(stage_names) - {stage.name for stage in stages}
+    if unknown:
+        click.echo("Unknown stages: {}. Available stages: {}".format(
+            ", ".join(sorted(unknown)), ", ".join(stage.name for stage in stages)), err=True)
+        exit(1)
+    selected = [stage for stage in stages if not stage_names or stage.name in stage_names]
+
+    state_file = base_dir.joinpath(state_file_name)
+    state = json.loads(state_file.read_text()) if state_file.exists() else {"stages": {}, "files": {}}
+    fingerprints = Fingerprints(state["files"])
+
+    dependencies = _dependencies(selected)
+    pending = {stage.name: stage for stage in selected}
+    failed: Set[str] = set()
+    running = dict()
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if dependencies[name] & (set(pending) | set(running.values())):
+                    continue
+                del pending[name]
+                if dependencies[name] & failed:
+                    click.echo("[{}] skipped, because a stage it depends on failed".format(name))
+                    failed.add(name)
+                    continue
+                inputs = [base_dir.joinpath(input) for input in stage.inputs]
+                outputs = [base_dir.joinpath(output) for output in stage.outputs]
+                if not all(input.exists() for input in inputs):
+                    if all(output.exists() for output in outputs):
+                        click.echo("[{}] skipped, inputs are missing but outputs exist".format(name))
+                    else:
+                        click.echo("[{}] failed, inputs are missing: {}".format(name, ", ".join(
+                            str(input.relative_to(base_dir)) for input in inputs if not input.exists())), err=True)
+                        failed.add(name)
+                    continue
+                fingerprint = fingerprints.paths(stage.sources + inputs, base_dir)
+                if (not force and state["stages"].get(name) == fingerprint
+                        and all(output.exists() for output in outputs)):
+                    click.echo("[{}] up to date".format(name))
+                    continue
+                click.echo("[{}] running".format(name))
+                running[executor.submit(_run, stage, base_dir, profile_dir)] = name
+                state["stages"].pop(name, None)
+                stage.fingerprint = fingerprint
+                stage.start = time.time()
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = next(stage for stage in selected if stage.name == name)
+                result = future.result()
+                if result.returncode == 0:
+                    state["stages"][name] = stage.fingerprint
+                    click.echo("[{}] finished in {:.1f}s".format(name, time.time() - stage.start))
+                else:
+                    failed.add(name)
+                    click.echo("[{}] failed with exit code {}:\n{}".format(name, result.returncode, result.stdout),
+                               err=True)
+            state_file.write_text(json.dumps(state, indent=1))
+
+    state_file.write_text(json.dumps(state, indent=1))
+    exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    run_pipeline()
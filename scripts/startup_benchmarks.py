@@ -0,0 +1,116 @@
+"""
+Startup benchmarks of the command line interfaces.
+
+Each command runs with `--help` under `python -X importtime` --repeat times. The fastest wall time and the top-level
+packages it imported are written to output/startup-benchmarks.tsv. No command may import the plotting libraries before
+it parsed its arguments, and the data-only commands must also start within --budget seconds without pandas, numpy,
+scipy or the other heavy libraries, as they only need them once they process data. The exit code is 1 if a command
+violates this or fails.
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence, Set, Tuple
+
+import click
+
+scripts_dir = Path(__file__).parent
+plotting_packages = {"plotnine", "matplotlib", "mizani", "plotly"}
+heavy_packages = plotting_packages | {"pandas", "numpy", "scipy", "pyarrow", "dfply", "janitor"}
+
+
+class Command(NamedTuple):
+    name: str
+    arguments: List[str]
+    data_only: bool
+
+
+commands = [
+    Command("extract_dataset_stats", ["0_preprocess/extract_dataset_stats.py"], True),
+    Command("prepare_benchmarking_data", ["0_preprocess/prepare_benchmarking_data.py"], True),
+    Command("prepare_parsed_results_data", ["0_preprocess/prepare_parsed_results_data.py"], True),
+    Command("iguana_nt_to_csv", ["0_preprocess/iguana_nt_to_csv.py"], True),
+    Command("combine_data", ["0_preprocess/combine_data.py"], True),
+    Command("hypertrie_node_counts", ["0_preprocess/hypertrie_node_counts.py"], False),
+    Command("run_pipeline", ["run_pipeline.py"], True),
+    Command("paper_figures", ["paper_figures.py"], True),
+    Command("paper_figures tables", ["paper_figures.py", "tables"], True),
+    Command("paper_figures render", ["paper_figures.py", "render"], True),
+    Command("pipeline_benchmarks", ["pipeline_benchmarks.py"], True),
+    Command("synthetic_iguana_data", ["synthetic_iguana_data.py"], True),
+    Command("hypertrie_microbenchmarks", ["hypertrie_microbenchmarks.py"], False),
+    Command("profiling compare", ["util/profiling.py"], True),
+    Command("schema report", ["util/schema.py"], True),
+]
+
+
+def imported_packages(importtime: str) -> Set[str]:
+    """The top-level packages in the stderr of `python -X importtime`."""
+    packages = set()
+    for line in importtime.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            module = line.rsplit("|", 1)[1].strip()
+            if module != "imported package":
+                packages.add(module.split(".")[0])
+    return packages
+
+
+def measure(command: Command, repeat: int) -> Tuple[float, Set[str], int]:
+    """The fastest wall time of repeat runs of command, the packages it imported and its last exit code."""
+    best = float("inf")
+    packages = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime"] + command.arguments + ["--help"],
+                                cwd=scripts_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        best = min(best, time.perf_counter() - start)
+        packages = imported_packages(result.stderr)
+    return best, packages, result.returncode
+
+
+def violations(command: Command, wall_s: float, packages: Set[str], budget: float) -> List[str]:
+    forbidden = heavy_packages if command.data_only else plotting_packages
+    found = ["imports " + package for package in sorted(packages & forbidden)]
+    if command.data_only and wall_s > budget:
+        found.append("took {:.3f}s, more than the budget of {:.3f}s".format(wall_s, budget))
+    return found
+
+
+@click.command()
+@click.option("--command", "command_names", multiple=True, type=click.Choice([command.name for command in commands]),
+              help="Commands to benchmark. Can be repeated, defaults to all commands.")
+@click.option("--repeat", default=5, type=click.IntRange(min=1), show_default=True,
+              help="Runs per command, of which the fastest is reported.")
+@click.option("--budget", default=0.5, type=click.FloatRange(min=0), show_default=True,
+              help="Seconds within which the data-only commands must start.")
+@click.option("--output", default=Path("output/startup-benchmarks.tsv"),
+              type=click.Path(dir_okay=False, path_type=Path), help="Where the results are written.")
+def startup_benchmarks(command_names: Sequence[str], repeat: int, budget: float, output: Path):
+    """Times the startup of the commands and checks that they do not import heavy libraries before they need them."""
+    rows: List[Dict[str, object]] = []
+    failed = False
+    for command in commands:
+        if command_names and command.name not in command_names:
+            continue
+        wall_s, packages, returncode = measure(command, repeat)
+        found = violations(command, wall_s, packages, budget)
+        if returncode != 0:
+            found.append("failed with exit code {}".format(returncode))
+        failed |= bool(found)
+        click.echo("{:<28} {:.3f}s {}".format(command.name, wall_s, "; ".join(found) or "ok"))
+        rows.append({"command": command.name, "data_only": command.data_only, "wall_s": round(wall_s, 4),
+                     "heavy_imports": ",".join(sorted(packages & heavy_packages)), "status": "; ".join(found) or "ok"})
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w") as file:
+        file.write("\t".join(rows[0]) + "\n")
+        for row in rows:
+            file.write("\t".join(str(value) for value in row.values()) + "\n")
+    click.echo("Results were written to {}".format(output.absolute()))
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    startup_benchmarks()
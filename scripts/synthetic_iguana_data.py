@@ -0,0 +1,308 @@
+"""
+Synthetic IGUANA benchmark results to test the performance of the evaluation pipeline without the raw data.
+
+For each triple store and dataset, one IGUANA result file in N-Triples is written to raw_data/benchmarking_results.
+It holds one task in which each client runs every query of the dataset once per query mix. The parsed result sizes of
+the queries are written to raw_data/parsed_results. The runtimes are log-normal: each query has a base runtime, each
+triple store a speed factor. Executions fail or time out at the given rates, and each triple store returns a wrong
+result for some queries. For each dataset, the hypertrie node stats of a small synthetic dataset are written to
+raw_data/hypertrie_node_stats. data/index_sizes_and_loading_times.tsv and data/watdiv_query_names.tsv complete the
+inputs of the figure scripts. The datasets must be registered in the query registry that is written to
+raw_data/query_registry.json.
+
+With --results-format csv, the executions and parsed results are written to data/benchmarking_results.csv and
+data/parsed_results_stats.csv instead, as prepare_benchmarking_data.py and prepare_parsed_results_data.py would write
+them. This skips the conversion stages and is much faster for large sizes.
+"""
+from __future__ import annotations
+
+import csv
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Sequence, TextIO
+
+import click
+
+sys.path.append(str(Path(__file__).absolute().parent.joinpath("0_preprocess")))
+from iguana_nt_to_csv import IPROP, RDFS, XSD, fieldnames, penalty_time
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+default_triplestores = ['tentris-1.0.7', 'tentris-1.1.0_hashing_only', 'tentris-1.1.0_lsb_unused_0',
+                        'tentris-1.1.0_lsb_unused_1', 'blazegraph', 'fuseki', 'fuseki-ltj', 'graphdb', 'gstore',
+                        'virtuoso']
+default_datasets = ['swdf', 'dbpedia2015', 'watdiv10000', 'wikidata-2020-11-11']
+# names of the triple stores in index_sizes_and_loading_times.tsv which differ from the benchmark results
+index_triplestore_names = {'tentris-1.0.7': 'tentris-1.0.7_lsb_unused_0'}
+parsed_fieldnames = ['triplestore', 'dataset', 'queryID', 'contentLength', 'parsingSucceeded', 'numberOfVariables',
+                     'numberOfSolutions', 'numberOfBindings', 'resultParsingTime', 'parsingErrorMessage']
+start_date = "2021-03-01T12:00:00Z"
+resource_prefix = "http://iguana-benchmark.eu/resource/"
+
+
+class Config(NamedTuple):
+    triplestores: Sequence[str] = default_triplestores
+    datasets: Sequence[str] = default_datasets
+    queries: int = 50
+    clients: int = 1
+    runs: int = 10
+    failure_rate: float = .02
+    timeout_rate: float = .01
+    wrong_result_rate: float = .02
+    seed: int = 42
+
+    @property
+    def rows(self) -> int:
+        return len(self.triplestores) * len(self.datasets) * self.queries * self.clients * self.runs
+
+
+class _Queries(NamedTuple):
+    base_times: np.ndarray
+    solutions: np.ndarray
+    variables: np.ndarray
+
+
+def _content_length(solutions: np.ndarray, variables: np.ndarray) -> np.ndarray:
+    """Bytes of a SPARQL JSON result: a header and about 40 bytes per binding."""
+    return 100 + 40 * solutions * variables
+
+
+def executions(config: Config, triplestore: str, dataset: str, queries: _Queries, speed: float,
+               wrong: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    The executions of all query mixes of triplestore on dataset, with the columns of benchmarking_results.csv. wrong
+    marks the queries for which the triple store returns a wrong result.
+    """
+    import numpy as np
+    import pandas as pd
+    shape = (config.clients, config.queries, config.runs)
+    client_ids, query_ids, runs = (grid.ravel() for grid in np.indices(shape))
+    runs = runs + 1
+    size = len(query_ids)
+    times = queries.base_times[query_ids] * speed * rng.lognormal(0, .3, size)
+    outcome = rng.random(size)
+    codes = np.where(outcome < config.timeout_rate, -1,
+                     np.where(outcome < config.timeout_rate + config.failure_rate,
+                              np.where(rng.random(size) < .5, 0, -2), 1))
+    success = codes == 1
+    times = np.where(codes == -1, penalty_time, times)
+    solutions = np.where(wrong, queries.solutions // 2 + 1, queries.solutions)[query_ids]
+    content_lengths = np.where(success, _content_length(solutions, queries.variables[query_ids]), 0)
+    qps = 1000.0 / times
+    return pd.DataFrame({
+        "starttime": str(pd.Timestamp(start_date).to_pydatetime()),
+        "benchmarkID": _task_iri(triplestore, dataset),
+        "format": "HTTP",
+        "dataset": dataset,
+        "triplestore": triplestore,
+        "noclients": config.clients,
+        "clientID": client_ids,
+        "queryID": query_ids,
+        "run": runs,
+        "qps": qps,
+        "penalizedQPS": np.where(success, qps, 1.0 / 180.0),
+        "succeeded": success.astype(int),
+        "failed": (~success).astype(int),
+        "timeouts": (codes == -1).astype(int),
+        "unknownExceptions": (codes == 0).astype(int),
+        "wrongCodes": (codes == -2).astype(int),
+        "time": times,
+        "contentLength": content_lengths,
+        "penalizedTime": np.where(success, times, penalty_time),
+    }, columns=fieldnames)
+
+
+def parsed_results(triplestore: str, dataset: str, queries: _Queries, wrong: np.ndarray,
+                   rng: np.random.Generator) -> pd.DataFrame:
+    """The parsed result of each query of triplestore on dataset, with the columns of parsed_results_stats.csv."""
+    import numpy as np
+    import pandas as pd
+    solutions = np.where(wrong, queries.solutions // 2 + 1, queries.solutions)
+    return pd.DataFrame({
+        "triplestore": triplestore,
+        "dataset": dataset,
+        "queryID": np.arange(len(solutions)),
+        "contentLength": _content_length(solutions, queries.variables),
+        "parsingSucceeded": True,
+        "numberOfVariables": queries.variables,
+        "numberOfSolutions": solutions,
+        "numberOfBindings": solutions * queries.variables,
+        "resultParsingTime": solutions * rng.uniform(.001, .01, len(solutions)),
+        "parsingErrorMessage": "",
+    }, columns=parsed_fieldnames)
+
+
+def _task_iri(triplestore: str, dataset: str) -> str:
+    return "{}task/{}/{}".format(resource_prefix, triplestore, dataset)
+
+
+def _literal(value, datatype: str) -> str:
+    return '"{}"^^<{}{}>'.format(value, XSD, datatype)
+
+
+def iguana_lines(config: Config, triplestore: str, dataset: str, rows: pd.DataFrame) -> Iterator[str]:
+    """The N-Triples of an IGUANA result file of one task with the executions in rows."""
+    task = _task_iri(triplestore, dataset)
+    experiment = "{}experiment/{}/{}".format(resource_prefix, triplestore, dataset)
+    dataset_iri = "{}dataset/{}".format(resource_prefix, dataset)
+    connection = "{}connection/{}".format(resource_prefix, triplestore)
+    yield "<{}> <{}dataset> <{}> .\n".format(experiment, IPROP, dataset_iri)
+    yield '<{}> <{}label> "{}" .\n'.format(dataset_iri, RDFS, dataset)
+    yield "<{}> <{}task> <{}> .\n".format(experiment, IPROP, task)
+    yield "<{}> <{}startDate> {} .\n".format(task, RDFS, _literal(start_date, "dateTime"))
+    yield "<{}> <{}connection> <{}> .\n".format(task, IPROP, connection)
+    yield '<{}> <{}label> "{}" .\n'.format(connection, RDFS, triplestore)
+    yield "<{}> <{}noOfWorkers> {} .\n".format(task, IPROP, _literal(config.clients, "int"))
+    yield "<{}> <{}numberOfQueryMixes> {} .\n".format(task, IPROP, _literal(config.runs, "int"))
+    for query_id in range(config.queries):
+        yield '<{}query/{}/{}> <{}ID> {} .\n'.format(resource_prefix, dataset, query_id, RDFS,
+                                                     _literal(query_id, "int"))
+    for client_id in range(config.clients):
+        worker = "{}/worker/{}".format(task, client_id)
+        yield "<{}> <{}workerResult> <{}> .\n".format(task, IPROP, worker)
+        yield '<{}> <{}workerType> "SPARQL HTTP Worker" .\n'.format(worker, IPROP)
+        yield "<{}> <{}workerID> {} .\n".format(worker, IPROP, _literal(client_id, "int"))
+        for query_id in range(config.queries):
+            query = "{}/query/{}".format(worker, query_id)
+            yield "<{}> <{}query> <{}> .\n".format(worker, IPROP, query)
+            yield "<{}> <{}queryID> <{}query/{}/{}> .\n".format(query, IPROP, resource_prefix, dataset, query_id)
+    columns = zip(rows["clientID"].tolist(), rows["queryID"].tolist(), rows["run"].tolist(),
+                  rows["time"].tolist(), rows["contentLength"].tolist(), rows["succeeded"].tolist(),
+                  rows["timeouts"].tolist(), rows["unknownExceptions"].tolist())
+    for client_id, query_id, run, time, content_length, succeeded, timeout, unknown_exception in columns:
+        query = "{}/worker/{}/query/{}".format(task, client_id, query_id)
+        execution = "{}/run/{}".format(query, run)
+        code = 1 if succeeded else -1 if timeout else 0 if unknown_exception else -2
+        yield ("<{q}> <{p}queryExecution> <{e}> .\n"
+               "<{e}> <{p}code> {code} .\n"
+               "<{e}> <{p}run> {run} .\n"
+               "<{e}> <{p}resultSize> {size} .\n"
+               "<{e}> <{p}success> {success} .\n"
+               "<{e}> <{p}time> {time} .\n").format(
+            q=query, e=execution, p=IPROP, code=_literal(code, "int"), run=_literal(run, "int"),
+            size=_literal(content_length, "long"), success=_literal("true" if succeeded else "false", "boolean"),
+            time=_literal(repr(time), "double"))
+
+
+def _write_csv(data: pd.DataFrame, output: TextIO, header: bool):
+    data.to_csv(output, header=header, index=False, quoting=csv.QUOTE_NONNUMERIC)
+
+
+def write_node_stats(dataset: str, triples: int, output_dir: Path, rng: np.random.Generator) -> int:
+    """
+    Writes the node counts of a synthetic dataset and its depth_3_nodes_stats.tsv to output_dir. Returns the number of
+    distinct triples.
+    """
+    import numpy as np
+    from hypertrie_microbenchmarks import swdf_like, watdiv_like
+    from hypertrie_node_counts import count_nodes, write_node_counts
+    generator = swdf_like if dataset == 'swdf' else watdiv_like
+    encoded = np.unique(generator(triples, rng), axis=0).astype(np.uint64)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_node_counts(count_nodes(iter([encoded]), Path(tmp_dir), 2 ** 30, len(encoded)), output_dir)
+    with open(output_dir.joinpath("depth_3_nodes_stats.tsv"), "w", newline="") as f:
+        csv_writer = csv.DictWriter(f, fieldnames=["dimension_1_size", "dimension_2_size", "dimension_3_size",
+                                                   "node_size"], delimiter="\t")
+        csv_writer.writeheader()
+        csv_writer.writerow({"dimension_{}_size".format(position + 1): len(np.unique(encoded[:, position]))
+                             for position in range(3)} | {"node_size": len(encoded)})
+    return len(encoded)
+
+
+def generate(config: Config, base_dir: Path, results_format: str = "nt", node_stats_triples: int = 100_000):
+    """Writes the synthetic raw_data and data files to base_dir."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(config.seed)
+    raw_data_dir, data_dir = base_dir.joinpath("raw_data"), base_dir.joinpath("data")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results_dir, parsed_dir = raw_data_dir.joinpath("benchmarking_results"), raw_data_dir.joinpath("parsed_results")
+    for directory in [results_dir, parsed_dir]:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    speeds = dict(zip(config.triplestores, rng.lognormal(0, 1, len(config.triplestores))))
+    statements: Dict[str, int] = dict()
+    results_csv = open(data_dir.joinpath("benchmarking_results.csv"), "w", newline="") \
+        if results_format == "csv" else None
+    parsed_csv = open(data_dir.joinpath("parsed_results_stats.csv"), "w", newline="") \
+        if results_format == "csv" else None
+    try:
+        for dataset in config.datasets:
+            queries = _Queries(base_times=rng.lognormal(np.log(20), 1.5, config.queries),
+                               solutions=rng.zipf(1.5, config.queries) % 100_000,
+                               variables=rng.integers(1, 6, config.queries))
+            for triplestore in config.triplestores:
+                wrong = rng.random(config.queries) < config.wrong_result_rate
+                rows = executions(config, triplestore, dataset, queries, speeds[triplestore], wrong, rng)
+                parsed = parsed_results(triplestore, dataset, queries, wrong, rng)
+                if results_format == "csv":
+                    _write_csv(rows, results_csv, header=results_csv.tell() == 0)
+                    _write_csv(parsed, parsed_csv, header=parsed_csv.tell() == 0)
+                else:
+                    with open(results_dir.joinpath("{}_{}.nt".format(triplestore, dataset)), "w") as f:
+                        f.writelines(iguana_lines(config, triplestore, dataset, rows))
+                    with open(parsed_dir.joinpath("{}_{}.csv".format(triplestore, dataset)), "w", newline="") as f:
+                        _write_csv(parsed, f, header=True)
+            statements[dataset] = write_node_stats(
+                dataset, node_stats_triples, raw_data_dir.joinpath("hypertrie_node_stats", dataset), rng)
+    finally:
+        for output in [results_csv, parsed_csv]:
+            if output is not None:
+                output.close()
+
+    with open(raw_data_dir.joinpath("query_registry.json"), "w") as f:
+        f.write(pd.Series({"datasets": {dataset: {"excluded": []} for dataset in config.datasets},
+                           "canonical_numbering": []}).to_json(indent=2))
+    pd.DataFrame({"queryID": np.arange(config.queries),
+                  "name": ["Q{}".format(query_id + 1) for query_id in range(config.queries)]}) \
+        .to_csv(data_dir.joinpath("watdiv_query_names.tsv"), sep="\t", index=False)
+    index_rows = []
+    for triplestore in config.triplestores:
+        bytes_per_statement, statements_per_second = rng.uniform(20, 200), rng.uniform(1e4, 1e6)
+        for dataset in config.datasets:
+            index_rows.append({"triplestore": index_triplestore_names.get(triplestore, triplestore),
+                               "dataset": dataset, "index_size": statements[dataset] * bytes_per_statement,
+                               "loading_time": statements[dataset] / statements_per_second})
+    pd.DataFrame(index_rows).to_csv(data_dir.joinpath("index_sizes_and_loading_times.tsv"), sep="\t", index=False)
+
+
+defaults = Config()
+
+
+@click.command()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(file_okay=False, path_type=Path),
+              help="Where the data and raw_data directories are written.")
+@click.option("--triplestore", "triplestores", multiple=True, default=default_triplestores,
+              help="Triple stores. Can be repeated, defaults to the triple stores of the paper.")
+@click.option("--dataset", "datasets", multiple=True, default=default_datasets,
+              type=click.Choice(default_datasets),
+              help="Datasets. Can be repeated, defaults to the datasets of the paper.")
+@click.option("--queries", default=defaults.queries, type=click.IntRange(min=1), help="Queries per dataset.")
+@click.option("--clients", default=defaults.clients, type=click.IntRange(min=1), help="Clients per task.")
+@click.option("--runs", default=defaults.runs, type=click.IntRange(min=1), help="Query mixes per client.")
+@click.option("--failure-rate", default=defaults.failure_rate, type=click.FloatRange(0, 1),
+              help="Share of executions which fail with an exception or a wrong HTTP code.")
+@click.option("--timeout-rate", default=defaults.timeout_rate, type=click.FloatRange(0, 1),
+              help="Share of executions which time out.")
+@click.option("--wrong-result-rate", default=defaults.wrong_result_rate, type=click.FloatRange(0, 1),
+              help="Share of the queries for which a triple store returns a wrong result.")
+@click.option("--results-format", default="nt", type=click.Choice(["nt", "csv"]),
+              help="'nt' writes IGUANA result files to raw_data, 'csv' writes the converted CSV files to data.")
+@click.option("--node-stats-triples", default=100_000, type=click.IntRange(min=1),
+              help="Triples of the synthetic datasets of the hypertrie node stats.")
+@click.option("--seed", default=defaults.seed, type=int, help="Seed of the random generator.")
+def synthetic_iguana_data(base_dir: Path, triplestores: Sequence[str], datasets: Sequence[str], queries: int,
+                          clients: int, runs: int, failure_rate: float, timeout_rate: float, wrong_result_rate: float,
+                          results_format: str, node_stats_triples: int, seed: int):
+    config = Config(list(triplestores), list(datasets), queries, clients, runs, failure_rate, timeout_rate,
+                    wrong_result_rate, seed)
+    generate(config, base_dir, results_format, node_stats_triples)
+    click.echo("{} query executions were written to {}".format(config.rows, base_dir.absolute()))
+
+
+if __name__ == '__main__':
+    synthetic_iguana_data()
@@ -0,0 +1,114 @@
+"""
+Percentile bootstrap confidence intervals of per-group statistics of the benchmark results.
+
+The rows of each group are resampled with replacement. For the statistics of the executions, the rows are the query
+mixes, i.e. the executions of one (run, clientID) summed up: executions of the same mix share the state of the store and
+of its client, so resampling them one by one would understate the variance. The resamples are drawn as batches of index
+matrices of shape (resamples, rows), so that a statistic is computed for a whole batch with numpy reductions along the
+rows. Groups are independent and can be bootstrapped in a pool of worker processes. Each group draws from its own random
+generator, spawned from the seed in group order, so the intervals depend on the seed but not on the number of workers.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from util.query_mixes import mix_columns
+
+# a statistic maps the resampled columns of a group, each of shape (resamples, rows), and the original columns of the
+# group to one value per resample. It must be a module level function (or a partial of one) to be sent to workers.
+Statistic = Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], np.ndarray]
+
+# elements of an index matrix of a batch
+default_batch_elements = 1 << 22
+
+
+def mean_statistic(samples: Dict[str, np.ndarray], original: Dict[str, np.ndarray], column: str) -> np.ndarray:
+    return samples[column].mean(axis=1)
+
+
+def qmph_statistic(samples: Dict[str, np.ndarray], original: Dict[str, np.ndarray]) -> np.ndarray:
+    """The query mixes per hour of the QMpH plot: 3600 s / total penalized ms * number of mixes + 1."""
+    return 60 ** 2 * 1000 / samples['penalizedTime'].sum(axis=1) * original['run'].max() + 1
+
+
+def percent_failed_statistic(samples: Dict[str, np.ndarray], original: Dict[str, np.ndarray]) -> np.ndarray:
+    failed = samples['failed'].sum(axis=1)
+    return 100 * failed / (samples['succeeded'].sum(axis=1) + failed)
+
+
+def _bootstrap_group(columns: Dict[str, np.ndarray], statistic: Statistic, resamples: int, confidence: float,
+                     seed: np.random.SeedSequence, batch_elements: int) -> Tuple[float, float]:
+    rows = len(next(iter(columns.values())))
+    if rows == 0:
+        return np.nan, np.nan
+    rng = np.random.default_rng(seed)
+    batch = max(1, batch_elements // rows)
+    values = np.empty(resamples)
+    for start in range(0, resamples, batch):
+        stop = min(start + batch, resamples)
+        indices = rng.integers(0, rows, size=(stop - start, rows))
+        values[start:stop] = statistic({name: column[indices] for name, column in columns.items()}, columns)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(values, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def bootstrap_cis(data: pd.DataFrame, by: Sequence[str], columns: Sequence[str], statistic: Statistic, name: str,
+                  resamples: int = 1000, confidence: float = .95, seed: int = 42, workers: Optional[int] = None,
+                  batch_elements: int = default_batch_elements) -> pd.DataFrame:
+    """
+    The bootstrap confidence interval of statistic for each group of data by the columns by, as the columns
+    <name>_ci_low and <name>_ci_high. Rows with a missing value in one of columns are ignored.
+
+    :param columns: the columns of data which are resampled and passed to statistic
+    :param resamples: the number of resamples per group
+    :param confidence: the confidence level of the percentile intervals
+    :param seed: the seed of the random generators of the groups
+    :param workers: number of worker processes, defaults to the number of CPUs
+    :param batch_elements: the size of the index matrix of one batch of resamples, which bounds the memory per group
+    """
+    data = data.dropna(subset=list(columns))
+    groups = data.groupby(list(by), sort=True, observed=True).indices
+    keys = list(groups)
+    group_columns: List[Dict[str, np.ndarray]] = [
+        {column: data[column].to_numpy(dtype=np.float64)[rows] for column in columns} for rows in groups.values()]
+    seeds = np.random.SeedSequence(seed).spawn(len(keys))
+    bootstrap_group = partial(_bootstrap_group, statistic=statistic, resamples=resamples, confidence=confidence,
+                              batch_elements=batch_elements)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(keys) <= 1:
+        intervals = [bootstrap_group(columns_of_group, seed=group_seed)
+                     for columns_of_group, group_seed in zip(group_columns, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(keys))) as executor:
+            intervals = list(executor.map(_bootstrap_group, group_columns, [statistic] * len(keys),
+                                          [resamples] * len(keys), [confidence] * len(keys), seeds,
+                                          [batch_elements] * len(keys)))
+
+    cis = pd.DataFrame([key if isinstance(key, tuple) else (key,) for key in keys], columns=list(by))
+    cis[f'{name}_ci_low'] = [low for low, _ in intervals]
+    cis[f'{name}_ci_high'] = [high for _, high in intervals]
+    return cis
+
+
+def benchmark_cis(iguana_data: pd.DataFrame, iguana_data_agg: pd.DataFrame, resamples: int = 1000,
+                  confidence: float = .95, seed: int = 42, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Confidence intervals per (triplestore, dataset) of the mean QpS over the queries (mean_qps, resampling the rows of
+    iguana_data_agg), and of QMpH and percent_failed (resampling the query mixes of the executions in iguana_data).
+    """
+    by = ['triplestore', 'dataset']
+    options = dict(resamples=resamples, confidence=confidence, seed=seed, workers=workers)
+    cis = bootstrap_cis(iguana_data_agg, by, ['qps_mean'], partial(mean_statistic, column='qps_mean'), 'mean_qps',
+                        **options)
+    mixes = iguana_data.groupby(by + mix_columns, observed=True, sort=True).agg(
+        penalizedTime=('penalizedTime', 'sum'), succeeded=('succeeded', 'sum'), failed=('failed', 'sum')).reset_index()
+    for statistic, columns, name in [(qmph_statistic, ['penalizedTime', 'run'], 'QMpH'),
+                                     (percent_failed_statistic, ['succeeded', 'failed'], 'percent_failed')]:
+        cis = cis.merge(bootstrap_cis(mixes, by, columns, statistic, name, **options), on=by, how='outer')
+    return cis
@@ -0,0 +1,111 @@
+"""
+Typed columnar (Feather) copies of the CSV tables in the data directory.
+
+The CSV files stay the canonical exports. Next to each cached CSV, a `.feather` file with the same stem holds the
+same rows with explicit column types. It is uncompressed so that it can be memory-mapped and read column by column.
+pyarrow is optional: without it, no cache is written and all reads fall back to the CSV. pandas is imported by the
+functions which need it, so that importing this module does not slow down the start of the conversion stages.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+column_types = {
+    'triplestore': 'category',
+    'dataset': 'category',
+    'format': 'category',
+    'queryID': 'Int32',
+    'clientID': 'Int32',
+    'run': 'Int32',
+    'noclients': 'Int32',
+    'time': 'Float64',
+    'qps': 'Float64',
+    'penalizedTime': 'Float64',
+    'penalizedQPS': 'Float64',
+}
+
+
+def columnar_path(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(".feather")
+
+
+def _drop_index_columns(data: pd.DataFrame) -> pd.DataFrame:
+    return data.drop(columns=[column for column in data.columns if str(column).startswith("Unnamed: ")])
+
+
+def _typed(data: pd.DataFrame) -> pd.DataFrame:
+    data = _drop_index_columns(data.reset_index(drop=True))
+    return data.astype({column: dtype for column, dtype in column_types.items() if column in data.columns})
+
+
+def write_columnar(data: pd.DataFrame, csv_path: Path) -> Optional[Path]:
+    """
+    Writes a typed columnar copy of data next to csv_path.
+    Returns the path of the copy or None if pyarrow is not available.
+    """
+    try:
+        import pyarrow
+        from pyarrow import feather
+    except ImportError:
+        return None
+    output_file = columnar_path(csv_path)
+    tmp_output_file = output_file.with_suffix(".feather.tmp")
+    table = pyarrow.Table.from_pandas(_typed(data), preserve_index=False)
+    feather.write_feather(table, str(tmp_output_file), compression='uncompressed')
+    os.replace(tmp_output_file, output_file)
+    return output_file
+
+
+def cache_csv(csv_path: Path, **read_csv_kwargs) -> Optional[Path]:
+    """Writes a typed columnar copy of an existing CSV file."""
+    import pandas as pd
+    return write_columnar(pd.read_csv(csv_path, **read_csv_kwargs), csv_path)
+
+
+def has_columnar(csv_path: Path) -> bool:
+    """True if there is a columnar copy of csv_path which is not older than csv_path itself."""
+    cached = columnar_path(csv_path)
+    if not cached.exists():
+        return False
+    csv_path = Path(csv_path)
+    return not csv_path.exists() or cached.stat().st_mtime >= csv_path.stat().st_mtime
+
+
+def read_table(csv_path: Path, columns: Optional[Sequence[str]] = None, categorical: bool = False,
+               **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Reads a table from its columnar copy if an up-to-date one exists and pyarrow is available, else from csv_path.
+
+    Only the given columns are read. The unnamed index column written by DataFrame.to_csv is dropped. Dictionary
+    encoded columns are returned as strings unless categorical is set, so that the result can be used like the output
+    of pd.read_csv.
+    """
+    if has_columnar(csv_path):
+        try:
+            import pyarrow
+            from pyarrow import feather
+        except ImportError:
+            pass
+        else:
+            table = feather.read_table(str(columnar_path(csv_path)),
+                                       columns=list(columns) if columns is not None else None,
+                                       memory_map=True)
+            if not categorical:
+                for i, field in enumerate(table.schema):
+                    if pyarrow.types.is_dictionary(field.type):
+                        table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+            return table.to_pandas(ignore_metadata=True)
+    import pandas as pd
+    if columns is not None:
+        read_csv_kwargs["usecols"] = list(columns)
+    data = pd.read_csv(csv_path, **read_csv_kwargs)
+    data = _drop_index_columns(data)
+    if categorical:
+        data = data.astype({column: 'category' for column, dtype in column_types.items()
+                            if dtype == 'category' and column in data.columns})
+    return data
@@ -0,0 +1,354 @@
+"""
+The tables behind the paper figures, loaded once per base dir.
+
+`FigureData` reads each input file at most once and derives each table from it at most once: every table is a
+memoized property, computed on first access and shared by all figures that use it. The plotting code in
+`util/figures.py` only reads these tables, so any subset of figures can be rendered from one instance. This module does
+not import the plotting libraries, so that the tables can be exported without them.
+
+The result tables are held in the compact column types of `util/schema.py`, and the triple stores and datasets get
+their short names by renaming the categories.
+
+`figure_tables` maps each figure to the tables written next to it, by their path relative to the base dir.
+"""
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from util.bootstrap import benchmark_cis
+from util.columnar_cache import read_table
+from util.index_size_model import index_size_predictions, node_features
+from util.node_stats import load_long_node_counts
+from util.profiling import profiler
+from util.query_mixes import mix_qmph, qmph_summary
+from util.relative_speedup import log_ratio_matrices, relative_speedups
+from util.schema import aggregate_types, compact, renamed, result_types
+
+# short names of the triple stores in the benchmark results
+triplestore_short_mapping = {
+    'blazegraph': 'B',
+    'fuseki': 'F',
+    'fuseki-ltj': 'Fl',
+    'graphdb': 'G',
+    'gstore': 'S',
+    'virtuoso': 'V',
+    'tentris-1.0.7': 'T-b',
+    'tentris-1.1.0_lsb_unused_0': 'T-hs',
+    'tentris-1.1.0-lsb_unused_0': 'T-hs',
+    'tentris-1.1.0_hashing_only': 'T-h',
+    'tentris-1.1.0-hashing_only': 'T-h',
+    'tentris-1.1.0_lsb_unused_1': 'T-hsi',
+    'tentris-1.1.0-lsb_unused_1': 'T-hsi',
+}
+
+# short names of the triple stores in index_sizes_and_loading_times.tsv
+index_triplestore_mapping = {
+    'blazegraph': 'B',
+    'fuseki': 'F',
+    'fuseki-ltj': 'Fl',
+    'graphdb': 'G',
+    'gstore': 'S',
+    'virtuoso': 'V',
+    'tentris-1.0.7_lsb_unused_0': 'T-b',
+    'tentris-1.1.0_hashing_only': 'T-h',
+    'tentris-1.1.0_lsb_unused_0': 'T-hs',
+    'tentris-1.1.0_lsb_unused_1': 'T-hsi',
+}
+
+dataset_mapping = {
+    'dbpedia2015': "DBpedia",
+    'swdf': "SWDF",
+    'watdiv10000': "WatDiv",
+    'wikidata-2020-11-11': "Wikidata"
+}
+
+triplestores = ['T-b', 'T-h', 'T-hs', 'T-hsi', 'B', 'F', 'Fl', 'G', 'S', 'V']
+datasets = ['SWDF', 'DBpedia', 'WatDiv', 'Wikidata']
+hypertrie_types = ['b', 's', 'h', 'hs', 'hsi']
+
+# triple stores against which the other stores are compared in the heatmaps by default, all Tentris variants
+heatmap_references = ['T-b', 'T-h', 'T-hs', 'T-hsi']
+# query names of the datasets which have them, other datasets show the query ids
+query_name_files = {'WatDiv': "watdiv_query_names.tsv"}
+
+# 95% bootstrap confidence intervals of the mean QpS, QMpH and the failure rate
+bootstrap_resamples = 1000
+bootstrap_seed = 42
+
+
+def heatmap_name(dataset: str, reference: str) -> str:
+    return f"paper-heatmap-{dataset.lower()}-rel-{reference}"
+
+
+def _short_names(data: pd.DataFrame, triplestore_mapping: Dict[str, str]) -> pd.DataFrame:
+    data['triplestore'] = renamed(data['triplestore'], triplestore_mapping)
+    data['dataset'] = renamed(data['dataset'], dataset_mapping)
+    return data
+
+
+def _ordered(values: pd.Series, categories: List) -> pd.Categorical:
+    return pd.Categorical(values, categories=categories, ordered=True)
+
+
+def _qmph_label(qmph: float) -> str:
+    return format(qmph, '.2f') if qmph < 10 else format(qmph, '.1f') if qmph < 100 else format(qmph, '.0f')
+
+
+class FigureData:
+    """The inputs and derived tables of the paper figures of one base dir."""
+
+    def __init__(self, base_dir: Path = Path(), references: Sequence[str] = ()):
+        """
+        :param base_dir: where the data and raw_data directories are located
+        :param references: the short names of the triple stores the heatmaps compare to, heatmap_references if empty
+        """
+        self.base_dir = Path(base_dir)
+        self.references = list(references or heatmap_references)
+        self.data_dir = self.base_dir.joinpath("data")
+        self.node_stats_dir = self.base_dir.joinpath("raw_data", "hypertrie_node_stats")
+
+    # benchmark results
+
+    @cached_property
+    def iguana_data(self) -> pd.DataFrame:
+        """The executions of the queries, with short triple store and dataset names."""
+        with profiler.step("read results") as step:
+            data = read_table(self.data_dir.joinpath("benchmarking_results_with_result_stats.csv"),
+                              columns=['triplestore', 'dataset', 'run', 'clientID', 'penalizedTime', 'succeeded',
+                                       'failed'], categorical=True)
+            data = compact(data, result_types)
+            step.rows_out = len(data)
+        data = _short_names(data, triplestore_short_mapping)
+        data['triplestore'] = _ordered(data['triplestore'], triplestores)
+        return data
+
+    @cached_property
+    def iguana_data_agg(self) -> pd.DataFrame:
+        """The executions aggregated per query, with their mean runtime."""
+        with profiler.step("read aggregated results") as step:
+            data = compact(read_table(self.data_dir.joinpath("benchmarking_results_with_result_stats_agg.csv"),
+                                      categorical=True), aggregate_types)
+            step.rows_out = len(data)
+        data['runtime'] = 1 / data['qps_mean']
+        data = _short_names(data, triplestore_short_mapping)
+        data['triplestore'] = _ordered(data['triplestore'], triplestores)
+        return data
+
+    @cached_property
+    def benchmark_cis(self) -> pd.DataFrame:
+        with profiler.step("bootstrap", rows_in=len(self.iguana_data)):
+            return benchmark_cis(self.iguana_data, self.iguana_data_agg, resamples=bootstrap_resamples,
+                                 seed=bootstrap_seed)
+
+    @cached_property
+    def data_agg(self) -> pd.DataFrame:
+        """Mean QpS and runtime per dataset and triple store over the queries, with the confidence interval."""
+        with profiler.step("aggregate", rows_in=len(self.iguana_data_agg)) as step:
+            data_agg = self.iguana_data_agg.groupby(['dataset', 'triplestore'], observed=True).agg(
+                mean_qps=('qps_mean', 'mean'), mean_runtime=('runtime', 'mean')).reset_index() \
+                [['triplestore', 'dataset', 'mean_qps', 'mean_runtime']]
+            data_agg['avgQpS_rounded'] = np.round(data_agg['mean_qps']).astype(int)
+            step.rows_out = len(data_agg)
+        cis = self.benchmark_cis[['triplestore', 'dataset', 'mean_qps_ci_low', 'mean_qps_ci_high']]
+        data_agg = data_agg.merge(cis, on=['triplestore', 'dataset'], how='left')
+        data_agg['triplestore'] = _ordered(data_agg['triplestore'], triplestores)
+        data_agg['dataset'] = _ordered(data_agg['dataset'], datasets)
+        return data_agg
+
+    @cached_property
+    def fully_agg(self) -> pd.DataFrame:
+        """Per triple store and dataset, the executions, QMpH and failure rate with their confidence intervals."""
+        iguana_data = self.iguana_data
+        # pooled QMpH next to the distribution of the QMpH of the single query mixes
+        with profiler.step("QMpH", rows_in=len(iguana_data)) as step:
+            fully_agg = iguana_data.groupby(['triplestore', 'dataset'], observed=True).agg(
+                sum_succeeded=('succeeded', 'sum'), sum_failed=('failed', 'sum')).reset_index() \
+                [['dataset', 'triplestore', 'sum_succeeded', 'sum_failed']] \
+                .merge(qmph_summary(iguana_data), on=['triplestore', 'dataset'], how='left')
+            fully_agg['QMpH_rounded'] = fully_agg['QMpH'].apply(_qmph_label)
+            step.rows_out = len(fully_agg)
+        fully_agg = fully_agg.merge(self.benchmark_cis.drop(columns=['mean_qps_ci_low', 'mean_qps_ci_high']),
+                                    on=['triplestore', 'dataset'], how='left')
+        fully_agg['triplestore'] = _ordered(fully_agg['triplestore'], triplestores)
+        fully_agg['dataset'] = _ordered(fully_agg['dataset'], datasets)
+        fully_agg['percent_failed'] = 100 * fully_agg['sum_failed'] / (fully_agg['sum_succeeded']
+                                                                       + fully_agg['sum_failed'])
+        return fully_agg
+
+    @cached_property
+    def scatter(self) -> pd.DataFrame:
+        """The aggregated executions with the datasets in the order of the figures."""
+        return self.iguana_data_agg.assign(dataset=_ordered(self.iguana_data_agg['dataset'], datasets))
+
+    @cached_property
+    def qmph_per_mix(self) -> pd.DataFrame:
+        return mix_qmph(self.iguana_data)
+
+    @cached_property
+    def speedups(self) -> pd.DataFrame:
+        scatter = self.scatter
+        with profiler.step("relative speedups", rows_in=len(scatter)) as step:
+            speedups = relative_speedups(scatter, self.references)
+            step.rows_out = len(speedups)
+        speedups['triplestore'] = _ordered(speedups['triplestore'], list(reversed(triplestores)))
+        return speedups
+
+    @cached_property
+    def query_names(self) -> Dict[str, pd.DataFrame]:
+        return {dataset: pd.read_csv(self.data_dir.joinpath(file_name), sep="\t", index_col=False)
+                for dataset, file_name in query_name_files.items()}
+
+    @cached_property
+    def heatmaps(self) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """The speedups of each dataset relative to each reference store with a result, keyed by both."""
+        speedups = self.speedups
+        heatmaps = dict()
+        for (dataset, triplestore), log_ratios in log_ratio_matrices(speedups).items():
+            if log_ratios.isna().all(axis=None):
+                continue
+            heatmap_data = speedups.query("dataset == @dataset and reference == @triplestore") \
+                .drop(columns=['reference', 'log_ratio']) \
+                .rename(columns={'ratio': f'QPS relative to {triplestore}'})
+            heatmap_data[f'QpS rel. to {triplestore}'] = np.log10(heatmap_data[f'QPS relative to {triplestore}'])
+            if dataset in self.query_names:
+                heatmap_data = heatmap_data.merge(self.query_names[dataset])
+            else:
+                heatmap_data['name'] = heatmap_data['queryID'].astype(str)
+            heatmap_data['name'] = _ordered(heatmap_data['name'], heatmap_data['name'].unique())
+            heatmaps[(dataset, triplestore)] = heatmap_data
+        return heatmaps
+
+    # hypertrie node counts
+
+    @cached_property
+    def long_node_counts(self) -> pd.DataFrame:
+        """The node counts of all datasets and depths, cached in data/long_node_counts.tsv."""
+        with profiler.step("read node counts") as step:
+            long_node_counts = load_long_node_counts(self.node_stats_dir,
+                                                     self.data_dir.joinpath("long_node_counts.tsv"))
+            step.rows_out = len(long_node_counts)
+        return long_node_counts
+
+    @cached_property
+    def node_counts(self) -> pd.DataFrame:
+        """The node counts of the depths 1 and 2 in the order of the node count figure."""
+        node_counts = self.long_node_counts[self.long_node_counts["depth"].isin([1, 2])].copy()
+        node_counts['hypertrie_type'] = _ordered(node_counts['hypertrie_type'], hypertrie_types)
+        node_counts['Height'] = _ordered(node_counts['depth'], [2, 1])
+        node_counts['Dataset'] = _ordered(node_counts['dataset'], datasets)
+        return node_counts
+
+    @cached_property
+    def long_fullnode_counts(self) -> pd.DataFrame:
+        """The uncompressed nodes of the depths 1 and 2 per hypertrie type and dataset."""
+        long_fullnode_counts = self.long_node_counts[self.long_node_counts["depth"].isin([1, 2])] \
+            .query('node_type == "uncompressed_nodes"') \
+            .drop(columns=["depth", "node_type"]) \
+            .groupby(['hypertrie_type', 'dataset']) \
+            .sum() \
+            .reset_index()
+        long_fullnode_counts['hypertrie_type'] = _ordered(long_fullnode_counts['hypertrie_type'],
+                                                          ['b', 'h', 's', 'hs', 'hsi'])
+        long_fullnode_counts['dataset'] = _ordered(long_fullnode_counts['dataset'], datasets)
+        return long_fullnode_counts
+
+    # index sizes and loading times
+
+    @cached_property
+    def dataset_stats(self) -> pd.DataFrame:
+        return pd.read_csv(self.data_dir.joinpath("dataset_stats.tsv"), sep="\t").dropna()
+
+    @cached_property
+    def index_data(self) -> pd.DataFrame:
+        """The index size per statement and loading speed of each triple store and dataset, with their labels."""
+        with profiler.step("read index sizes"):
+            data = pd.read_csv(self.data_dir.joinpath("index_sizes_and_loading_times.tsv"), sep="\t").dropna()
+        data = data.merge(self.dataset_stats)
+        data['bytes_per_statement'] = data['index_size'] / data['statements']
+        data['statements1k_per_second'] = data['statements'] / 1000 / data['loading_time']
+        data = _short_names(data, index_triplestore_mapping)
+        data["triplestore"] = data["triplestore"].astype('category').cat.reorder_categories(
+            list(reversed(triplestores)))
+
+        # table entry strings
+        data["bytes_per_statement_label"] = data["bytes_per_statement"].apply(
+            lambda x: "{:.0f}".format(x) if x > 1 else "{:.3f}".format(x))
+        data["statements1k_per_second_label"] = data["statements1k_per_second"].apply(
+            lambda x: "{:.0f}".format(x) if x >= 10 else "{:.2f}".format(x))
+
+        by_dataset = data.groupby('dataset')
+        data['max_bytes_per_statement'] = by_dataset['bytes_per_statement'].transform('max')
+        data['max_statements1k_per_second'] = by_dataset['statements1k_per_second'].transform('max')
+        data['index_size_y_pad'] = data['max_bytes_per_statement'] * 0.05
+        data['loading_time_y_pad'] = data['max_statements1k_per_second'] * 0.05
+        data['dataset'] = _ordered(data['dataset'], datasets)
+        return data
+
+    @cached_property
+    def index_size_predictions(self) -> Optional[pd.DataFrame]:
+        """
+        The bytes/triple of the Tentris variants predicted from the hypertrie node counts, or None without node counts.
+        It covers every dataset with node counts and a statement count, including those which were not loaded. The
+        error of measured datasets is estimated by leaving the dataset out of the fit.
+        """
+        if not self.node_stats_dir.exists():
+            return None
+        index_data, long_node_counts, dataset_stats = self.index_data, self.long_node_counts, self.dataset_stats
+        with profiler.step("index size model", rows_in=len(long_node_counts)) as step:
+            features = node_features(long_node_counts, dataset_stats.assign(
+                dataset=dataset_stats["dataset"].replace(dataset_mapping)))
+            predictions = index_size_predictions(features, index_data[["triplestore", "dataset", "index_size"]].astype(
+                {"triplestore": str, "dataset": str}))
+            step.rows_out = len(predictions)
+        return predictions
+
+
+def benchmark_results_tables(data: FigureData) -> Dict[str, pd.DataFrame]:
+    name = "output/figures/paper-benchmark-results"
+    return {f"{name}-scatter.tsv": data.scatter, f"{name}-QMpH.tsv": data.fully_agg,
+            f"{name}-QMpH-per-mix.tsv": data.qmph_per_mix}
+
+
+def heatmap_tables(data: FigureData) -> Dict[str, pd.DataFrame]:
+    return {f"output/figures/{heatmap_name(dataset, reference)}.tsv": heatmap_data
+            for (dataset, reference), heatmap_data in data.heatmaps.items()}
+
+
+def node_count_tables(data: FigureData) -> Dict[str, pd.DataFrame]:
+    # data/long_node_counts.tsv is written when the node counts are loaded
+    data.long_node_counts
+    return dict()
+
+
+def full_node_count_tables(data: FigureData) -> Dict[str, pd.DataFrame]:
+    return {"data/long_fullnode_counts.tsv": data.long_fullnode_counts}
+
+
+def index_size_tables(data: FigureData) -> Dict[str, pd.DataFrame]:
+    predictions = data.index_size_predictions
+    return {} if predictions is None else {"output/figures/paper-index-size-predictions.tsv": predictions}
+
+
+figure_tables: Dict[str, Callable[[FigureData], Dict[str, pd.DataFrame]]] = {
+    "benchmark-results": benchmark_results_tables,
+    "heatmaps": heatmap_tables,
+    "node-count": node_count_tables,
+    "full-node-count": full_node_count_tables,
+    "index-sizes": index_size_tables,
+    "loading-times": lambda data: dict(),
+}
+
+
+def write_tables(tables: Dict[str, pd.DataFrame], base_dir: Path) -> List[Path]:
+    """Writes tables as TSV files to their paths relative to base_dir."""
+    written = []
+    with profiler.step("write tables"):
+        for path, table in tables.items():
+            output_file = Path(base_dir).joinpath(path)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            table.to_csv(output_file, sep="\t", index=False)
+            written.append(output_file)
+    return written
@@ -0,0 +1,306 @@
+"""
+The paper figures, rendered from the tables of a `FigureData`.
+
+Importing this module imports plotnine and matplotlib and configures matplotlib for LaTeX text once. Each renderer
+builds the plots of one figure from the memoized tables and saves them as PDF and SVG to the output dir.
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib import rc
+from plotnine import (aes, coord_flip, element_blank, element_text, facet_grid, facet_wrap, geom_bar, geom_boxplot,
+                      geom_col, geom_errorbar, geom_hline, geom_jitter, geom_point, geom_text, geom_tile, ggplot, labs,
+                      save_as_pdf_pages, scale_fill_gradient2, scale_fill_manual, scale_y_continuous, scale_y_log10,
+                      theme, theme_light, xlab, ylab, ylim)
+
+from util.figure_data import FigureData, datasets, heatmap_name, triplestores
+from util.human_format import human_format
+from util.profiling import profiler
+
+rc('text', usetex=True)
+plt.rcParams['text.usetex'] = True
+plt.rcParams['text.latex.preamble'] = r'\usepackage{lmodern,amsmath,amssymb,sansmathfonts}'
+mpl.rcParams['image.cmap'] = 'Pastel2_r'
+
+large_font_size = 9
+small_font_size = 7
+tiny_font_size = 4.5
+
+tentris_colors = {
+    'T-b': "#8DA0CB",
+    'T-h': "#66C2A5",
+    'T-hs': "#EDC707",
+    'T-hsi': "#FC8D62"
+}
+light_color_map = defaultdict(lambda: "lightgrey", tentris_colors)
+color_map = defaultdict(lambda: "grey", tentris_colors)
+
+
+def minor_log10_breaks(min: float, max: float) -> List[float]:
+    import math
+    min_exp = math.floor(math.log10(min))
+    max_exp = math.ceil(math.log10(max))
+    breaks = [10 ** t * i for t in range(min_exp, max_exp + 1) for i in range(2, 10)]
+    breaks = [n for n in breaks if n >= min and n <= max]
+    return breaks
+
+
+def _na_text(triplestore_order: List[str] = triplestores, **columns: float) -> pd.DataFrame:
+    """Marks the triple stores without results on Wikidata, with the constant columns given."""
+    na_text = pd.DataFrame(data={'triplestore': ["T-b", "S"], **{column: 2 * [value] for column, value in
+                                                               columns.items()}, 'dataset': 2 * ['Wikidata']})
+    na_text['dataset'] = pd.Categorical(na_text['dataset'], categories=datasets, ordered=True)
+    na_text['triplestore'] = pd.Categorical(na_text['triplestore'], categories=triplestore_order, ordered=True)
+    return na_text
+
+
+def _save(plots: List[ggplot], output_dir: Path, name: str, svg_plots: Dict[str, ggplot], **pdf_kwargs):
+    with profiler.step("save"):
+        save_as_pdf_pages(plots, filename=output_dir.joinpath(f"{name}.pdf").absolute(), **pdf_kwargs)
+        for svg_name, plot in svg_plots.items():
+            plot.save(output_dir.joinpath(f"{svg_name}.svg").absolute())
+
+
+def render_benchmark_results(data: FigureData, output_dir: Path):
+    """QpS per query, QMpH and failed queries per triple store and dataset."""
+    ticks = [10 ** i for i in range(-4, 5)]
+    tick_labels = ["$10^{{{} }}$".format(i) if i != 0 else "1" for i in range(-4, 5)]
+    timeout_text = pd.DataFrame(data={'triplestore': [1], 'mean_qps': [1 / 120], 'dataset': 'SWDF', 'label': 'timeout'})
+    timeout_text['dataset'] = pd.Categorical(timeout_text['dataset'], categories=datasets, ordered=True)
+    scatter, data_agg = data.scatter, data.data_agg
+
+    p = (ggplot(data=scatter.query("qps_mean > 1/180 and not wrongResult"),
+                mapping=aes(y='qps_mean', x='triplestore'))
+         + geom_jitter(alpha=0.4, mapping=aes(fill='triplestore', color='triplestore'), na_rm=True, size=.9, stroke=0)
+         + geom_boxplot(outlier_stroke=0, outlier_alpha=0.8, outlier_size=0.8, alpha=0, fatten=1, size=.4)
+         + scale_y_log10(breaks=ticks, labels=tick_labels, minor_breaks=minor_log10_breaks(1 / 180, 10 ** 4))
+         + scale_fill_manual(values=color_map)
+         + facet_grid(".~dataset", scales="free_y")
+         + theme_light()
+         + ylab('QpS')
+         + xlab('')
+         + geom_point(data=data_agg, mapping=aes(x='triplestore', y='mean_qps'), shape='x')
+         + geom_errorbar(data=data_agg, mapping=aes(x='triplestore', ymin='mean_qps_ci_low', ymax='mean_qps_ci_high'),
+                         inherit_aes=False, width=.4, size=.3)
+         + geom_text(data=timeout_text, mapping=aes(x='triplestore', y='mean_qps', label="label"), color="red",
+                     size=tiny_font_size, nudge_x=0.66, nudge_y=.1, alpha=.7)
+         + geom_text(data=_na_text(mean_qps=1 / 73), mapping=aes(x='triplestore', y='mean_qps'),
+                     label="n\!/\!a", color="grey", size=tiny_font_size)
+         + geom_hline(yintercept=0.0055, color="#FF000099", alpha=.7)
+         + theme(strip_background_x=element_text(color="#808080", ),
+                 axis_text_x=element_blank(),
+                 axis_title_y=element_text(size=large_font_size),
+                 axis_title_x=element_text(size=large_font_size),
+                 legend_position='none',
+                 axis_ticks_major_x=element_blank(),
+                 figure_size=(5.5, 1.2),
+                 text=element_text(family="Latin Modern Sans", size=small_font_size))
+         )
+
+    fully_agg = data.fully_agg
+    ticks = [10 ** i for i in range(0, 4)]
+    tick_labels = ["$10^{{{} }}$".format(i) if i != 0 else "1" for i in range(0, 4)]
+    q = (ggplot(data=fully_agg, mapping=aes(y='QMpH', x='triplestore', fill="triplestore"))
+         + geom_bar(stat="identity", position='dodge', alpha=0.85)
+         + geom_errorbar(mapping=aes(ymin='QMpH_ci_low', ymax='QMpH_ci_high'), width=.4, size=.3, color="#4D4D4D")
+         + scale_y_log10(breaks=ticks, labels=tick_labels, expand=(0, 0.23, 0.3, 0),
+                         minor_breaks=minor_log10_breaks(1, 2000))
+         + scale_fill_manual(values=light_color_map)
+         + facet_grid(".~dataset", scales="free_y")
+         + geom_text(mapping=aes(label='QMpH_rounded'), size=tiny_font_size, va='bottom', angle="45", color="#4D4D4D")
+         + geom_text(data=_na_text(mean_qps=1.5), mapping=aes(x='triplestore', y='mean_qps'),
+                     label="n\!/\!a", color="grey", size=tiny_font_size, )
+         + xlab('')
+         + theme_light()
+         + theme(axis_title_y=element_text(margin={"r": 7.48}, size=large_font_size),
+                 strip_background=element_blank(),
+                 strip_text=element_blank(),
+                 legend_position='none',
+                 axis_ticks_major_x=element_blank(),
+                 axis_text_x=element_blank(),
+                 figure_size=(5.5, 1),
+                 text=element_text(family="Latin Modern Sans", size=small_font_size))
+         )
+
+    ticks = [x * 10 for x in range(0, 10)]
+    tick_labels = [f"${i}$" for i in ticks]
+    r = (ggplot(data=fully_agg, mapping=aes(y='percent_failed', x='triplestore', fill="triplestore"))
+         + geom_bar(stat="identity", position='dodge', alpha=0.85)
+         + geom_errorbar(mapping=aes(ymin='percent_failed_ci_low', ymax='percent_failed_ci_high'), width=.4, size=.3,
+                         color="#4D4D4D")
+         + scale_fill_manual(values=light_color_map)
+         + facet_grid(".~dataset", scales="free_y")
+         + xlab("Triple store")
+         + scale_y_continuous(breaks=ticks, labels=tick_labels,
+                              limits=(0, max(fully_agg.percent_failed.max(),
+                                             fully_agg.percent_failed_ci_high.max()) * 1.15),
+                              name="$\%$ failed Q")
+         + geom_text(data=fully_agg.query("sum_failed > 0"), mapping=aes(label='percent_failed'),
+                     size=tiny_font_size, va='bottom', format_string='{:.0f}', color="#4D4D4D")
+         + geom_text(data=_na_text(mean_qps=1.2), mapping=aes(x='triplestore', y='mean_qps'),
+                     label="n\!/\!a", color="grey", size=tiny_font_size, nudge_y=.7, )
+         + theme_light()
+         + theme(strip_background=element_blank(),
+                 axis_title_y=element_text(margin={"r": 10.13}, size=large_font_size),
+                 axis_title_x=element_text(size=large_font_size),
+                 strip_text=element_blank(),
+                 legend_position='none',
+                 axis_text_x=element_text(rotation=-90, hjust=0.5),
+                 figure_size=(5.5, .75),
+                 text=element_text(family="Latin Modern Sans", size=small_font_size))
+         )
+
+    name = "paper-benchmark-results"
+    _save([p, q, r], output_dir, name, {f"{name}-scatter": p, f"{name}-QMpH": q}, bbox_inches="tight",
+          pad_inches=0.03)
+
+
+def render_heatmaps(data: FigureData, output_dir: Path):
+    """QpS per query relative to the reference triple stores."""
+    for (dataset, triplestore), heatmap_data in data.heatmaps.items():
+        name = heatmap_name(dataset, triplestore)
+        r = (ggplot(heatmap_data, aes('name', 'triplestore', fill=f'QpS rel. to {triplestore}'))
+             + geom_tile()
+             + xlab("Query")
+             + ylab("Triple store")
+             + theme_light()
+             + theme(strip_background_x=element_text(color="#808080", ),
+                     strip_background=element_blank(),
+                     strip_text=element_blank(),
+                     panel_grid_major=element_blank(),
+                     panel_grid_minor=element_blank(),
+                     axis_text_x=element_text(rotation=90, hjust=0.5),
+                     figure_size=(5.5, 1.25),
+                     legend_title_align='center',
+                     text=element_text(family="Latin Modern Sans", size=small_font_size))
+             + scale_fill_gradient2(low="#08519c", mid="#f7fbff", high="red",  # colors in the scale
+                                    midpoint=0,  # same midpoint for plots (mean of the range)
+                                    breaks=list(range(-4, 2)),  # breaks in the scale bar
+                                    labels=["$10^{{{} }}$".format(x) if x != 0 else "1" for x in range(-4, 2)],
+                                    limits=(1, -4.5),
+                                    na_value="black")
+             )
+        _save([r], output_dir, name, {name: r}, bbox_inches="tight")
+
+
+def _node_count_theme(figure_size) -> theme:
+    return theme(strip_background_x=element_text(color="#808080", ),
+                 subplots_adjust={'wspace': 0.4},
+                 axis_text_x=element_text(rotation=-90, hjust=0.5),
+                 axis_text_y=element_text(margin={"r": 0.8}),
+                 axis_title_x=element_text(size=large_font_size),
+                 axis_title_y=element_text(size=large_font_size),
+                 facet_spacing={"b": 1, "r": 50},
+                 legend_position='none',
+                 figure_size=figure_size,
+                 text=element_text(size=6.5))
+
+
+def render_node_count(data: FigureData, output_dir: Path):
+    """Uncompressed and compressed nodes per hypertrie version, depth and dataset."""
+    p = (ggplot(data=data.node_counts, mapping=aes(y='node_count', x='hypertrie_type', fill="node_type"))
+         + geom_col()
+         + scale_fill_manual(values=["#b3cde3e0", "#8c96c6e0"])
+         + facet_wrap("~ Height + Dataset", scales="free_y", nrow=2, labeller='label_both')
+         + scale_y_continuous(labels=human_format())
+         + theme_light()
+         + ylab('Node count')
+         + xlab('Hypertrie version')
+         + labs(fill='Node type')
+         + _node_count_theme((5.5, 1.8))
+         )
+    _save([p], output_dir, "paper-node-count", {"paper-node-count": p}, bbox_inches="tight")
+
+
+def render_full_node_count(data: FigureData, output_dir: Path):
+    """Uncompressed nodes per hypertrie version and dataset."""
+    hypertrie_colors = defaultdict(lambda: "lightgrey", {'b': "#8DA0CB", 's': "#EFAAC4", 'h': "#66C2A5",
+                                                         'hs': "#EDC707", 'hsi': "#FC8D62"})
+    p = (ggplot(data=data.long_fullnode_counts, mapping=aes(y='node_count', x='hypertrie_type', fill="hypertrie_type"))
+         + geom_col()
+         + scale_fill_manual(values=hypertrie_colors)
+         + facet_wrap("dataset", scales="free_y", nrow=1)
+         + scale_y_continuous(labels=human_format())
+         + theme_light()
+         + ylab('Full node count')
+         + xlab('Hypertrie version')
+         + _node_count_theme((5.5, .9))
+         )
+    _save([p], output_dir, "paper-full-node-count", {"paper-full-node-count": p}, bbox_inches="tight")
+
+
+def index_stats_plot(data: pd.DataFrame, x: str, y: str, data_labels: str, padding: str, ylabel: str,
+                     with_x_legend: bool, predictions: Optional[pd.DataFrame] = None) -> ggplot:
+    na_text = _na_text(list(reversed(triplestores)))
+    return (ggplot(data=data)
+            + geom_bar(aes(y=y, x=x, fill=x), stat="identity", position='dodge')
+            + scale_fill_manual(values=light_color_map)
+            + geom_text(aes(label=data_labels, x=x, y=padding), va='center', ha='left', size=small_font_size)
+            + geom_text(data=na_text, mapping=aes(x=x, y=0), va='center', ha='left', label="n\!/\!a", color="grey",
+                        size=small_font_size, )
+            + ([geom_point(data=predictions, mapping=aes(x=x, y='predicted_bytes_per_statement'), shape='x', size=1.5),
+                geom_text(data=predictions.dropna(subset=['relative_error_label']),
+                          mapping=aes(x=x, y='predicted_bytes_per_statement', label='relative_error_label'),
+                          va='bottom', ha='left', nudge_x=.15, color="grey", size=small_font_size - 2)]
+               if predictions is not None else [])
+            + facet_grid(".~dataset", scales="free_x")
+            + ylab(ylabel)
+            + xlab("Triple store" if with_x_legend else "")
+            + ylim(0.0, max(data[y].max(),
+                            0 if predictions is None else predictions['predicted_bytes_per_statement'].max()) * 1.01)
+            + coord_flip()
+            + theme_light()
+            + theme(strip_background_x=element_text(color="#808080"),
+                    axis_text_x=element_blank(),
+                    axis_title_x=element_text(margin={'t': 6, 'b': 0}, size=large_font_size),
+                    axis_title_y=element_text(size=large_font_size),
+                    panel_grid_major=element_blank(),
+                    panel_grid_minor=element_blank(),
+                    panel_spacing=.03,
+                    axis_text_y=None if with_x_legend else element_blank(),
+                    axis_ticks_major_y=None if with_x_legend else element_blank(),
+                    axis_ticks_major_x=element_blank(),
+                    legend_position='none',
+                    figure_size=(2.5, 2.1),
+                    text=element_text(size=small_font_size))
+            )
+
+
+def render_index_sizes(data: FigureData, output_dir: Path):
+    """Bytes per triple of each triple store and dataset, with the predictions of the index size model."""
+    predictions = data.index_size_predictions
+    if predictions is not None:
+        # the figure only has facets for the datasets of the paper, the others are only in the predictions table
+        predictions = predictions[predictions['dataset'].isin(datasets)].assign(
+            relative_error_label=predictions["relative_error"].apply(
+                lambda x: None if pd.isna(x) else r"{:+.0f}\%".format(x * 100)),
+            dataset=pd.Categorical(predictions['dataset'], categories=datasets, ordered=True),
+            triplestore=pd.Categorical(predictions['triplestore'], categories=list(reversed(triplestores)),
+                                       ordered=True))
+    p = index_stats_plot(data.index_data, x='triplestore', y='bytes_per_statement',
+                         data_labels='bytes_per_statement_label', padding='index_size_y_pad',
+                         ylabel=r"bytes/triple ($\blacktriangleleft$ less is better)", with_x_legend=True,
+                         predictions=predictions)
+    _save([p], output_dir, "paper-index-sizes", {"paper-index-sizes": p}, bbox_inches="tight")
+
+
+def render_loading_times(data: FigureData, output_dir: Path):
+    """Thousand triples loaded per second by each triple store per dataset."""
+    p = index_stats_plot(data.index_data, x='triplestore', y='statements1k_per_second',
+                         data_labels='statements1k_per_second_label', padding='loading_time_y_pad',
+                         ylabel=r"1k triple/second ($\blacktriangleright$ more is better)", with_x_legend=False)
+    _save([p], output_dir, "paper-loading-times", {"paper-loading-times": p}, bbox_inches="tight")
+
+
+renderers: Dict[str, Callable[[FigureData, Path], None]] = {
+    "benchmark-results": render_benchmark_results,
+    "heatmaps": render_heatmaps,
+    "node-count": render_node_count,
+    "full-node-count": render_full_node_count,
+    "index-sizes": render_index_sizes,
+    "loading-times": render_loading_times,
+}
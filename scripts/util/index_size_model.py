@@ -0,0 +1,80 @@
+"""
+Model of the index size of the Tentris hypertrie variants from the node counts of the datasets.
+
+The index size of a variant on a dataset is modelled as a sum of byte costs: a cost per statement (the entries of the
+nodes and the term dictionary) and a cost per node of each depth and node type from the hypertrie node stats. The costs
+are shared by all variants and fitted with non-negative least squares to the measured index sizes. They predict the
+bytes per statement of each variant on datasets which have node counts but were not loaded yet. The prediction error is
+estimated by leaving out one dataset at a time.
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Tentris builds and the hypertrie types of the node stats they implement
+tentris_variants = {'T-b': 'b', 'T-h': 'h', 'T-hs': 'hs', 'T-hsi': 'hsi'}
+node_columns = ['depth_1_uncompressed_nodes', 'depth_1_compressed_nodes', 'depth_2_uncompressed_nodes',
+                'depth_2_compressed_nodes']
+feature_columns = ['statements'] + node_columns
+
+
+def node_features(long_node_counts: pd.DataFrame, dataset_stats: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (hypertrie_type, dataset) with the statements and the node counts per depth and node type.
+    long_node_counts is the table of util.node_stats, dataset_stats has the columns dataset and statements.
+    """
+    nodes = long_node_counts[long_node_counts['depth'].isin([1, 2])].assign(
+        column=lambda data: "depth_" + data['depth'].astype(str) + "_" + data['node_type'])
+    features = nodes.pivot_table(index=['hypertrie_type', 'dataset'], columns='column', values='node_count',
+                                 aggfunc='sum', fill_value=0).reindex(columns=node_columns, fill_value=0) \
+        .reset_index()
+    features.columns.name = None
+    return features.merge(dataset_stats[['dataset', 'statements']], on='dataset')
+
+
+def fit_byte_costs(features: pd.DataFrame, index_sizes: pd.Series) -> pd.Series:
+    """Non-negative bytes per statement and per node of each kind, fitted to the index sizes of features' rows."""
+    from scipy.optimize import nnls
+    costs, _ = nnls(features[feature_columns].to_numpy(dtype=np.float64), index_sizes.to_numpy(dtype=np.float64))
+    return pd.Series(costs, index=feature_columns)
+
+
+def predict_index_sizes(features: pd.DataFrame, costs: pd.Series) -> pd.Series:
+    return pd.Series(features[feature_columns].to_numpy(dtype=np.float64) @ costs[feature_columns].to_numpy(),
+                     index=features.index)
+
+
+def index_size_predictions(features: pd.DataFrame, measured: pd.DataFrame) -> pd.DataFrame:
+    """
+    The predicted bytes per statement of every variant and dataset in features. measured has the columns triplestore,
+    dataset and index_size of the Tentris builds in tentris_variants.
+
+    predicted_bytes_per_statement is predicted by the costs fitted to all measurements. For the measured datasets,
+    cv_predicted_bytes_per_statement is predicted by the costs fitted without the dataset, relative_error is its
+    relative deviation from the measured bytes_per_statement.
+    """
+    measured = measured[measured['triplestore'].isin(tentris_variants)] \
+        .assign(hypertrie_type=lambda data: data['triplestore'].map(tentris_variants))
+    predictions = features.merge(measured[['hypertrie_type', 'dataset', 'triplestore', 'index_size']],
+                                 on=['hypertrie_type', 'dataset'], how='left')
+    predictions['triplestore'] = predictions['triplestore'].fillna(
+        predictions['hypertrie_type'].map({variant: store for store, variant in tentris_variants.items()}))
+    is_measured = predictions['index_size'].notna()
+    predictions['bytes_per_statement'] = predictions['index_size'] / predictions['statements']
+
+    costs = fit_byte_costs(predictions[is_measured], predictions.loc[is_measured, 'index_size'])
+    predictions['predicted_bytes_per_statement'] = predict_index_sizes(predictions, costs) / predictions['statements']
+
+    predictions['cv_predicted_bytes_per_statement'] = np.nan
+    measured_datasets: List[str] = predictions.loc[is_measured, 'dataset'].unique().tolist()
+    for dataset in measured_datasets if len(measured_datasets) > 1 else []:
+        training = is_measured & (predictions['dataset'] != dataset)
+        held_out = is_measured & (predictions['dataset'] == dataset)
+        fold_costs = fit_byte_costs(predictions[training], predictions.loc[training, 'index_size'])
+        predictions.loc[held_out, 'cv_predicted_bytes_per_statement'] = \
+            predict_index_sizes(predictions[held_out], fold_costs) / predictions.loc[held_out, 'statements']
+    predictions['relative_error'] = \
+        (predictions['cv_predicted_bytes_per_statement'] - predictions['bytes_per_statement']) \
+        / predictions['bytes_per_statement']
+    return predictions[predictions['hypertrie_type'].isin(tentris_variants.values())].reset_index(drop=True)
@@ -0,0 +1,97 @@
+"""
+Node counts of the hypertries of all datasets as one long table.
+
+The counts are read from raw_data/hypertrie_node_stats/<dataset>/depth_<depth>_node_count_comparison.tsv. All files
+found there are read concurrently and concatenated once into a table with one row per hypertrie type, dataset, depth
+and node type. The table is cached as a TSV file, which is read instead of the raw files as long as it is not older than
+any of them.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+nodetype_mapping = {
+    'baseline': 'b',
+    'compression': 's',
+    'hash': 'h',
+    'hash+compression': 'hs',
+    'hash+compression+inline': 'hsi'
+}
+
+dataset_mapping = {
+    'dbpedia2015': "DBpedia",
+    'swdf': "SWDF",
+    'watdiv10000': "WatDiv",
+    'WatDive': "WatDiv",
+    'wikidata-2020-11-11': "Wikidata",
+    'wikidata': "Wikidata",
+}
+
+# datasets are listed in this order, other datasets follow by name
+dataset_order = ['swdf', 'dbpedia2015', 'watdiv10000', 'wikidata-2020-11-11']
+node_types = ["uncompressed_nodes", "compressed_nodes"]
+long_columns = ["hypertrie_type", "dataset", "depth", "node_type", "node_count"]
+long_dtypes = {"hypertrie_type": str, "dataset": str, "depth": "int64", "node_type": str, "node_count": "int64"}
+
+_file_pattern = re.compile(r"depth_(\d+)_node_count_comparison\.tsv")
+
+
+def discover(raw_data_dir: Path) -> List[Tuple[str, int, Path]]:
+    """(dataset, depth, file) of all node count files, ordered by dataset and depth."""
+    found = []
+    for tsv_file in Path(raw_data_dir).glob("*/depth_*_node_count_comparison.tsv"):
+        match = _file_pattern.fullmatch(tsv_file.name)
+        if match:
+            found.append((tsv_file.parent.name, int(match.group(1)), tsv_file))
+
+    def order(entry: Tuple[str, int, Path]):
+        dataset, depth, _ = entry
+        known = dataset in dataset_order
+        return not known, dataset_order.index(dataset) if known else 0, dataset, depth
+
+    return sorted(found, key=order)
+
+
+def read_node_counts(tsv_file: Path, dataset: str, depth: int) -> pd.DataFrame:
+    """The node counts of one file in long format."""
+    data = pd.read_csv(tsv_file, sep='\t', dtype={"hypertrie_type": str, **{column: "int64" for column in node_types}})
+    long = data.melt(id_vars=[column for column in data.columns if column not in node_types], value_vars=node_types,
+                     var_name="node_type", value_name="node_count")
+    long["dataset"] = dataset
+    long["depth"] = depth
+    return long[long_columns + [column for column in long.columns if column not in long_columns]]
+
+
+def _is_cached(cache_file: Path, files: List[Tuple[str, int, Path]]) -> bool:
+    if not cache_file.exists():
+        return False
+    cached = cache_file.stat().st_mtime
+    return all(tsv_file.stat().st_mtime <= cached for _, _, tsv_file in files)
+
+
+def load_long_node_counts(raw_data_dir: Path, cache_file: Path, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    The node counts of all datasets and depths under raw_data_dir, with the hypertrie types and datasets renamed by
+    nodetype_mapping and dataset_mapping. The table is read from cache_file if it is up to date and written to it
+    otherwise.
+    """
+    files = discover(raw_data_dir)
+    if _is_cached(cache_file, files):
+        return pd.read_csv(cache_file, sep="\t", dtype=long_dtypes)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(lambda entry: read_node_counts(entry[2], entry[0], entry[1]), files))
+    long_node_counts = pd.concat(parts, ignore_index=True) if parts \
+        else pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in long_dtypes.items()})
+    long_node_counts["hypertrie_type"] = long_node_counts["hypertrie_type"].replace(nodetype_mapping)
+    long_node_counts["dataset"] = long_node_counts["dataset"].replace(dataset_mapping)
+
+    # both figure scripts may write the cache at the same time
+    tmp_cache_file = cache_file.with_suffix("{}.{}.tmp".format(cache_file.suffix, os.getpid()))
+    long_node_counts.to_csv(tmp_cache_file, sep="\t", index=False)
+    os.replace(tmp_cache_file, cache_file)
+    return long_node_counts
@@ -0,0 +1,256 @@
+"""
+Opt-in profiling of the named steps of the pipeline stages.
+
+A stage wraps its steps (e.g. join, ground truth, aggregation, plot build, save) in `profiler.step(name)`. Unless
+profiling is enabled, a step only runs its body. The click commands enable it with `profile_option`, i.e. with
+`--profile <report.json>`. The paper scripts, which have no command line interface, take the same option through
+`profile_from_argv`. For each step, the profiler records the wall and CPU time (including reaped worker
+processes), the resident set size at the start of the step and its peak during the step, the peak of the memory traced
+by tracemalloc and the lines that allocated most of the memory left over by the step, and the rows in and out of the
+step with the rows per second. The peak RSS of a step is sampled from /proc/self/statm by a background thread every
+few milliseconds, so it is only available on Linux and can miss spikes shorter than the interval. The peak RSS of the
+process and of its reaped workers since their start (from getrusage) is recorded at the end of each step as well.
+The report is written as JSON when the stage exits. Steps should not be nested, as the traced peak is reset at the
+start of each step.
+
+`python scripts/util/profiling.py BASE.json NEW.json` compares the steps of two reports.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import click
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_mib = 2 ** 20
+
+# seconds between two samples of the resident set size of a step
+rss_interval = 0.005
+_statm = Path("/proc/self/statm")
+
+
+def _rusage() -> Dict[str, Optional[float]]:
+    """CPU seconds and peak RSS in MiB of this process and of its reaped child processes."""
+    if resource is None:
+        return {"cpu_s": time.process_time(), "peak_rss_mib": None, "children_peak_rss_mib": None}
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    rss_unit = 1 if sys.platform == 'darwin' else 1024
+    return {"cpu_s": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+            "peak_rss_mib": own.ru_maxrss * rss_unit / _mib,
+            "children_peak_rss_mib": children.ru_maxrss * rss_unit / _mib}
+
+
+def _current_rss() -> Optional[int]:
+    """The resident set size of this process in bytes, or None if /proc is not available."""
+    try:
+        return int(_statm.read_text().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler:
+    """Samples the resident set size of this process in a daemon thread and keeps the first and the largest sample."""
+
+    def __init__(self, interval: float = rss_interval):
+        self.interval = interval
+        self.start_rss = _current_rss()
+        self.peak_rss = self.start_rss
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        if self.start_rss is not None:
+            self._thread.start()
+
+    def _sample(self):
+        rss = _current_rss()
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        if self.start_rss is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+    def report(self) -> Dict[str, Optional[float]]:
+        return {"start_rss_mib": self.start_rss / _mib if self.start_rss is not None else None,
+                "step_peak_rss_mib": self.peak_rss / _mib if self.peak_rss is not None else None}
+
+
+class Step:
+    """The measurements of one step. The body of the step may set rows_in and rows_out."""
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.measurements: Dict[str, object] = dict()
+
+    def report(self) -> dict:
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        wall_seconds = self.measurements.get("wall_s")
+        return {"name": self.name, **self.measurements, "rows_in": self.rows_in, "rows_out": self.rows_out,
+                "rows_per_s": rows / wall_seconds if rows is not None and wall_seconds else None}
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.report_file: Optional[Path] = None
+        self.top_allocations = 10
+        self.steps: List[Step] = []
+        self._start = None
+
+    def enable(self, report_file: Path, top_allocations: int = 10):
+        """Records all following steps and writes the report to report_file at exit."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.report_file = Path(report_file)
+        self.top_allocations = top_allocations
+        self._start = (datetime.now().isoformat(timespec='seconds'), time.perf_counter(), _rusage())
+        tracemalloc.start()
+        atexit.register(self.write_report)
+
+    @contextmanager
+    def step(self, name: str, rows_in: Optional[int] = None) -> Iterator[Step]:
+        step = Step(name, rows_in)
+        if not self.enabled:
+            yield step
+            return
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        sampler = _RssSampler()
+        start_usage, start = _rusage(), time.perf_counter()
+        try:
+            yield step
+        finally:
+            wall_seconds = time.perf_counter() - start
+            sampler.stop()
+            usage = _rusage()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            step.measurements = {
+                "wall_s": wall_seconds,
+                "cpu_s": usage["cpu_s"] - start_usage["cpu_s"],
+                **sampler.report(),
+                "process_peak_rss_mib": usage["peak_rss_mib"],
+                "children_peak_rss_mib": usage["children_peak_rss_mib"],
+                "traced_peak_mib": traced_peak / _mib,
+                "top_allocations": [{"location": str(allocation.traceback[0]), "size_mib": allocation.size_diff / _mib,
+                                     "count": allocation.count_diff}
+                                    for allocation in allocations[:self.top_allocations] if allocation.size_diff > 0],
+            }
+            self.steps.append(step)
+
+    def report(self) -> dict:
+        started, start, start_usage = self._start
+        usage = _rusage()
+        return {
+            "script": Path(sys.argv[0]).name,
+            "argv": sys.argv[1:],
+            "started": started,
+            "python": sys.version.split()[0],
+            "total": {"wall_s": time.perf_counter() - start, "cpu_s": usage["cpu_s"] - start_usage["cpu_s"],
+                      "peak_rss_mib": usage["peak_rss_mib"], "children_peak_rss_mib": usage["children_peak_rss_mib"]},
+            "steps": [step.report() for step in self.steps],
+        }
+
+    def write_report(self):
+        self.report_file.parent.mkdir(parents=True, exist_ok=True)
+        self.report_file.write_text(json.dumps(self.report(), indent=1))
+
+
+profiler = Profiler()
+
+
+def profile_from_argv(argv: List[str] = sys.argv):
+    """Enables the profiler if argv contains --profile <report.json>, and removes the option from argv."""
+    if "--profile" not in argv:
+        return
+    position = argv.index("--profile")
+    if position + 1 >= len(argv):
+        print("--profile requires the path of the report file.", file=sys.stderr)
+        exit(1)
+    report_file = argv[position + 1]
+    del argv[position:position + 2]
+    profiler.enable(Path(report_file))
+
+
+def _enable_from_option(ctx: click.Context, param: click.Parameter, report_file: Optional[Path]):
+    if report_file is not None:
+        profiler.enable(report_file)
+
+
+# the --profile option of the click commands of the stages
+profile_option = click.option("--profile", default=None, type=click.Path(dir_okay=False, path_type=Path),
+                              expose_value=False, is_eager=True, callback=_enable_from_option, metavar="REPORT.json",
+                              help="Write the time and memory used by each step of this stage to a JSON report.")
+
+
+def compare_reports(base: dict, new: dict) -> List[dict]:
+    """Per step name, the summed wall time, CPU time and maximum traced peak of both reports and their ratios."""
+
+    def by_name(report: dict) -> Dict[str, dict]:
+        steps: Dict[str, dict] = dict()
+        for step in report["steps"]:
+            summed = steps.setdefault(step["name"], {"wall_s": 0.0, "cpu_s": 0.0, "traced_peak_mib": 0.0})
+            summed["wall_s"] += step["wall_s"]
+            summed["cpu_s"] += step["cpu_s"]
+            summed["traced_peak_mib"] = max(summed["traced_peak_mib"], step["traced_peak_mib"])
+        steps["total"] = {"wall_s": report["total"]["wall_s"], "cpu_s": report["total"]["cpu_s"],
+                          "traced_peak_mib": max([step["traced_peak_mib"] for step in report["steps"]], default=0.0)}
+        return steps
+
+    base_steps, new_steps = by_name(base), by_name(new)
+    comparison = []
+    for name in list(dict.fromkeys(list(base_steps) + list(new_steps))):
+        row = {"step": name}
+        for measurement in ["wall_s", "cpu_s", "traced_peak_mib"]:
+            base_value = base_steps.get(name, {}).get(measurement)
+            new_value = new_steps.get(name, {}).get(measurement)
+            row["base_" + measurement] = base_value
+            row["new_" + measurement] = new_value
+            row[measurement + "_ratio"] = new_value / base_value if base_value and new_value is not None else None
+        comparison.append(row)
+    return comparison
+
+
+@click.command()
+@click.argument("base_report", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("new_report", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def compare(base_report: Path, new_report: Path):
+    """Compares the steps of the profiling reports BASE_REPORT and NEW_REPORT."""
+    comparison = compare_reports(json.loads(base_report.read_text()), json.loads(new_report.read_text()))
+    row_format = "{:<24} {:>10} {:>10} {:>7} {:>10} {:>10} {:>7}"
+    click.echo(row_format.format("step", "base wall", "new wall", "ratio", "base MiB", "new MiB", "ratio"))
+
+    def number(value: Optional[float], pattern: str) -> str:
+        return pattern.format(value) if value is not None else "-"
+
+    for row in comparison:
+        click.echo(row_format.format(
+            row["step"], number(row["base_wall_s"], "{:.2f}s"), number(row["new_wall_s"], "{:.2f}s"),
+            number(row["wall_s_ratio"], "{:.2f}"), number(row["base_traced_peak_mib"], "{:.1f}"),
+            number(row["new_traced_peak_mib"], "{:.1f}"), number(row["traced_peak_mib_ratio"], "{:.2f}")))
+
+
+if __name__ == '__main__':
+    compare()
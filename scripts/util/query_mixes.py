@@ -0,0 +1,47 @@
+"""
+Query mixes per hour (QMpH) per query mix instead of a single value pooled over all executions.
+
+A query mix is one run of a client through all queries, i.e. the executions of one (run, clientID). Its QMpH is one hour
+divided by the sum of the penalized times of its executions. The per-mix values of a (triplestore, dataset) are
+summarized by their distribution, next to the pooled QMpH of the paper, which divides the number of runs by the total
+penalized time. The first mix of each client is reported separately to show warm-up effects.
+"""
+from typing import Sequence
+
+import pandas as pd
+
+ms_per_hour = 60 ** 2 * 1000
+mix_columns = ['run', 'clientID']
+
+
+def mix_qmph(iguana_data: pd.DataFrame, by: Sequence[str] = ('triplestore', 'dataset')) -> pd.DataFrame:
+    """
+    One row per query mix of each group of by, with the number of executions, the penalized time of the mix in ms,
+    its QMpH and whether it is the first mix of its client.
+    """
+    by = list(by)
+    mixes = iguana_data.groupby(by + mix_columns, observed=True, sort=True).agg(
+        executions=('penalizedTime', 'size'), mix_time=('penalizedTime', 'sum')).reset_index()
+    mixes['QMpH'] = ms_per_hour / mixes['mix_time']
+    mixes['first_mix'] = mixes['run'] == mixes.groupby(by + ['clientID'], observed=True)['run'].transform('min')
+    return mixes
+
+
+def qmph_summary(iguana_data: pd.DataFrame, by: Sequence[str] = ('triplestore', 'dataset')) -> pd.DataFrame:
+    """
+    One row per group of by with the pooled QMpH, the number of mixes and the mean, median, standard deviation,
+    minimum and maximum of the per-mix QMpH, and the mean QMpH of the first mixes and of the later mixes.
+    """
+    by = list(by)
+    pooled = iguana_data.groupby(by, observed=True, sort=True).agg(
+        total_time=('penalizedTime', 'sum'), runs=('run', 'max')).reset_index()
+    pooled['QMpH'] = ms_per_hour / pooled['total_time'] * pooled['runs'] + 1
+
+    mixes = mix_qmph(iguana_data, by)
+    per_mix = mixes.groupby(by, observed=True, sort=True)['QMpH'].agg(
+        ['size', 'mean', 'median', 'std', 'min', 'max'])
+    per_mix.columns = ['mixes'] + [f'QMpH_mix_{statistic}' for statistic in per_mix.columns[1:]]
+    warm_up = mixes.pivot_table(index=by, columns='first_mix', values='QMpH', aggfunc='mean', observed=True) \
+        .reindex(columns=[True, False])
+    warm_up.columns = ['QMpH_first_mix_mean', 'QMpH_later_mix_mean']
+    return pooled[by + ['QMpH']].merge(per_mix.join(warm_up).reset_index(), on=by, how='left')
@@ -0,0 +1,44 @@
+"""
+Per-query speedups of triple stores relative to reference triple stores.
+
+All rows of the aggregated results are joined once with the values of each reference store for the same dataset and
+query. The ratio is value / reference value, NaN where the value is 0 or the reference store has no result for the
+query. If a reference store has several clients for a query, the mean of their values is the reference value.
+"""
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+query_columns = ['dataset', 'queryID']
+
+
+def relative_speedups(data: pd.DataFrame, references: Sequence[str], value: str = 'qps_mean') -> pd.DataFrame:
+    """
+    The rows of data once per reference store, with the columns reference, ratio (value relative to the reference
+    store) and log_ratio (log10 of ratio). The rows of each reference keep the order of data.
+    """
+    reference_values = data[data['triplestore'].isin(references)] \
+        .assign(reference=lambda frame: frame['triplestore'].astype(str),
+                reference_value=lambda frame: frame[value].to_numpy(dtype=np.float64, na_value=np.nan)) \
+        .groupby(query_columns + ['reference'], observed=True, as_index=False)['reference_value'].mean()
+    speedups = data.merge(pd.DataFrame({'reference': list(references)}), how='cross') \
+        .merge(reference_values, on=query_columns + ['reference'], how='left')
+    values = speedups[value].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speedups['ratio'] = np.where(values != 0, values / speedups['reference_value'].to_numpy(), np.nan)
+        speedups['log_ratio'] = np.log10(speedups['ratio'])
+    return speedups.drop(columns='reference_value')
+
+
+def log_ratio_matrix(speedups: pd.DataFrame, dataset: str, reference: str) -> pd.DataFrame:
+    """The log10 speedups relative to reference of one dataset as a matrix of queries (rows) and stores (columns)."""
+    selected = speedups[(speedups['dataset'] == dataset) & (speedups['reference'] == reference)]
+    return selected.pivot_table(index='queryID', columns='triplestore', values='log_ratio', aggfunc='mean',
+                                observed=True, dropna=False)
+
+
+def log_ratio_matrices(speedups: pd.DataFrame) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """log_ratio_matrix of every (dataset, reference) pair in speedups, keyed by the pair."""
+    pairs = speedups[['dataset', 'reference']].drop_duplicates().itertuples(index=False)
+    return {(dataset, reference): log_ratio_matrix(speedups, dataset, reference) for dataset, reference in pairs}
@@ -0,0 +1,129 @@
+"""
+Compact in-memory column types of the result tables.
+
+Read as they are, the triple store, dataset and other names of the result tables are Python strings in every row and
+all numbers are 64 bit. `compact` gives each column of a table its declared type instead: categoricals for names,
+int32 for ids and runs, float32 for the measured times and QpS, whose resolution is far coarser than float32 precision,
+and booleans for the flags. Counts which can exceed these ranges, like the number of solutions, keep 64 bit. Integer
+and boolean columns with missing values get the nullable counterpart of their type. Columns a table does not declare
+are kept as they are.
+
+`renamed` maps the names of a categorical column by renaming its categories, so a mapping of e.g. the triple store names
+to their short names touches one value per category instead of every row.
+
+`python scripts/util/schema.py` reports the memory of the result tables in the data directory before and after.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
+
+import click
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_names = {column: 'category' for column in ['triplestore', 'dataset', 'format', 'benchmarkID', 'starttime']}
+_ids = {column: 'int32' for column in ['queryID', 'clientID', 'run', 'noclients']}
+_measurements = ['qps', 'penalizedQPS', 'time', 'penalizedTime']
+_outcomes = ['succeeded', 'failed', 'timeouts', 'unknownExceptions', 'wrongCodes']
+
+# benchmarking_results_with_result_stats.csv, one row per execution
+result_types = {
+    **_names,
+    **_ids,
+    **{column: 'float32' for column in _measurements + ['resultParsingTime', 'numberOfVariables']},
+    **{column: 'bool' for column in _outcomes + ['parsingSucceeded', 'non_tentris_sparql', 'wrongResult',
+                                                 'fully_correct_result']},
+    'parsingErrorMessage': 'category',
+}
+
+# benchmarking_results_with_result_stats_agg.csv, one row per query and client
+_statistics = ['mean', 'std', 'min', 'percentile_25', 'median', 'percentile_75', 'max']
+aggregate_types = {
+    **_names,
+    **_ids,
+    **{f'{column}_{statistic}': 'float32' for column in _measurements for statistic in _statistics},
+    **{column: 'int32' for column in _outcomes + ['wrongResult']},
+    **{column: 'bool' for column in ['parsingSucceeded', 'fully_correct_result']},
+}
+
+table_types = {
+    "benchmarking_results_with_result_stats.csv": result_types,
+    "benchmarking_results_with_result_stats_agg.csv": aggregate_types,
+}
+
+_nullable = {'bool': 'boolean', 'int32': 'Int32'}
+
+
+def compact(data: pd.DataFrame, types: Mapping[str, str]) -> pd.DataFrame:
+    """data with the columns declared in types converted to their declared type."""
+    import numpy as np
+    import pandas as pd
+    converted = dict()
+    for column, dtype in types.items():
+        if column not in data.columns:
+            continue
+        if dtype in _nullable and data[column].hasnans:
+            dtype = _nullable[dtype]
+        if dtype == 'category' and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            converted[column] = data[column].astype(dtype)
+        elif dtype == 'float32' and pd.api.types.is_extension_array_dtype(data[column].dtype):
+            # nullable floats and integers do not cast to numpy floats while they hold missing values
+            converted[column] = data[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        elif dtype != 'category' and data[column].dtype != dtype:
+            converted[column] = data[column].astype(dtype)
+    return data.assign(**converted) if converted else data
+
+
+def renamed(values: pd.Series, mapping: Mapping[str, str]) -> pd.Series:
+    """
+    values as a categorical with the categories renamed by mapping. Categories which are not in mapping keep their
+    name. If several categories get the same name, they are merged by recoding the rows. The categories are sorted, so
+    that grouping by them orders the groups like grouping the names as strings.
+    """
+    import numpy as np
+    import pandas as pd
+    values = values.astype('category')
+    names = [mapping.get(category, category) for category in values.cat.categories]
+    categories = sorted(set(names), key=str)
+    if names == categories:
+        return values.cat.rename_categories(names)
+    position = {name: code for code, name in enumerate(categories)}
+    recode = np.array([position[name] for name in names] + [-1])
+    # code -1 marks missing values and is kept by the last entry of recode
+    return pd.Series(pd.Categorical.from_codes(recode[values.cat.codes.to_numpy()], categories=categories),
+                     index=values.index, name=values.name)
+
+
+def memory_mib(data: pd.DataFrame) -> float:
+    """The memory of data including the Python strings it holds, in MiB."""
+    return data.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def memory_report(data_dir: Path, types: Optional[Dict[str, Mapping[str, str]]] = None) -> pd.DataFrame:
+    """The rows and memory of the tables in data_dir as read by pd.read_csv and after compact, with the factor."""
+    import pandas as pd
+    rows = []
+    for file_name, types_of_table in (types or table_types).items():
+        path = Path(data_dir).joinpath(file_name)
+        if not path.exists():
+            continue
+        data = pd.read_csv(path, index_col=0)
+        before = memory_mib(data)
+        after = memory_mib(compact(data, types_of_table))
+        rows.append({"table": file_name, "rows": len(data), "before_mib": before, "after_mib": after,
+                     "factor": before / after if after else None})
+    return pd.DataFrame(rows, columns=["table", "rows", "before_mib", "after_mib", "factor"])
+
+
+@click.command()
+@click.option("--base-dir", default=Path().absolute(), type=click.Path(file_okay=False, path_type=Path),
+              help="Where the data directory is located.")
+def report(base_dir: Path):
+    """Prints the memory of the result tables before and after converting them to their compact column types."""
+    click.echo(memory_report(base_dir.joinpath("data")).to_string(index=False, float_format="{:.2f}".format))
+
+
+if __name__ == '__main__':
+    report()